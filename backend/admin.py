@@ -0,0 +1,288 @@
+"""Admin maintenance: seeding, synthetic data, cache stats, the event stream and request profiles"""
+import json
+import asyncio
+import re
+import secrets
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from core import db, client, settings
+from auth import get_current_user, get_admin_user, get_optional_user, load_user
+from events import WORKER_ID, EVENT_HEARTBEAT_SECONDS, event_broker
+from caching import invalidate_catalog, invalidation_bus, local_caches
+from catalog import empty_rating_histogram
+from currency import product_prices
+
+router = APIRouter()
+
+# ===================== SEED DATA =====================
+
+@router.post("/seed")
+async def seed_data():
+    """Seed initial products"""
+    existing = await db.products.find_one()
+    if existing:
+        return {"message": "Data already seeded"}
+    
+    products = [
+        # Resin products
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Ocean Wave Coaster Set",
+            "description": "Hand-poured resin coasters capturing the essence of Caribbean waves. Each piece is unique with swirling turquoise and white tones.",
+            "price_bbd": 120.00,
+            "price_usd": 60.00,
+            "category": "resin",
+            "images": ["https://images.unsplash.com/photo-1718635310388-880694939769?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDQ2Mzl8MHwxfHNlYXJjaHwyfHxyZXNpbiUyMGFydCUyMGRlY29yJTIwZ29sZCUyMHR1cnF1b2lzZXxlbnwwfHx8fDE3Njg5NDMzNDZ8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 15,
+            "featured": True,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Gold Leaf Trinket Tray",
+            "description": "Elegant resin tray adorned with genuine gold leaf flakes. Perfect for jewelry or decorative display.",
+            "price_bbd": 180.00,
+            "price_usd": 90.00,
+            "category": "resin",
+            "images": ["https://images.unsplash.com/photo-1663739314425-4b0d05a8a068?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDQ2Mzl8MHwxfHNlYXJjaHw0fHxyZXNpbiUyMGFydCUyMGRlY29yJTIwZ29sZCUyMHR1cnF1b2lzZXxlbnwwfHx8fDE3Njg5NDMzNDZ8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 10,
+            "featured": True,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Midnight Purple Clock",
+            "description": "A stunning wall clock featuring deep purple resin with gold flecks. Functional art for your space.",
+            "price_bbd": 250.00,
+            "price_usd": 125.00,
+            "category": "resin",
+            "images": ["https://images.unsplash.com/photo-1718635310388-880694939769?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDQ2Mzl8MHwxfHNlYXJjaHwyfHxyZXNpbiUyMGFydCUyMGRlY29yJTIwZ29sZCUyMHR1cnF1b2lzZXxlbnwwfHx8fDE3Njg5NDMzNDZ8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 5,
+            "featured": False,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        # Soaps
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Lavender Dreams Bar",
+            "description": "Gentle lavender-infused soap made with organic oils. Calming scent for relaxation.",
+            "price_bbd": 24.00,
+            "price_usd": 12.00,
+            "category": "soaps",
+            "images": ["https://images.unsplash.com/photo-1622116500760-1753e5973ec7?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxODh8MHwxfHNlYXJjaHw0fHxsdXh1cnklMjBoYW5kbWFkZSUyMHNvYXAlMjBkYXJrJTIwYmFja2dyb3VuZHxlbnwwfHx8fDE3Njg5NDMzNDJ8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 50,
+            "featured": True,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Charcoal Detox Scrub",
+            "description": "Deep cleansing activated charcoal body scrub with coconut oil. Exfoliates and purifies.",
+            "price_bbd": 36.00,
+            "price_usd": 18.00,
+            "category": "soaps",
+            "images": ["https://images.pexels.com/photos/6621470/pexels-photo-6621470.jpeg"],
+            "stock": 30,
+            "featured": False,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Shea Butter Body Lotion",
+            "description": "Rich moisturizing lotion with pure shea butter and vanilla essence. Nourishes dry skin.",
+            "price_bbd": 48.00,
+            "price_usd": 24.00,
+            "category": "soaps",
+            "images": ["https://images.unsplash.com/photo-1620567645328-99d8d4b6d4e5?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxODh8MHwxfHNlYXJjaHwzfHxsdXh1cnklMjBoYW5kbWFkZSUyMHNvYXAlMjBkYXJrJTIwYmFja2dyb3VuZHxlbnwwfHx8fDE3Njg5NDMzNDJ8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 25,
+            "featured": True,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        # Candles
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Caribbean Sunset Candle",
+            "description": "Hand-poured soy candle with notes of hibiscus, mango, and warm amber. 40+ hours burn time.",
+            "price_bbd": 64.00,
+            "price_usd": 32.00,
+            "category": "candles",
+            "images": ["https://images.unsplash.com/photo-1668086682339-f14262879c18?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxOTF8MHwxfHNlYXJjaHwxfHxhcnRpc2FuJTIwc2NlbnRlZCUyMGNhbmRsZSUyMGRhcmslMjBtb29kJTIwZ29sZHxlbnwwfHx8fDE3Njg5NDMzNDR8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 20,
+            "featured": True,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Midnight Oud Collection",
+            "description": "Luxurious black vessel candle with deep oud and sandalwood fragrance. Perfect for evening ambiance.",
+            "price_bbd": 96.00,
+            "price_usd": 48.00,
+            "category": "candles",
+            "images": ["https://images.unsplash.com/photo-1651795426376-0e6adfd01f00?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxOTF8MHwxfHNlYXJjaHwzfHxhcnRpc2FuJTIwc2NlbnRlZCUyMGNhbmRsZSUyMGRhcmslMjBtb29kJTIwZ29sZHxlbnwwfHx8fDE3Njg5NDMzNDR8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 15,
+            "featured": False,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Vanilla Bean Trio",
+            "description": "Set of three mini candles in warm vanilla scent. Perfect gift set or home warming collection.",
+            "price_bbd": 72.00,
+            "price_usd": 36.00,
+            "category": "candles",
+            "images": ["https://images.unsplash.com/photo-1641837225643-f999493f6375?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxOTF8MHwxfHNlYXJjaHw0fHxhcnRpc2FuJTIwc2NlbnRlZCUyMGNhbmRsZSUyMGRhcmslMjBtb29kJTIwZ29sZHxlbnwwfHx8fDE3Njg5NDMzNDR8MA&ixlib=rb-4.1.0&q=85"],
+            "stock": 18,
+            "featured": True,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+    ]
+    for product in products:
+        product.update(review_count=0, rating_sum=0, rating_histogram=empty_rating_histogram())
+        product.update(await product_prices(product["price_bbd"], product["price_usd"]))
+    
+    await db.products.insert_many(products)
+    await invalidate_catalog()
+    return {"message": "Data seeded", "products_count": len(products)}
+
+# Letters, digits, "_" and "-": nothing Mongo or a shell would treat specially
+SYNTHETIC_DB_NAME = re.compile(r"[A-Za-z0-9_-]{1,63}")
+
+class SyntheticDataRequest(BaseModel):
+    db_name: Optional[str] = None
+    seed: int = 1
+    scale: float = Field(default=1, gt=0)
+    products: Optional[int] = Field(default=None, ge=0)
+    users: Optional[int] = Field(default=None, ge=0)
+    orders: Optional[int] = Field(default=None, ge=0)
+    reviews_per_product: float = Field(default=4, ge=0)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+@router.post("/admin/synthetic")
+async def generate_synthetic_data(request: SyntheticDataRequest, admin: dict = Depends(get_admin_user)):
+    """Fill a separate database with deterministic load-test data (see synthetic.py)"""
+    import synthetic
+    
+    prefix = settings.synthetic_db_prefix or f"{db.name}_synthetic"
+    db_name = request.db_name or prefix
+    if not db_name.startswith(prefix) or not SYNTHETIC_DB_NAME.fullmatch(db_name):
+        raise HTTPException(status_code=400, detail=f"Synthetic data can only be written to a database named {prefix}*")
+    if db_name == db.name:
+        raise HTTPException(status_code=400, detail="Synthetic data cannot be written to the live database")
+    def volume(value: Optional[int], base: int) -> int:
+        return value if value is not None else round(base * request.scale)
+    try:
+        return await synthetic.generate(
+            client[db_name],
+            seed=request.seed,
+            products=volume(request.products, synthetic.BASE_PRODUCTS),
+            users=volume(request.users, synthetic.BASE_USERS),
+            orders=volume(request.orders, synthetic.BASE_ORDERS),
+            reviews_per_product=request.reviews_per_product,
+            start=request.start.astimezone(timezone.utc) if request.start else None,
+            end=request.end.astimezone(timezone.utc) if request.end else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/admin/cache/stats")
+async def get_cache_stats(admin: dict = Depends(get_admin_user)):
+    return {
+        "worker_id": WORKER_ID,
+        "bus": invalidation_bus.stats(),
+        "caches": [cache.stats() for cache in local_caches]
+    }
+
+# ===================== ADMIN EVENT STREAM =====================
+
+# EventSource cannot send headers, so a browser opens the stream with
+# ?ticket= rather than putting the admin's long-lived JWT in a URL, where it
+# would land in access logs and history. Tickets come from an authenticated
+# POST, expire quickly and open a single stream; reconnects fetch a new one.
+STREAM_TICKET_SECONDS = 30
+
+@router.post("/admin/stream-tickets")
+async def create_stream_ticket(admin: dict = Depends(get_admin_user)):
+    ticket = secrets.token_urlsafe(32)
+    await db.stream_tickets.insert_one({
+        "_id": ticket,
+        "user_id": admin["id"],
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_SECONDS)
+    })
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS}
+
+async def get_admin_user_for_stream(ticket: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    if authorization or not ticket:
+        return await get_admin_user(await get_current_user(authorization))
+    redeemed = await db.stream_tickets.find_one_and_delete(
+        {"_id": ticket, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+    )
+    user = await load_user(redeemed["user_id"]) if redeemed else None
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    return await get_admin_user(user)
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+@router.get("/admin/events")
+async def admin_events(request: Request, admin: dict = Depends(get_admin_user_for_stream)):
+    queue = event_broker.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ===================== REQUEST PROFILING =====================
+
+# Admins add `X-Profile: 1` or `?_profile=1` to profile a single request (see profiling.py)
+PROFILE_RETENTION_SECONDS = 7 * 86400
+
+async def profiling_admin(authorization: str) -> Optional[str]:
+    user = await get_optional_user(authorization or None)
+    return user["id"] if user and user.get("is_admin") else None
+
+async def store_profile(report: dict):
+    await db.request_profiles.insert_one(report)
+
+@router.get("/admin/profiles")
+async def list_request_profiles(path: Optional[str] = None, admin: dict = Depends(get_admin_user)):
+    query = {"path": path} if path else {}
+    return await db.request_profiles.find(
+        query, {"_id": 0, "id": 1, "method": 1, "path": 1, "status": 1, "duration_ms": 1, "mongo.commands": 1, "mongo.duration_ms": 1, "created_at": 1}
+    ).sort("created_at", -1).limit(50).to_list(50)
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, admin: dict = Depends(get_admin_user)):
+    profile = await db.request_profiles.find_one({"id": profile_id}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+async def create_indexes():
+    await db.stream_tickets.create_index("expires_at", expireAfterSeconds=0)
+    await db.request_profiles.create_index("id")
+    await db.request_profiles.create_index("created_at", expireAfterSeconds=PROFILE_RETENTION_SECONDS)
@@ -0,0 +1,184 @@
+"""Admission control: per-route-class concurrency limits and load shedding"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Dict
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+
+from config import Settings
+from auth import get_admin_user
+
+router = APIRouter()
+
+# Requests are admitted by route class under one shared concurrency budget.
+# Each class caps its own share so checkout always has headroom, waits in a
+# priority queue with a deadline, and is shed with a fast 503 once the
+# smoothed queueing delay passes its multiple of the target. Checkout is
+# never shed early; it only fails if its own deadline passes.
+ADMISSION_EWMA_WEIGHT = 0.2
+
+class RouteClass:
+    def __init__(self, name: str, priority: int, share: float, queue_timeout: float, shed_factor: Optional[float], retry_after: int, capacity: int):
+        self.name = name
+        self.priority = priority
+        self.max_concurrency = max(1, int(capacity * share))
+        self.queue_timeout = queue_timeout
+        self.shed_factor = shed_factor
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        # (future, enqueued_at), oldest first; entries leave when admitted, timed out or cancelled
+        self.waiters: deque = deque()
+
+def route_classes(capacity: int) -> Dict[str, RouteClass]:
+    return {
+        "checkout": RouteClass("checkout", 0, share=1.0, queue_timeout=10.0, shed_factor=None, retry_after=1, capacity=capacity),
+        "auth": RouteClass("auth", 1, share=0.4, queue_timeout=3.0, shed_factor=4.0, retry_after=2, capacity=capacity),
+        "browse": RouteClass("browse", 2, share=0.7, queue_timeout=1.0, shed_factor=2.0, retry_after=2, capacity=capacity),
+        "admin": RouteClass("admin", 3, share=0.15, queue_timeout=2.0, shed_factor=1.0, retry_after=5, capacity=capacity),
+    }
+
+# Long-lived streams would pin a slot for their whole life
+ADMISSION_EXEMPT_PATHS = ("/api/admin/events",)
+
+def classify_request(method: str, path: str) -> str:
+    if path.startswith(("/api/checkout", "/api/webhook")) or (method == "POST" and path == "/api/orders"):
+        return "checkout"
+    if path.startswith("/api/auth"):
+        return "auth"
+    if path.startswith("/api/admin"):
+        return "admin"
+    return "browse"
+
+class LoadShed(Exception):
+    pass
+
+class AdmissionController:
+    def __init__(self, capacity: int, classes: Dict[str, RouteClass], target_delay: float):
+        self.capacity = capacity
+        self.classes = classes
+        self.target_delay = target_delay
+        self.in_flight = 0
+        self.queue_delay = 0.0
+        self._by_priority = sorted(classes.values(), key=lambda c: c.priority)
+
+    def _can_run(self, route_class: RouteClass) -> bool:
+        return self.in_flight < self.capacity and route_class.in_flight < route_class.max_concurrency
+
+    def _start(self, route_class: RouteClass, waited: float):
+        self.in_flight += 1
+        route_class.in_flight += 1
+        route_class.admitted += 1
+        self.queue_delay += ADMISSION_EWMA_WEIGHT * (waited - self.queue_delay)
+
+    def _should_shed(self, route_class: RouteClass) -> bool:
+        return route_class.shed_factor is not None and self.queue_delay > self.target_delay * route_class.shed_factor
+
+    def _blocked(self, route_class: RouteClass) -> bool:
+        """Whether queued requests of equal or higher priority are owed the next slot.
+
+        A class queued only because it is at its own cap doesn't hold up
+        anyone else; it can't take the slot anyway.
+        """
+        return any(
+            other.waiters and other.in_flight < other.max_concurrency
+            for other in self._by_priority if other.priority <= route_class.priority
+        )
+
+    async def acquire(self, route_class: RouteClass):
+        if not self._blocked(route_class) and self._can_run(route_class):
+            self._start(route_class, 0.0)
+            return
+        if self._should_shed(route_class):
+            route_class.shed += 1
+            raise LoadShed()
+        
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, time.monotonic())
+        route_class.waiters.append(entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), route_class.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                route_class.waiters.remove(entry)
+                route_class.shed += 1
+                # Waiting that long is itself a signal of overload
+                self.queue_delay += ADMISSION_EWMA_WEIGHT * (route_class.queue_timeout - self.queue_delay)
+                raise LoadShed()
+        except asyncio.CancelledError:
+            # Client went away while queued; hand the slot on if we already got one
+            if future.done() and not future.cancelled():
+                self.release(route_class)
+            else:
+                future.cancel()
+                route_class.waiters.remove(entry)
+            raise
+
+    def release(self, route_class: RouteClass):
+        self.in_flight -= 1
+        route_class.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        # Highest priority first; a class at its own cap is passed over, not waited on
+        for route_class in self._by_priority:
+            while route_class.waiters and self._can_run(route_class):
+                future, enqueued = route_class.waiters.popleft()
+                self._start(route_class, time.monotonic() - enqueued)
+                future.set_result(None)
+            if self.in_flight >= self.capacity:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": sum(len(c.waiters) for c in self.classes.values()),
+            "queue_delay_ms": round(self.queue_delay * 1000, 2),
+            "target_delay_ms": round(self.target_delay * 1000, 2),
+            "classes": {
+                name: {
+                    "in_flight": c.in_flight, "max_concurrency": c.max_concurrency, "queued": len(c.waiters),
+                    "admitted": c.admitted, "shed": c.shed
+                }
+                for name, c in self.classes.items()
+            }
+        }
+
+def admission_controller(settings: Settings) -> AdmissionController:
+    capacity = settings.admission_capacity
+    return AdmissionController(capacity, route_classes(capacity), settings.admission_target_delay_ms / 1000)
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"].startswith(ADMISSION_EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+        
+        route_class = self.controller.classes[classify_request(scope["method"], scope["path"])]
+        try:
+            await self.controller.acquire(route_class)
+        except LoadShed:
+            response = JSONResponse(
+                {"detail": "Server busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(route_class.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+@router.get("/admin/admission/stats")
+async def get_admission_stats(request: Request, admin: dict = Depends(get_admin_user)):
+    return request.app.state.admission.stats()
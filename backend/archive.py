@@ -0,0 +1,182 @@
+"""Hot/cold tiering for orders, payment transactions and contact messages.
+
+Delivered and cancelled orders older than ARCHIVE_ORDERS_AFTER_DAYS move to
+`orders_archive` in batches, together with their payment transactions, which
+move to `payment_transactions_archive`. The hot collections and their
+indexes then only hold orders that can still change. Direct id lookups use
+core.find_one_or_archived, so an archived order still opens from its link.
+
+A batch is copied before anything is deleted, and copies are upserts, so a
+run that dies halfway leaves duplicates for the next run to finish, never a
+lost order. An order whose status changed between the copy and the delete
+stays hot and its archive copies are removed.
+
+Contact messages carry a `received_at` date. With CONTACT_RETENTION_DAYS set,
+a TTL index on it lets MongoDB delete old messages on its own:
+
+    python archive.py [--batch 500] [--backfill-contacts]
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pymongo import ReplaceOne, DeleteOne, UpdateOne
+from pymongo.errors import OperationFailure
+
+from core import db, settings, archive_of
+from auth import get_admin_user
+from payments import acquire_task_lock, release_task_lock
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+ARCHIVED_STATUSES = ["delivered", "cancelled"]
+ARCHIVE_BATCH = 500
+ARCHIVE_LEASE_SECONDS = 1800
+CONTACT_TTL_INDEX = "contact_retention"
+
+# ===================== ORDERS =====================
+
+def replace_by_id(docs: list, archived_at: str) -> list:
+    return [ReplaceOne({"id": doc["id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs]
+
+async def archive_order_batch(orders: list) -> int:
+    """Move one batch of orders and their transactions; returns how many orders moved"""
+    now = datetime.now(timezone.utc).isoformat()
+    order_ids = [order["id"] for order in orders]
+    transactions = await db.payment_transactions.find({"order_id": {"$in": order_ids}}, {"_id": 0}).to_list(None)
+
+    await archive_of(db.orders).bulk_write(replace_by_id(orders, now), ordered=False)
+    if transactions:
+        await archive_of(db.payment_transactions).bulk_write(replace_by_id(transactions, now), ordered=False)
+
+    # Only delete what is unchanged since it was copied
+    await db.orders.bulk_write([
+        DeleteOne({"id": order["id"], "status": order["status"], "payment_status": order.get("payment_status")})
+        for order in orders
+    ], ordered=False)
+    still_hot = set(await db.orders.distinct("id", {"id": {"$in": order_ids}}))
+    if still_hot:
+        await archive_of(db.orders).delete_many({"id": {"$in": list(still_hot)}})
+        await archive_of(db.payment_transactions).delete_many({"order_id": {"$in": list(still_hot)}})
+    moved = [transaction["id"] for transaction in transactions if transaction["order_id"] not in still_hot]
+    if moved:
+        await db.payment_transactions.delete_many({"id": {"$in": moved}})
+    return len(orders) - len(still_hot)
+
+async def archive_orders(batch_size: int = ARCHIVE_BATCH) -> Optional[dict]:
+    """Move old finished orders to the archive; None if another worker is already at it"""
+    run_id = str(uuid.uuid4())
+    if not await acquire_task_lock("archive_orders", run_id, ARCHIVE_LEASE_SECONDS):
+        return None
+    try:
+        started = datetime.now(timezone.utc)
+        cutoff = (started - timedelta(days=settings.archive_orders_after_days)).isoformat()
+        query = {"status": {"$in": ARCHIVED_STATUSES}, "created_at": {"$lt": cutoff}}
+        archived = batches = 0
+        while True:
+            orders = await db.orders.find(query, {"_id": 0}).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+            if not orders:
+                break
+            moved = await archive_order_batch(orders)
+            archived += moved
+            batches += 1
+            if moved == 0:
+                # Every order in the batch changed under us; try again next run
+                break
+            await acquire_task_lock("archive_orders", run_id, ARCHIVE_LEASE_SECONDS)
+        report = {
+            "orders_archived": archived,
+            "batches": batches,
+            "cutoff": cutoff,
+            "duration_ms": round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1)
+        }
+        logger.info(f"Orders archived: {report}")
+        return report
+    finally:
+        await release_task_lock("archive_orders", run_id)
+
+async def order_archiver():
+    while True:
+        await asyncio.sleep(settings.archive_interval)
+        try:
+            await archive_orders()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Order archiving failed: {e}")
+
+@router.post("/admin/archive/orders")
+async def trigger_order_archive(admin: dict = Depends(get_admin_user)):
+    report = await archive_orders()
+    if report is None:
+        raise HTTPException(status_code=409, detail="Archiving is already running")
+    return report
+
+# ===================== CONTACT MESSAGES =====================
+
+async def backfill_contact_dates(batch_size: int = ARCHIVE_BATCH) -> int:
+    """Give messages stored before `received_at` existed one, so the TTL index covers them"""
+    updated = 0
+    batch = []
+    async for message in db.contact_messages.find({"received_at": {"$exists": False}}, {"_id": 0, "id": 1, "created_at": 1}):
+        received_at = datetime.fromisoformat(message["created_at"])
+        batch.append(UpdateOne({"id": message["id"]}, {"$set": {"received_at": received_at}}))
+        if len(batch) >= batch_size:
+            await db.contact_messages.bulk_write(batch, ordered=False)
+            updated, batch = updated + len(batch), []
+    if batch:
+        await db.contact_messages.bulk_write(batch, ordered=False)
+    return updated + len(batch)
+
+async def sync_contact_ttl():
+    """Create, retune or drop the TTL index to match CONTACT_RETENTION_DAYS"""
+    if settings.contact_retention_days <= 0:
+        try:
+            await db.contact_messages.drop_index(CONTACT_TTL_INDEX)
+        except OperationFailure:
+            pass
+        return
+    seconds = settings.contact_retention_days * 86400
+    try:
+        await db.contact_messages.create_index("received_at", name=CONTACT_TTL_INDEX, expireAfterSeconds=seconds)
+    except OperationFailure:
+        # The index exists with another retention; collMod changes it in place
+        await db.command("collMod", "contact_messages", index={"name": CONTACT_TTL_INDEX, "expireAfterSeconds": seconds})
+
+async def create_indexes():
+    await db.orders.create_index([("status", 1), ("created_at", 1)])
+    await archive_of(db.orders).create_index("id", unique=True)
+    await archive_of(db.orders).create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+    await archive_of(db.payment_transactions).create_index("id", unique=True)
+    await archive_of(db.payment_transactions).create_index("session_id")
+    await archive_of(db.payment_transactions).create_index("order_id")
+    await sync_contact_ttl()
+
+async def main():
+    import argparse
+    from config import Settings
+    import core
+
+    parser = argparse.ArgumentParser(description="Move old finished orders and their transactions to the archive")
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH)
+    parser.add_argument("--backfill-contacts", action="store_true", help="Date old contact messages for the TTL index")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    core.configure(Settings.from_env())
+    await create_indexes()
+    try:
+        if args.backfill_contacts:
+            logger.info(f"Contact messages dated: {await backfill_contact_dates(args.batch)}")
+        report = await archive_orders(args.batch)
+        if report is None:
+            logger.warning("Another worker is archiving; nothing done")
+    finally:
+        core.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""Password hashing, JWT sessions and the auth routes"""
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import bcrypt
+import jwt
+from fastapi import APIRouter, HTTPException, Depends, Header
+
+from core import db, settings
+from models import UserCreate, UserLogin
+from caching import user_cache
+from request_logging import set_request_user
+
+router = APIRouter()
+
+JWT_ALGORITHM = "HS256"
+
+# ===================== AUTH HELPERS =====================
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(settings.bcrypt_rounds)).decode()
+
+def verify_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+def create_token(user_id: str, is_admin: bool = False) -> str:
+    payload = {
+        "user_id": user_id,
+        "is_admin": is_admin,
+        "exp": datetime.now(timezone.utc).timestamp() + 86400 * 7  # 7 days
+    }
+    return jwt.encode(payload, settings.jwt_secret, algorithm=JWT_ALGORITHM)
+
+async def get_current_user(authorization: Optional[str] = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    token = authorization.split(" ")[1]
+    try:
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[JWT_ALGORITHM])
+        user = await load_user(payload["user_id"])
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        set_request_user(user["id"])
+        return user
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def get_admin_user(user: dict = Depends(get_current_user)):
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+async def get_optional_user(authorization: Optional[str] = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        token = authorization.split(" ")[1]
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[JWT_ALGORITHM])
+        user = await load_user(payload["user_id"])
+        if user:
+            set_request_user(user["id"])
+        return user
+    except:
+        return None
+
+async def load_user(user_id: str) -> Optional[dict]:
+    user = user_cache.get(user_id)
+    if user is None:
+        generation = user_cache.generation
+        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        if user:
+            user_cache.set(user_id, user, generation)
+    return user
+
+# ===================== AUTH ROUTES =====================
+
+@router.post("/auth/register", response_model=dict)
+async def register(user_data: UserCreate):
+    existing = await db.users.find_one({"email": user_data.email})
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    user_id = str(uuid.uuid4())
+    user = {
+        "id": user_id,
+        "email": user_data.email,
+        "password": hash_password(user_data.password),
+        "first_name": user_data.first_name,
+        "last_name": user_data.last_name,
+        "phone": user_data.phone,
+        "is_admin": False,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.users.insert_one(user)
+    token = create_token(user_id)
+    return {
+        "token": token,
+        "user": {
+            "id": user_id,
+            "email": user["email"],
+            "first_name": user["first_name"],
+            "last_name": user["last_name"],
+            "phone": user["phone"],
+            "is_admin": False
+        }
+    }
+
+@router.post("/auth/login", response_model=dict)
+async def login(credentials: UserLogin):
+    user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+    if not user or not verify_password(credentials.password, user["password"]):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    token = create_token(user["id"], user.get("is_admin", False))
+    return {
+        "token": token,
+        "user": {
+            "id": user["id"],
+            "email": user["email"],
+            "first_name": user["first_name"],
+            "last_name": user["last_name"],
+            "phone": user.get("phone"),
+            "is_admin": user.get("is_admin", False)
+        }
+    }
+
+def public_user(user: dict) -> dict:
+    return {
+        "id": user["id"],
+        "email": user["email"],
+        "first_name": user["first_name"],
+        "last_name": user["last_name"],
+        "phone": user.get("phone"),
+        "is_admin": user.get("is_admin", False)
+    }
+
+@router.get("/auth/me", response_model=dict)
+async def get_me(user: dict = Depends(get_current_user)):
+    return public_user(user)
+
+# ===================== ADMIN SETUP =====================
+
+@router.post("/admin/setup")
+async def setup_admin():
+    """Create initial admin user if none exists"""
+    existing_admin = await db.users.find_one({"is_admin": True})
+    if existing_admin:
+        raise HTTPException(status_code=400, detail="Admin already exists")
+    
+    admin_id = str(uuid.uuid4())
+    admin = {
+        "id": admin_id,
+        "email": "admin@perennia.bb",
+        "password": hash_password("admin123"),
+        "first_name": "Admin",
+        "last_name": "User",
+        "phone": None,
+        "is_admin": True,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.users.insert_one(admin)
+    return {"message": "Admin created", "email": "admin@perennia.bb", "password": "admin123"}
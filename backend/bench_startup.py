@@ -0,0 +1,134 @@
+"""Cold-start benchmark for the API.
+
+Every run uses a fresh interpreter, as a new worker or autoscaled instance
+would, and times each startup phase:
+
+    import    `import server`
+    app       create_app() from the environment (needs MONGO_URL, DB_NAME)
+    startup   the lifespan startup: index creation and background tasks
+              (needs a reachable MongoDB)
+
+It then totals `python -X importtime` by package to show where the import
+time goes. Pass --budget-ms to fail (exit 1) when a phase's median goes over
+its budget, so CI catches regressions:
+
+    python bench_startup.py --runs 5 --phases import app --budget-ms import=800 app=1000
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+PHASES = ["import", "app", "startup"]
+
+CHILD = r'''
+import sys, json, time, asyncio
+phases = sys.argv[1:]
+timings = {}
+start = time.perf_counter()
+import server
+timings["import"] = (time.perf_counter() - start) * 1000
+if "app" in phases or "startup" in phases:
+    start = time.perf_counter()
+    app = server.create_app()
+    timings["app"] = (time.perf_counter() - start) * 1000
+if "startup" in phases:
+    async def startup():
+        start = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup"] = (time.perf_counter() - start) * 1000
+    asyncio.run(startup())
+print(json.dumps({phase: timings[phase] for phase in phases}))
+'''
+
+def run_once(phases: list) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, *phases],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(top: int) -> list:
+    """(ms, package) for the top-level packages that cost `import server` the most"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    by_package: dict = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us) / 1000
+    return sorted(((ms, package) for package, ms in by_package.items()), reverse=True)[:top]
+
+def parse_budgets(values: list) -> dict:
+    budgets = {}
+    for value in values:
+        phase, _, ms = value.partition("=")
+        if phase not in PHASES or not ms:
+            raise argparse.ArgumentTypeError(f"Budget must look like PHASE=MS with PHASE in {PHASES}: {value}")
+        budgets[phase] = float(ms)
+    return budgets
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=["import", "app"])
+    parser.add_argument("--budget-ms", nargs="*", default=[], metavar="PHASE=MS")
+    parser.add_argument("--top-imports", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+    try:
+        budgets = parse_budgets(args.budget_ms)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    # Phases are cumulative in the child, so always run in declaration order
+    phases = [phase for phase in PHASES if phase in args.phases]
+    runs = [run_once(phases) for _ in range(args.runs)]
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "phases": {
+            phase: {
+                "median_ms": round(statistics.median(run[phase] for run in runs), 1),
+                "min_ms": round(min(run[phase] for run in runs), 1),
+                "max_ms": round(max(run[phase] for run in runs), 1)
+            }
+            for phase in phases
+        },
+        "slowest_imports": [
+            {"package": package, "ms": round(ms, 1)}
+            for ms, package in slowest_imports(args.top_imports)
+        ]
+    }
+    over_budget = [
+        f"{phase}: median {report['phases'][phase]['median_ms']}ms > budget {budget}ms"
+        for phase, budget in budgets.items()
+        if phase in report["phases"] and report["phases"][phase]["median_ms"] > budget
+    ]
+
+    if args.json:
+        print(json.dumps({**report, "over_budget": over_budget}, indent=1))
+    else:
+        print(f"Startup over {args.runs} runs (Python {report['python']})")
+        for phase, stats in report["phases"].items():
+            budget = f"  budget {budgets[phase]}ms" if phase in budgets else ""
+            print(f"  {phase:<8} median {stats['median_ms']:>8}ms  min {stats['min_ms']:>8}ms  max {stats['max_ms']:>8}ms{budget}")
+        print("Slowest imports by package:")
+        for row in report["slowest_imports"]:
+            print(f"  {row['ms']:>8}ms  {row['package']}")
+        for message in over_budget:
+            print(f"OVER BUDGET {message}")
+    if over_budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
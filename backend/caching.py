@@ -0,0 +1,191 @@
+"""Per-worker caches kept coherent through the invalidation bus"""
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Iterable
+
+from pymongo import ReturnDocument
+
+from core import db, settings
+from events import LocalEventTransport
+
+logger = logging.getLogger(__name__)
+
+# Per-worker caches are kept coherent by versioned invalidations. Each namespace
+# has a global counter in cache_versions; a worker that sees a gap in the
+# sequence (a lost message) flushes the whole namespace. CACHE_MAX_STALENESS
+# caps entry lifetime, so even a dead bus bounds how stale a read can be.
+CACHE_LAG_SAMPLES = 1000
+
+class LocalCache:
+    def __init__(self, namespace: str, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.namespace = namespace
+        self.max_ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped on every full flush so a value computed before the flush is not stored after it
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self) -> float:
+        if self.max_ttl is None:
+            return settings.cache_max_staleness
+        return min(self.max_ttl, settings.cache_max_staleness)
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation:
+            return
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self.entries.clear()
+            self.generation += 1
+        else:
+            self.entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"namespace": self.namespace, "size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+class InvalidationBus:
+    def __init__(self, transport):
+        self.transport = transport
+        self.listeners: Dict[str, list] = {}
+        self.versions: Dict[str, int] = {}
+        self.lag_ms: deque = deque(maxlen=CACHE_LAG_SAMPLES)
+        self.received = 0
+        self.gaps = 0
+
+    def subscribe(self, namespace: str, listener):
+        """`listener(key)` is called with the invalidated key, or None for the whole namespace"""
+        self.listeners.setdefault(namespace, []).append(listener)
+
+    def version(self, namespace: str) -> int:
+        return self.versions.get(namespace, 0)
+
+    async def publish(self, namespace: str, key: Optional[str] = None):
+        counter = await db.cache_versions.find_one_and_update(
+            {"_id": namespace},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        message = {
+            "namespace": namespace,
+            "key": key,
+            "version": counter["version"],
+            "published_at": time.time()
+        }
+        self.apply(message)
+        try:
+            await self.transport.publish(message)
+        except Exception as e:
+            logger.error(f"Failed to broadcast {namespace} invalidation: {e}")
+
+    def apply(self, message: dict):
+        namespace = message["namespace"]
+        last = self.versions.get(namespace, 0)
+        key = message["key"]
+        if message["version"] <= last:
+            return
+        if last and message["version"] > last + 1:
+            # Missed at least one invalidation; we cannot know which keys it named
+            self.gaps += 1
+            key = None
+        self.versions[namespace] = message["version"]
+        for listener in self.listeners.get(namespace, []):
+            listener(key)
+
+    def deliver(self, message: dict):
+        self.received += 1
+        self.lag_ms.append((time.time() - message["published_at"]) * 1000)
+        self.apply(message)
+
+    def stats(self) -> dict:
+        lags = sorted(self.lag_ms)
+        def percentile(p):
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))], 2) if lags else None
+        return {
+            "transport": type(self.transport).__name__,
+            "versions": dict(self.versions),
+            "received": self.received,
+            "gaps": self.gaps,
+            "lag_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max": round(lags[-1], 2) if lags else None},
+            "max_staleness_seconds": settings.cache_max_staleness
+        }
+
+# create_app() swaps in the transport named by CACHE_BUS_TRANSPORT
+invalidation_bus = InvalidationBus(LocalEventTransport())
+
+# Priced carts per user; stale when that cart, the stock of a product in it or
+# anything else in the catalog changes
+cart_cache = LocalCache("cart", ttl=300)
+settings_cache = LocalCache("settings")
+# Resolved users per id, so authenticated requests skip the users lookup. Users
+# are never updated in place, so only the TTL expires these.
+user_cache = LocalCache("users", ttl=30)
+# /api/products/facets, recomputed after any catalog write or availability change
+facets_cache = LocalCache("facets")
+# Public part of /api/bootstrap: settings, featured products and categories
+bootstrap_cache = LocalCache("bootstrap")
+# The currency rates table, read by catalog writes and /api/currencies
+currency_cache = LocalCache("currency")
+local_caches = [cart_cache, settings_cache, user_cache, facets_cache, bootstrap_cache, currency_cache]
+
+invalidation_bus.subscribe("cart", cart_cache.invalidate)
+invalidation_bus.subscribe("catalog", lambda key: cart_cache.invalidate())
+invalidation_bus.subscribe("settings", settings_cache.invalidate)
+invalidation_bus.subscribe("catalog", lambda key: facets_cache.invalidate())
+invalidation_bus.subscribe("catalog", lambda key: bootstrap_cache.invalidate())
+invalidation_bus.subscribe("settings", lambda key: bootstrap_cache.invalidate())
+invalidation_bus.subscribe("currency", lambda key: currency_cache.invalidate())
+
+def invalidate_carts_holding(product_id: Optional[str]):
+    if product_id is None:
+        cart_cache.invalidate()
+        return
+    for user_id, (cart, _) in list(cart_cache.entries.items()):
+        if any(line["product_id"] == product_id for line in cart["items"]):
+            cart_cache.invalidate(user_id)
+
+# Stock moves with every order and released hold, so it gets its own namespaces:
+# "stock" names one product and reprices only the carts holding it, while
+# "availability" (a product sold out or came back) drops the catalog-wide
+# facets and bootstrap payloads, which show stock only as in/out.
+invalidation_bus.subscribe("stock", invalidate_carts_holding)
+invalidation_bus.subscribe("availability", lambda key: facets_cache.invalidate())
+invalidation_bus.subscribe("availability", lambda key: bootstrap_cache.invalidate())
+
+# A review changes only a product's rating, which carts don't show: "ratings"
+# drops the facets and the featured cards in bootstrap and leaves carts alone.
+invalidation_bus.subscribe("ratings", lambda key: facets_cache.invalidate())
+invalidation_bus.subscribe("ratings", lambda key: bootstrap_cache.invalidate())
+
+async def invalidate_catalog():
+    """Call after any admin product write (price, stock, create, delete)"""
+    await invalidation_bus.publish("catalog")
+
+async def invalidate_stock(product_ids: Iterable[str], availability_changed: bool):
+    """Call after stock-only moves (orders placed, holds released or retaken)"""
+    for product_id in dict.fromkeys(product_ids):
+        await invalidation_bus.publish("stock", product_id)
+    if availability_changed:
+        await invalidation_bus.publish("availability")
+
+async def invalidate_ratings(product_id: str):
+    """Call after a review changes a product's rating counters"""
+    await invalidation_bus.publish("ratings", product_id)
@@ -0,0 +1,167 @@
+"""Server-side carts"""
+from datetime import datetime, timezone
+from typing import List, Dict
+
+from fastapi import APIRouter, HTTPException, Depends
+
+from core import db
+from money import cents_of, money_fields, batch_totals
+from models import CartItem, CartResponse, CartUpdate
+from auth import get_current_user
+from caching import cart_cache, invalidation_bus
+from stats import record_cart_add
+
+router = APIRouter()
+
+def merge_cart_items(items: List[CartItem]) -> List[dict]:
+    """Collapse duplicate product lines, keeping first-seen order"""
+    merged: Dict[str, int] = {}
+    for item in items:
+        merged[item.product_id] = merged.get(item.product_id, 0) + item.quantity
+    return [{"product_id": pid, "quantity": qty} for pid, qty in merged.items()]
+
+async def price_cart(items: List[dict]) -> dict:
+    """Reprice cart lines against the catalog with a single $in fetch"""
+    product_ids = [item["product_id"] for item in items]
+    products = {}
+    if product_ids:
+        cursor = db.products.find(
+            {"id": {"$in": product_ids}},
+            {
+                "_id": 0, "id": 1, "name": 1, "price_bbd": 1, "price_usd": 1, "price_bbd_cents": 1, "price_usd_cents": 1,
+                "prices": 1, "stock": 1, "images": 1, "category": 1
+            }
+        )
+        async for product in cursor:
+            products[product["id"]] = product
+
+    lines = []
+    stock_issues = []
+    for item in items:
+        product = products.get(item["product_id"])
+        if not product:
+            stock_issues.append({
+                "product_id": item["product_id"],
+                "reason": "not_found",
+                "requested": item["quantity"],
+                "available": 0
+            })
+            continue
+        if product["stock"] < item["quantity"]:
+            stock_issues.append({
+                "product_id": product["id"],
+                "product_name": product["name"],
+                "reason": "insufficient_stock",
+                "requested": item["quantity"],
+                "available": max(product["stock"], 0)
+            })
+        price_bbd_cents = cents_of(product, "price_bbd")
+        price_usd_cents = cents_of(product, "price_usd")
+        lines.append({
+            "product_id": product["id"],
+            "product_name": product["name"],
+            "category": product.get("category"),
+            "quantity": item["quantity"],
+            **money_fields("price_bbd", price_bbd_cents),
+            **money_fields("price_usd", price_usd_cents),
+            **money_fields("line_total_bbd", price_bbd_cents * item["quantity"]),
+            **money_fields("line_total_usd", price_usd_cents * item["quantity"]),
+            "prices": product.get("prices", {}),
+            "stock": product["stock"],
+            "image": product["images"][0] if product.get("images") else ""
+        })
+
+    # Both currencies in one pass: the BBD lines, then the USD lines
+    quantities = [line["quantity"] for line in lines]
+    total_bbd_cents, total_usd_cents = batch_totals(
+        [line["price_bbd_cents"] for line in lines] + [line["price_usd_cents"] for line in lines],
+        quantities + quantities,
+        [len(lines), len(lines)]
+    )
+    return {
+        "items": lines,
+        **money_fields("total_bbd", total_bbd_cents),
+        **money_fields("total_usd", total_usd_cents),
+        "stock_issues": stock_issues,
+        "item_count": sum(quantities)
+    }
+
+async def get_priced_cart(user_id: str) -> dict:
+    cart = cart_cache.get(user_id)
+    if cart is not None:
+        return cart
+    generation = cart_cache.generation
+    stored = await db.carts.find_one({"user_id": user_id}, {"_id": 0, "items": 1})
+    cart = await price_cart(stored["items"] if stored else [])
+    cart_cache.set(user_id, cart, generation)
+    return cart
+
+async def save_cart(user_id: str, items: List[dict]) -> dict:
+    await db.carts.update_one(
+        {"user_id": user_id},
+        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    await invalidation_bus.publish("cart", user_id)
+    generation = cart_cache.generation
+    cart = await price_cart(items)
+    cart_cache.set(user_id, cart, generation)
+    return cart
+
+async def load_cart_items(user_id: str) -> List[dict]:
+    stored = await db.carts.find_one({"user_id": user_id}, {"_id": 0, "items": 1})
+    return stored["items"] if stored else []
+
+@router.get("/cart", response_model=CartResponse)
+async def get_cart(user: dict = Depends(get_current_user)):
+    return await get_priced_cart(user["id"])
+
+@router.put("/cart", response_model=CartResponse)
+async def replace_cart(cart_data: CartUpdate, user: dict = Depends(get_current_user)):
+    items = merge_cart_items(cart_data.items)
+    # The storefront syncs its whole cart here, so count quantity increases as adds
+    previous = {line["product_id"]: line["quantity"] for line in (await get_priced_cart(user["id"]))["items"]}
+    for item in items:
+        added = item["quantity"] - previous.get(item["product_id"], 0)
+        if added > 0:
+            record_cart_add(item["product_id"], added)
+    return await save_cart(user["id"], items)
+
+@router.post("/cart/items", response_model=CartResponse)
+async def add_cart_item(item: CartItem, user: dict = Depends(get_current_user)):
+    record_cart_add(item.product_id, item.quantity)
+    items = await load_cart_items(user["id"])
+    for line in items:
+        if line["product_id"] == item.product_id:
+            line["quantity"] += item.quantity
+            break
+    else:
+        items.append({"product_id": item.product_id, "quantity": item.quantity})
+    return await save_cart(user["id"], items)
+
+@router.put("/cart/items/{product_id}", response_model=CartResponse)
+async def update_cart_item(product_id: str, quantity: int, user: dict = Depends(get_current_user)):
+    items = await load_cart_items(user["id"])
+    if quantity < 1:
+        items = [line for line in items if line["product_id"] != product_id]
+    else:
+        for line in items:
+            if line["product_id"] == product_id:
+                line["quantity"] = quantity
+                break
+        else:
+            raise HTTPException(status_code=404, detail="Item not in cart")
+    return await save_cart(user["id"], items)
+
+@router.delete("/cart/items/{product_id}", response_model=CartResponse)
+async def remove_cart_item(product_id: str, user: dict = Depends(get_current_user)):
+    items = await load_cart_items(user["id"])
+    items = [line for line in items if line["product_id"] != product_id]
+    return await save_cart(user["id"], items)
+
+@router.delete("/cart", response_model=CartResponse)
+async def clear_cart(user: dict = Depends(get_current_user)):
+    return await save_cart(user["id"], [])
+
+async def create_indexes():
+    await db.carts.create_index("user_id", unique=True)
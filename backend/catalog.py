@@ -0,0 +1,325 @@
+"""Products, facets and reviews"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Dict
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core import db, parse_fields, fields_projection, encode_cursor, decode_cursor, keyset_filter
+from money import to_cents, money_fields
+from models import ProductResponse, ProductDetailResponse, ProductCreate, ProductUpdate, ReviewResponse, ReviewPage, ReviewCreate
+from auth import get_admin_user, get_current_user
+from events import publish_low_stock
+from caching import facets_cache, invalidate_catalog, invalidate_ratings
+from stats import record_view, popularity_stages
+from currency import product_prices
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# ===================== PRODUCT ROUTES =====================
+
+# `image` is the first entry of `images`, for cards that only show one
+PRODUCT_FIELDS = set(ProductResponse.model_fields) | {"image"}
+RATING_FIELDS = {"average_rating", "review_count"}
+PRODUCT_SORTS = {"popular"}
+
+@router.get("/products", response_model=List[ProductResponse])
+async def get_products(category: Optional[str] = None, featured: Optional[bool] = None, fields: Optional[str] = None, sort: Optional[str] = None):
+    selected = parse_fields(fields, PRODUCT_FIELDS)
+    if sort is not None and sort not in PRODUCT_SORTS:
+        raise HTTPException(status_code=400, detail="Invalid sort")
+    products = await list_products(category, featured, selected, sort=sort)
+    if selected is None:
+        return products
+    return JSONResponse(jsonable_encoder(products))
+
+async def list_products(category: Optional[str], featured: Optional[bool], selected: Optional[List[str]], limit: int = 100, sort: Optional[str] = None) -> List[dict]:
+    match_stage = {}
+    if category:
+        match_stage["category"] = category
+    if featured is not None:
+        match_stage["featured"] = featured
+    
+    pipeline = [{"$match": match_stage} if match_stage else {"$match": {}}]
+    if sort == "popular":
+        pipeline += popularity_stages()
+    pipeline.append({"$limit": limit})
+    if selected is None or RATING_FIELDS & set(selected):
+        # From the counters create_review maintains, so listing cost doesn't grow with reviews
+        review_count = {"$ifNull": ["$review_count", 0]}
+        pipeline.append({
+            "$addFields": {
+                "review_count": review_count,
+                "average_rating": {
+                    "$cond": {
+                        "if": {"$gt": [review_count, 0]},
+                        "then": {"$divide": [{"$ifNull": ["$rating_sum", 0]}, review_count]},
+                        "else": 0.0
+                    }
+                }
+            }
+        })
+    if selected is None:
+        pipeline.append({"$project": {"_id": 0}})
+    else:
+        projection = fields_projection(selected)
+        if "image" in projection:
+            projection["image"] = {"$arrayElemAt": ["$images", 0]}
+        pipeline.append({"$project": projection})
+    return await db.products.aggregate(pipeline).to_list(limit)
+
+FACET_COUNTS = {
+    "count": {"$sum": 1},
+    "in_stock": {"$sum": {"$cond": [{"$gt": ["$stock", 0]}, 1, 0]}},
+    "min_price_bbd": {"$min": "$price_bbd"},
+    "max_price_bbd": {"$max": "$price_bbd"},
+    "min_price_usd": {"$min": "$price_usd"},
+    "max_price_usd": {"$max": "$price_usd"}
+}
+
+def facet_summary(bucket: dict) -> dict:
+    return {
+        "count": bucket["count"],
+        "in_stock": bucket["in_stock"],
+        "price_bbd": {"min": bucket["min_price_bbd"], "max": bucket["max_price_bbd"]},
+        "price_usd": {"min": bucket["min_price_usd"], "max": bucket["max_price_usd"]}
+    }
+
+async def load_product_facets() -> dict:
+    cached = facets_cache.get("all")
+    if cached is not None:
+        return cached
+    generation = facets_cache.generation
+    pipeline = [{"$facet": {
+        "categories": [{"$group": {"_id": "$category", **FACET_COUNTS}}, {"$sort": {"_id": 1}}],
+        "overall": [{"$group": {"_id": None, **FACET_COUNTS}}],
+        # Whole stars of the average rating; null for products without reviews
+        "ratings": [{"$group": {
+            "_id": {"$cond": [
+                {"$gt": ["$review_count", 0]},
+                {"$floor": {"$divide": ["$rating_sum", "$review_count"]}},
+                None
+            ]},
+            "count": {"$sum": 1}
+        }}]
+    }}]
+    result = (await db.products.aggregate(pipeline).to_list(1))[0]
+    
+    stars = {int(bucket["_id"]): bucket["count"] for bucket in result["ratings"] if bucket["_id"] is not None}
+    empty = {"count": 0, "in_stock": 0, "price_bbd": {"min": None, "max": None}, "price_usd": {"min": None, "max": None}}
+    facets = {
+        **(facet_summary(result["overall"][0]) if result["overall"] else empty),
+        "categories": [{"category": bucket["_id"], **facet_summary(bucket)} for bucket in result["categories"]],
+        # "4 stars & up" style buckets
+        "ratings": [
+            {"min_rating": star, "count": sum(count for s, count in stars.items() if s >= star)}
+            for star in range(4, 0, -1)
+        ],
+        "unrated": sum(bucket["count"] for bucket in result["ratings"] if bucket["_id"] is None)
+    }
+    facets_cache.set("all", facets, generation)
+    return facets
+
+@router.get("/products/facets")
+async def get_product_facets():
+    return await load_product_facets()
+
+@router.get("/products/{product_id}", response_model=ProductResponse)
+async def get_product(product_id: str):
+    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    apply_rating_stats(product)
+    return product
+
+@router.get("/products/{product_id}/detail", response_model=ProductDetailResponse)
+async def get_product_detail(product_id: str, sort: str = "newest", limit: int = 10):
+    """Product, rating histogram and the first page of reviews in one request"""
+    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    record_view(product_id)
+    histogram = apply_rating_stats(product)
+    reviews = await fetch_review_page(product_id, sort, limit, None)
+    return {"product": product, "rating_histogram": histogram, "reviews": reviews}
+
+@router.post("/admin/products", response_model=ProductResponse)
+async def create_product(product_data: ProductCreate, admin: dict = Depends(get_admin_user)):
+    product_id = str(uuid.uuid4())
+    product = {
+        "id": product_id,
+        **product_data.model_dump(),
+        **(await product_prices(product_data.price_bbd, product_data.price_usd)),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "average_rating": 0.0,
+        "review_count": 0,
+        "rating_sum": 0,
+        "rating_histogram": empty_rating_histogram()
+    }
+    await db.products.insert_one(product)
+    await invalidate_catalog()
+    return product
+
+@router.put("/admin/products/{product_id}", response_model=ProductResponse)
+async def update_product(product_id: str, product_data: ProductUpdate, admin: dict = Depends(get_admin_user)):
+    update_data = {k: v for k, v in product_data.model_dump().items() if v is not None}
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No data to update")
+    if "price_bbd" in update_data:
+        update_data.update(await product_prices(update_data["price_bbd"], update_data.get("price_usd")))
+    elif "price_usd" in update_data:
+        update_data.update(money_fields("price_usd", to_cents(update_data["price_usd"])))
+        update_data["prices.USD"] = update_data["price_usd"]
+    
+    result = await db.products.update_one({"id": product_id}, {"$set": update_data})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await invalidate_catalog()
+    
+    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    if "stock" in update_data:
+        await publish_low_stock(product)
+    apply_rating_stats(product)
+    return product
+
+@router.delete("/admin/products/{product_id}")
+async def delete_product(product_id: str, admin: dict = Depends(get_admin_user)):
+    result = await db.products.delete_one({"id": product_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await invalidate_catalog()
+    return {"message": "Product deleted"}
+
+# ===================== REVIEW ROUTES =====================
+
+REVIEW_PAGE_MAX = 50
+
+# Keyset ordering per sort mode: (field, direction) pairs ending in a unique tie-breaker
+REVIEW_SORTS = {
+    "newest": [("created_at", -1), ("id", -1)],
+    "highest": [("rating", -1), ("created_at", -1), ("id", -1)],
+    "lowest": [("rating", 1), ("created_at", -1), ("id", -1)],
+}
+
+def empty_rating_histogram() -> Dict[str, int]:
+    return {str(star): 0 for star in range(1, 6)}
+
+def apply_rating_stats(product: dict) -> Dict[str, int]:
+    """Fill average_rating/review_count from the stored counters; returns the histogram"""
+    review_count = product.get("review_count", 0)
+    product["average_rating"] = product.get("rating_sum", 0) / review_count if review_count else 0.0
+    product["review_count"] = review_count
+    return product.get("rating_histogram") or empty_rating_histogram()
+
+async def backfill_rating_stats() -> int:
+    """Count the reviews of products stored before rating_histogram existed (run once)"""
+    updated = 0
+    async for product in db.products.find({"rating_histogram": {"$exists": False}}, {"_id": 0, "id": 1}):
+        histogram = empty_rating_histogram()
+        async for bucket in db.reviews.aggregate([
+            {"$match": {"product_id": product["id"]}},
+            {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
+        ]):
+            histogram[str(bucket["_id"])] = bucket["count"]
+        result = await db.products.update_one(
+            {"id": product["id"], "rating_histogram": {"$exists": False}},
+            {"$set": {
+                "rating_histogram": histogram,
+                "review_count": sum(histogram.values()),
+                "rating_sum": sum(int(star) * count for star, count in histogram.items())
+            }}
+        )
+        updated += result.modified_count
+    return updated
+
+REVIEW_CURSOR_FIELDS = ["rating", "created_at", "id"]
+
+async def fetch_review_page(product_id: str, sort: str, limit: int, cursor: Optional[str]) -> dict:
+    sort_keys = REVIEW_SORTS.get(sort)
+    if not sort_keys:
+        raise HTTPException(status_code=400, detail="Invalid sort")
+    limit = max(1, min(limit, REVIEW_PAGE_MAX))
+    
+    query = {"product_id": product_id}
+    if cursor:
+        query.update(keyset_filter(sort_keys, decode_cursor(cursor, REVIEW_CURSOR_FIELDS)))
+    
+    # Fetch one extra row to learn whether another page exists
+    reviews = await db.reviews.find(query, {"_id": 0}).sort(sort_keys).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(reviews[limit - 1], REVIEW_CURSOR_FIELDS) if len(reviews) > limit else None
+    return {"items": reviews[:limit], "next_cursor": next_cursor}
+
+@router.get("/products/{product_id}/reviews", response_model=List[ReviewResponse])
+async def get_product_reviews(product_id: str):
+    reviews = await db.reviews.find({"product_id": product_id}, {"_id": 0}).sort(REVIEW_SORTS["newest"]).to_list(100)
+    return reviews
+
+@router.get("/products/{product_id}/reviews/page", response_model=ReviewPage)
+async def get_product_review_page(product_id: str, sort: str = "newest", limit: int = 10, cursor: Optional[str] = None):
+    return await fetch_review_page(product_id, sort, limit, cursor)
+
+@router.post("/products/{product_id}/reviews", response_model=ReviewResponse)
+async def create_review(product_id: str, review_data: ReviewCreate, user: dict = Depends(get_current_user)):
+    product = await db.products.find_one({"id": product_id})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    existing = await db.reviews.find_one({"product_id": product_id, "user_id": user["id"]})
+    if existing:
+        raise HTTPException(status_code=400, detail="You already reviewed this product")
+    
+    review_id = str(uuid.uuid4())
+    review = {
+        "id": review_id,
+        "product_id": product_id,
+        "user_id": user["id"],
+        "user_name": f"{user['first_name']} {user['last_name'][0]}.",
+        "rating": review_data.rating,
+        "comment": review_data.comment,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.reviews.insert_one(review)
+    # Products without a histogram yet get this review from backfill_rating_stats
+    await db.products.update_one(
+        {"id": product_id, "rating_histogram": {"$exists": True}},
+        {"$inc": {
+            f"rating_histogram.{review_data.rating}": 1,
+            "review_count": 1,
+            "rating_sum": review_data.rating
+        }}
+    )
+    await invalidate_ratings(product_id)
+    return review
+
+async def create_indexes():
+    await db.reviews.create_index([("product_id", 1), ("created_at", -1), ("id", -1)])
+    await db.reviews.create_index([("product_id", 1), ("rating", -1), ("created_at", -1), ("id", -1)])
+    await db.reviews.create_index([("product_id", 1), ("rating", 1), ("created_at", -1), ("id", -1)])
+    await db.reviews.create_index([("product_id", 1), ("user_id", 1)])
+
+async def main():
+    import argparse
+    from config import Settings
+    import core
+
+    parser = argparse.ArgumentParser(description="Catalog maintenance")
+    parser.add_argument("--backfill-ratings", action="store_true", help="Build rating counters for products that lack them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    core.configure(Settings.from_env())
+    try:
+        if args.backfill_ratings:
+            logger.info(f"Products backfilled: {await backfill_rating_stats()}")
+    finally:
+        core.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""Typed configuration for the API.
+
+Settings.from_env() reads the environment (and backend/.env) once, and the
+result is passed to server.create_app(). Field names are the lower-cased
+environment variable names, so ADMISSION_CAPACITY=32 sets admission_capacity.
+Tests build a Settings directly instead of patching os.environ.
+"""
+import os
+from pathlib import Path
+from typing import Mapping, Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+ROOT_DIR = Path(__file__).parent
+
+class ConfigError(Exception):
+    pass
+
+class Settings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    mongo_url: str
+    db_name: str
+    jwt_secret: str = "perennia-secret-key-2024"
+    # Cost of new password hashes; tests lower it
+    bcrypt_rounds: int = 12
+    cors_origins: str = "*"
+
+    # Payments ("stripe", or "fake" for the in-memory gateway)
+    payment_provider: str = "stripe"
+    stripe_api_key: str = ""
+    payment_timeout_seconds: float = 10
+    payment_breaker_threshold: int = 5
+    payment_breaker_reset_seconds: float = 30
+    payment_reconcile_after_minutes: int = 15
+    # 0 disables the in-process reconciler
+    payment_reconcile_interval: float = 300
+    payment_reconcile_concurrency: int = 8
+
+    reservation_ttl_minutes: int = 30
+    reservation_sweep_interval: float = 15
+    low_stock_threshold: int = 5
+    admin_notify_email: str = ""
+
+    # "local", "mongo" or "changestream"
+    event_bus_transport: str = "local"
+    cache_bus_transport: str = "local"
+    cache_max_staleness: float = 60
+
+    admission_capacity: int = 64
+    admission_target_delay_ms: float = 50
+
+    # Upper bound on how many seconds of view/add-to-cart counts a crash can lose
+    product_stats_flush_interval: float = 10
+    # Seconds between incremental "customers also bought" refreshes; 0 disables
+    related_refresh_interval: float = 900
+
+    # Delivered and cancelled orders older than this move to orders_archive
+    archive_orders_after_days: int = 180
+    # Seconds between archive runs; 0 disables
+    archive_interval: float = 86400
+    # Contact messages are deleted by a TTL index after this many days; 0 keeps them
+    contact_retention_days: int = 0
+
+    # "json" or "text"
+    log_format: str = "json"
+    log_level: str = "INFO"
+    # Share of requests that get an access log record, overridable per route
+    log_sample_rate: float = 1.0
+    log_route_sample_rates: str = ""
+    # Slower requests are always logged
+    log_slow_ms: float = 1000
+
+    # POST /api/admin/synthetic only writes to databases whose name starts with
+    # this; empty means "<db_name>_synthetic"
+    synthetic_db_prefix: str = ""
+
+    run_job_worker: bool = True
+    job_worker_concurrency: int = 4
+    # Outgoing email; with no host, emails are logged and dropped
+    smtp_host: str = ""
+    smtp_port: int = 25
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_starttls: bool = False
+    smtp_from: str = "Perennia <no-reply@perennia.bb>"
+
+    # Stack sampling period of admin-requested request profiles
+    profile_sample_interval_ms: float = 2
+    # Injected into the fake payment gateway (PAYMENT_PROVIDER=fake)
+    payment_fake_latency_ms: float = 0
+    payment_fake_failure_rate: float = 0
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None, env_file: Optional[Path] = ROOT_DIR / ".env") -> "Settings":
+        if environ is None:
+            if env_file is not None:
+                # Imported here so building Settings by hand never pays for it
+                from dotenv import load_dotenv
+                load_dotenv(env_file)
+            environ = os.environ
+        values = {name: environ[name.upper()] for name in cls.model_fields if name.upper() in environ}
+        missing = [name.upper() for name, field in cls.model_fields.items() if field.is_required() and name not in values]
+        if missing:
+            raise ConfigError(f"Missing required settings: {', '.join(missing)}")
+        try:
+            return cls(**values)
+        except ValidationError as e:
+            raise ConfigError(str(e)) from e
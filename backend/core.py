@@ -0,0 +1,107 @@
+"""Process-wide state shared by the route modules.
+
+`settings`, `client` and `db` are placeholders until server.create_app()
+calls configure(), so importing a route module never needs MONGO_URL or
+opens a connection. They forward attribute and item access to the real
+objects, which keeps call sites as plain `db.orders.find(...)`.
+"""
+import json
+import base64
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from config import Settings
+from jobs import JobQueue
+
+class Bound:
+    """Forwards to the object installed with bind(); fails loudly before that"""
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_target", None)
+
+    def bind(self, target):
+        object.__setattr__(self, "_target", target)
+
+    def _resolve(self):
+        target = object.__getattribute__(self, "_target")
+        if target is None:
+            raise RuntimeError(f"{object.__getattribute__(self, '_name')} used before create_app() configured it")
+        return target
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, key):
+        return self._resolve()[key]
+
+settings = Bound("settings")
+client = Bound("client")
+db = Bound("db")
+job_queue = JobQueue(db)
+
+def configure(app_settings: Settings, mongo_client=None):
+    """Install settings and the Mongo client; `mongo_client` lets tests pass their own"""
+    if mongo_client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from profiling import mongo_command_listener
+        mongo_client = AsyncIOMotorClient(app_settings.mongo_url, event_listeners=[mongo_command_listener])
+    settings.bind(app_settings)
+    client.bind(mongo_client)
+    db.bind(mongo_client[app_settings.db_name])
+
+# ===================== QUERY HELPERS =====================
+
+def without_mongo_id(doc: dict) -> dict:
+    """Copy of a document after insert_one, minus the ObjectId it gained"""
+    return {k: v for k, v in doc.items() if k != "_id"}
+
+def parse_fields(fields: Optional[str], allowed: set) -> Optional[List[str]]:
+    """Validate a comma separated `fields=` parameter; None means all fields.
+
+    Listings that honour it return the documents as-is instead of running
+    them through the response model, since omitted fields would fail validation.
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id"] + requested))
+
+def fields_projection(selected: List[str]) -> dict:
+    return {"_id": 0, **{field: 1 for field in selected}}
+
+def encode_cursor(doc: dict, fields: List[str]) -> str:
+    raw = json.dumps([doc[field] for field in fields])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str, fields: List[str]) -> dict:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return dict(zip(fields, values))
+
+def keyset_filter(sort_keys: List[tuple], last: dict) -> dict:
+    """Match documents strictly after `last` in the given compound ordering"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort_keys):
+        clause = {prev: last[prev] for prev, _ in sort_keys[:i]}
+        clause[field] = {"$lt" if direction < 0 else "$gt": last[field]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+def archive_of(collection):
+    """The cold-tier twin of a collection that archive.py moves old documents into"""
+    return db[f"{collection.name}_archive"]
+
+async def find_one_or_archived(collection, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+    """find_one on the hot collection, then on its archive"""
+    doc = await collection.find_one(query, projection)
+    if doc is None:
+        doc = await archive_of(collection).find_one(query, projection)
+    return doc
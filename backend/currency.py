@@ -0,0 +1,128 @@
+"""Currency rates and catalog repricing.
+
+Prices are entered in BBD. Every other currency comes from the rates table
+(`currency_rates`, one document per code): the rate per 1 BBD and a rounding
+rule. Products carry the converted amounts in a `prices` map, written when a
+product is saved and by the admin reprice action, so catalog reads serve any
+configured currency without converting per request. `price_usd` is kept equal
+to prices["USD"] (and `price_usd_cents` to its cents) for the checkout
+and order paths.
+"""
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP, ROUND_CEILING, ROUND_FLOOR
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException
+from pymongo import UpdateOne
+
+from core import db
+from money import to_cents, from_cents, cents_of, money_fields
+from models import CurrencyRate
+from auth import get_admin_user
+from caching import currency_cache, invalidation_bus, invalidate_catalog
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+BASE_CURRENCY = "BBD"
+# Stripe charges in USD, so every rates table must price it
+CHARGE_CURRENCY = "USD"
+REPRICE_BATCH = 500
+ROUNDING_MODES = {"nearest": ROUND_HALF_UP, "up": ROUND_CEILING, "down": ROUND_FLOOR}
+# Used until an admin saves a table; BBD is pegged to USD at 2:1
+DEFAULT_RATES = [
+    {"code": "USD", "rate": 0.5, "symbol": "$", "increment": 0.01, "rounding": "nearest"},
+    {"code": "EUR", "rate": 0.46, "symbol": "€", "increment": 0.05, "rounding": "nearest"},
+    {"code": "GBP", "rate": 0.39, "symbol": "£", "increment": 0.05, "rounding": "nearest"},
+    {"code": "CAD", "rate": 0.68, "symbol": "$", "increment": 0.05, "rounding": "nearest"}
+]
+
+def convert(amount_bbd: float, rule: dict) -> float:
+    """BBD amount in the rule's currency, rounded to its increment"""
+    increment = Decimal(str(rule["increment"]))
+    raw = Decimal(str(amount_bbd)) * Decimal(str(rule["rate"]))
+    steps = (raw / increment).quantize(Decimal(1), rounding=ROUNDING_MODES[rule["rounding"]])
+    return float(steps * increment)
+
+def price_map(price_bbd: float, rates: Dict[str, dict]) -> Dict[str, float]:
+    return {BASE_CURRENCY: price_bbd, **{code: convert(price_bbd, rule) for code, rule in rates.items()}}
+
+async def load_rates() -> Dict[str, dict]:
+    """Configured currencies by code, from the per-worker cache"""
+    cached = currency_cache.get("rates")
+    if cached is not None:
+        return cached
+    generation = currency_cache.generation
+    stored = await db.currency_rates.find({}, {"_id": 0}).sort("code", 1).to_list(100)
+    rates = {rule["code"]: rule for rule in (stored or DEFAULT_RATES)}
+    currency_cache.set("rates", rates, generation)
+    return rates
+
+async def product_prices(price_bbd: float, price_usd: float = None) -> dict:
+    """Stored price fields for a product saved at `price_bbd`.
+
+    An explicit `price_usd` overrides the converted USD amount until the
+    next catalog reprice.
+    """
+    price_bbd_cents = to_cents(price_bbd)
+    prices = price_map(from_cents(price_bbd_cents), await load_rates())
+    if price_usd is not None:
+        prices["USD"] = from_cents(to_cents(price_usd))
+    fields = {"prices": prices, **money_fields("price_bbd", price_bbd_cents)}
+    if "USD" in prices:
+        fields.update(money_fields("price_usd", to_cents(prices["USD"])))
+    return fields
+
+@router.get("/currencies")
+async def get_currencies():
+    rates = await load_rates()
+    return [{"code": BASE_CURRENCY, "rate": 1.0, "symbol": "$", "increment": 0.01, "rounding": "nearest"}, *rates.values()]
+
+@router.get("/admin/currencies", response_model=List[CurrencyRate])
+async def get_currency_rates(admin: dict = Depends(get_admin_user)):
+    return list((await load_rates()).values())
+
+@router.put("/admin/currencies", response_model=List[CurrencyRate])
+async def replace_currency_rates(rates: List[CurrencyRate], admin: dict = Depends(get_admin_user)):
+    """Replace the rates table. Stored product prices change on the next reprice."""
+    if CHARGE_CURRENCY not in {rate.code for rate in rates}:
+        raise HTTPException(status_code=422, detail=f"The rates table must include {CHARGE_CURRENCY}, the checkout currency")
+    now = datetime.now(timezone.utc).isoformat()
+    documents = [{**rate.model_dump(), "updated_at": now} for rate in rates if rate.code != BASE_CURRENCY]
+    await db.currency_rates.delete_many({"code": {"$nin": [rate["code"] for rate in documents]}})
+    if documents:
+        await db.currency_rates.bulk_write(
+            [UpdateOne({"code": rate["code"]}, {"$set": rate}, upsert=True) for rate in documents],
+            ordered=False
+        )
+    await invalidation_bus.publish("currency")
+    return documents
+
+@router.post("/admin/products/reprice")
+async def reprice_catalog(admin: dict = Depends(get_admin_user)):
+    """Recompute every product's `prices` from the current rates table"""
+    rates = await load_rates()
+    now = datetime.now(timezone.utc).isoformat()
+    repriced = 0
+    batch = []
+    async for product in db.products.find({}, {"_id": 0, "id": 1, "price_bbd": 1, "price_bbd_cents": 1}):
+        prices = price_map(from_cents(cents_of(product, "price_bbd")), rates)
+        update = {"prices": prices, "repriced_at": now}
+        if "USD" in prices:
+            update.update(money_fields("price_usd", to_cents(prices["USD"])))
+        batch.append(UpdateOne({"id": product["id"]}, {"$set": update}))
+        if len(batch) >= REPRICE_BATCH:
+            await db.products.bulk_write(batch, ordered=False)
+            repriced += len(batch)
+            batch = []
+    if batch:
+        await db.products.bulk_write(batch, ordered=False)
+        repriced += len(batch)
+    await invalidate_catalog()
+    logger.info(f"Repriced {repriced} products into {', '.join(rates)}")
+    return {"repriced": repriced, "currencies": [BASE_CURRENCY, *rates]}
+
+async def create_indexes():
+    await db.currency_rates.create_index("code", unique=True)
@@ -0,0 +1,159 @@
+"""Admin event bus and the transports that carry events between workers"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from core import db, settings
+
+logger = logging.getLogger(__name__)
+
+# ===================== EVENT BUS =====================
+
+# Admin-facing events (new orders, payments, low stock, ...) are published to an
+# in-process broker that fans out to SSE subscribers. A transport carries them
+# to the other workers: "local" for a single process, "mongo" to share them via
+# a tailed capped collection.
+EVENT_QUEUE_SIZE = 100
+EVENT_HEARTBEAT_SECONDS = 20
+WORKER_ID = str(uuid.uuid4())
+
+class LocalEventTransport:
+    """Single-process deployments: nothing to forward"""
+
+    async def publish(self, event: dict):
+        pass
+
+    async def run(self, deliver):
+        pass
+
+class CappedCollectionTransport:
+    """Fan out through a capped collection that every worker tails"""
+
+    def __init__(self, collection_name: str, size_bytes: int = 16 * 1024 * 1024):
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+
+    @property
+    def collection(self):
+        return db[self.collection_name]
+
+    async def publish(self, event: dict):
+        await self.collection.insert_one({"origin": WORKER_ID, "event": event})
+
+    async def run(self, deliver):
+        try:
+            await db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        # Only deliver what is published from now on
+        latest = await self.collection.find_one({}, sort=[("$natural", -1)])
+        last_id = latest["_id"] if latest else ObjectId.from_datetime(datetime.now(timezone.utc))
+        while True:
+            cursor = self.collection.find({"_id": {"$gt": last_id}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for doc in cursor:
+                    last_id = doc["_id"]
+                    if doc["origin"] != WORKER_ID:
+                        deliver(doc["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event transport {self.collection_name} tail failed: {e}")
+            # Tailable cursors die when the collection is empty or rolls over
+            await asyncio.sleep(1)
+
+class ChangeStreamTransport:
+    """Fan out through a change stream on a plain collection (needs a replica set; one node is enough)"""
+
+    def __init__(self, collection_name: str, retention_seconds: int = 3600):
+        self.collection_name = collection_name
+        self.retention_seconds = retention_seconds
+
+    @property
+    def collection(self):
+        return db[self.collection_name]
+
+    async def publish(self, event: dict):
+        await self.collection.insert_one({
+            "origin": WORKER_ID,
+            "event": event,
+            "created_at": datetime.now(timezone.utc)
+        })
+
+    async def run(self, deliver):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.retention_seconds)
+        resume_token = None
+        while True:
+            try:
+                pipeline = [{"$match": {"operationType": "insert"}}]
+                async with self.collection.watch(pipeline, resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        doc = change["fullDocument"]
+                        if doc["origin"] != WORKER_ID:
+                            deliver(doc["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event transport {self.collection_name} change stream failed: {e}")
+                await asyncio.sleep(1)
+
+class EventBroker:
+    def __init__(self, transport):
+        self.transport = transport
+        self.subscribers: set = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def deliver(self, event: dict):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and tell it to refetch instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"id": event["id"], "type": "resync", "data": {}})
+
+    async def publish(self, event_type: str, data: dict):
+        event = {
+            "id": str(uuid.uuid4()),
+            "type": event_type,
+            "data": jsonable_encoder(data),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        self.deliver(event)
+        try:
+            await self.transport.publish(event)
+        except Exception as e:
+            logger.error(f"Failed to forward {event_type} event: {e}")
+
+def make_event_transport(name: str, collection_name: str):
+    if name == "mongo":
+        return CappedCollectionTransport(collection_name)
+    if name == "changestream":
+        return ChangeStreamTransport(collection_name)
+    return LocalEventTransport()
+
+# create_app() swaps in the transport named by EVENT_BUS_TRANSPORT
+event_broker = EventBroker(LocalEventTransport())
+
+async def publish_low_stock(product: dict):
+    if product.get("stock", 0) <= settings.low_stock_threshold:
+        await event_broker.publish("low_stock", {
+            "product_id": product["id"],
+            "name": product.get("name"),
+            "stock": product["stock"]
+        })
@@ -0,0 +1,141 @@
+"""In-memory stand-in for the Stripe checkout integration.
+
+Selected with PAYMENT_PROVIDER=fake. It mirrors the StripeCheckout methods the
+API uses and can inject latency and failures, so timeouts, the circuit breaker
+and reconciliation can be exercised without a network:
+
+    PAYMENT_FAKE_LATENCY_MS=200 PAYMENT_FAKE_FAILURE_RATE=0.3
+
+Tests can also drive it directly through FakePaymentGateway.faults and
+FakePaymentGateway.complete().
+"""
+import json
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+class FakeGatewayError(Exception):
+    pass
+
+@dataclass
+class FakeSessionRequest:
+    """Same fields as the Stripe integration's CheckoutSessionRequest"""
+    amount: float
+    currency: str
+    success_url: str
+    cancel_url: str
+    metadata: Optional[Dict[str, str]] = None
+
+@dataclass
+class FakeSession:
+    session_id: str
+    url: str
+    amount: float
+    currency: str
+    metadata: Dict[str, str]
+    status: str = "open"
+    payment_status: str = "unpaid"
+
+@dataclass
+class FakeCheckoutStatus:
+    status: str
+    payment_status: str
+    amount_total: int
+    currency: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class FakeWebhookEvent:
+    event_type: str
+    session_id: str
+    payment_status: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class FaultConfig:
+    latency: float = 0
+    failure_rate: float = 0
+    # Fail this many upcoming calls outright, then behave normally
+    fail_next: int = 0
+    # Never answer: for exercising deadlines
+    hang: bool = False
+
+class FakePaymentGateway:
+    sessions: Dict[str, FakeSession] = {}
+    faults = FaultConfig()
+    calls = 0
+
+    def __init__(self, api_key: str = "", webhook_url: str = ""):
+        self.webhook_url = webhook_url
+
+    @classmethod
+    def reset(cls):
+        cls.sessions = {}
+        cls.faults = FaultConfig()
+        cls.calls = 0
+
+    @classmethod
+    def configure(cls, latency: float, failure_rate: float):
+        """Standing faults from PAYMENT_FAKE_LATENCY_MS and PAYMENT_FAKE_FAILURE_RATE"""
+        cls.faults = FaultConfig(latency=latency, failure_rate=failure_rate)
+
+    @classmethod
+    def complete(cls, session_id: str, payment_status: str = "paid"):
+        """Simulate the customer finishing (or abandoning) checkout"""
+        session = cls.sessions[session_id]
+        session.payment_status = payment_status
+        session.status = "complete" if payment_status == "paid" else "expired"
+
+    async def _upstream(self):
+        FakePaymentGateway.calls += 1
+        faults = FakePaymentGateway.faults
+        if faults.hang:
+            await asyncio.Event().wait()
+        if faults.latency:
+            await asyncio.sleep(faults.latency)
+        if faults.fail_next > 0:
+            faults.fail_next -= 1
+            raise FakeGatewayError("Injected failure")
+        if faults.failure_rate and random.random() < faults.failure_rate:
+            raise FakeGatewayError("Injected random failure")
+
+    async def create_checkout_session(self, request) -> FakeSession:
+        await self._upstream()
+        session_id = f"cs_fake_{uuid.uuid4().hex}"
+        session = FakeSession(
+            session_id=session_id,
+            url=f"https://checkout.fake/{session_id}",
+            amount=request.amount,
+            currency=request.currency,
+            metadata=dict(request.metadata or {})
+        )
+        FakePaymentGateway.sessions[session_id] = session
+        return session
+
+    async def get_checkout_status(self, session_id: str) -> FakeCheckoutStatus:
+        await self._upstream()
+        session = FakePaymentGateway.sessions.get(session_id)
+        if not session:
+            raise FakeGatewayError(f"No such checkout session: {session_id}")
+        return FakeCheckoutStatus(
+            status=session.status,
+            payment_status=session.payment_status,
+            amount_total=int(round(session.amount * 100)),
+            currency=session.currency,
+            metadata=session.metadata
+        )
+
+    async def handle_webhook(self, body: bytes, signature: Optional[str]) -> FakeWebhookEvent:
+        """Accepts {"session_id": ...} and reports that session's current state"""
+        payload = json.loads(body)
+        session = FakePaymentGateway.sessions.get(payload.get("session_id", ""))
+        if not session:
+            raise FakeGatewayError("Unknown session in webhook")
+        return FakeWebhookEvent(
+            event_type="checkout.session.completed",
+            session_id=session.session_id,
+            payment_status=session.payment_status,
+            metadata=session.metadata
+        )
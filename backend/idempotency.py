@@ -0,0 +1,118 @@
+"""Idempotency-Key handling for replayable POSTs"""
+import json
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+from core import db, without_mongo_id
+
+# Replayable POSTs store their first response under the caller's Idempotency-Key.
+# Mongo is the source of truth (shared by all workers, expired by a TTL index);
+# a small in-process LRU answers the common immediate-retry case without a query.
+# An attempt holds its key for IDEMPOTENCY_LEASE_SECONDS; if its worker dies
+# mid-request, a retry after that takes the key over instead of getting 409s
+# until the record expires.
+IDEMPOTENCY_TTL_SECONDS = 86400
+IDEMPOTENCY_LEASE_SECONDS = 60
+IDEMPOTENCY_CACHE_SIZE = 1024
+IDEMPOTENCY_CACHE_SECONDS = 600
+# key -> (record, cached_at)
+_idempotency_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+def request_fingerprint(payload: BaseModel) -> str:
+    canonical = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _remember_idempotent(key: str, record: dict):
+    _idempotency_cache[key] = (record, time.monotonic())
+    _idempotency_cache.move_to_end(key)
+    while len(_idempotency_cache) > IDEMPOTENCY_CACHE_SIZE:
+        _idempotency_cache.popitem(last=False)
+
+def _cached_idempotent(key: str) -> Optional[dict]:
+    entry = _idempotency_cache.get(key)
+    if entry is None:
+        return None
+    record, cached_at = entry
+    if time.monotonic() - cached_at > IDEMPOTENCY_CACHE_SECONDS:
+        del _idempotency_cache[key]
+        return None
+    return record
+
+def _replay(record: dict, fingerprint: str):
+    if record["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return record["response"]
+
+async def run_idempotent(idempotency_key: Optional[str], scope: str, payload: BaseModel, handler):
+    """Run `handler` once per (scope, key); replays return the stored response.
+
+    Failed attempts (HTTPException or otherwise) release the key so the client
+    can retry with the same one; an attempt whose worker died releases it when
+    its lease runs out.
+    """
+    if not idempotency_key:
+        return await handler()
+    
+    key = f"{scope}:{idempotency_key}"
+    fingerprint = request_fingerprint(payload)
+    cached = _cached_idempotent(key)
+    if cached:
+        return _replay(cached, fingerprint)
+    
+    now = datetime.now(timezone.utc)
+    attempt = str(uuid.uuid4())
+    try:
+        await db.idempotency_keys.insert_one({
+            "key": key,
+            "fingerprint": fingerprint,
+            "status": "in_progress",
+            "attempt": attempt,
+            "started_at": now,
+            "created_at": now
+        })
+    except DuplicateKeyError:
+        record = await db.idempotency_keys.find_one({"key": key}, {"_id": 0})
+        if not record:
+            raise HTTPException(status_code=409, detail="Request is being retried, please try again")
+        if record["status"] != "completed" and record["fingerprint"] == fingerprint:
+            taken_over = await db.idempotency_keys.find_one_and_update(
+                {
+                    "key": key,
+                    "status": "in_progress",
+                    "started_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)}
+                },
+                {"$set": {"attempt": attempt, "started_at": now}}
+            )
+            if not taken_over:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        else:
+            response = _replay(record, fingerprint)
+            _remember_idempotent(key, record)
+            return response
+    
+    try:
+        result = await handler()
+    except BaseException:
+        await db.idempotency_keys.delete_one({"key": key, "attempt": attempt, "status": "in_progress"})
+        raise
+    
+    response = jsonable_encoder(without_mongo_id(result))
+    await db.idempotency_keys.update_one(
+        {"key": key},
+        {"$set": {"status": "completed", "response": response}}
+    )
+    _remember_idempotent(key, {"fingerprint": fingerprint, "response": response})
+    return response
+
+async def create_indexes():
+    await db.idempotency_keys.create_index("key", unique=True)
+    await db.idempotency_keys.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
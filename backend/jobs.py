@@ -0,0 +1,252 @@
+"""Mongo-backed background jobs.
+
+Request handlers enqueue work and return; a JobWorker claims jobs under a
+lease, runs them with bounded concurrency and retries failures with
+exponential backoff. The worker runs inside the API process (RUN_JOB_WORKER)
+or standalone:
+
+    python jobs.py
+"""
+import os
+import asyncio
+import logging
+import random
+import smtplib
+import uuid
+from datetime import datetime, timezone, timedelta
+from email.message import EmailMessage
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = 60
+JOB_POLL_INTERVAL = 2.0
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_BASE = 5
+JOB_BACKOFF_MAX = 3600
+# Finished jobs are kept this long before the TTL index removes them
+JOB_RETENTION_SECONDS = 7 * 86400
+
+_handlers: Dict[str, dict] = {}
+
+def job_handler(job_type: str, concurrency: Optional[int] = None):
+    """Register `fn(payload)` as the handler for `job_type`.
+
+    `concurrency` caps how many jobs of this type one worker runs at once.
+    """
+    def register(fn: Callable):
+        _handlers[job_type] = {"fn": fn, "concurrency": concurrency}
+        return fn
+    return register
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_BASE * 2 ** (attempts - 1), JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+class JobQueue:
+    def __init__(self, db, collection_name: str = "jobs"):
+        self.db = db
+        self.collection_name = collection_name
+        self._wakeup = asyncio.Event()
+
+    @property
+    def collection(self):
+        # Resolved per use: the API hands over its database before configuring it
+        return self.db[self.collection_name]
+
+    async def create_indexes(self):
+        await self.collection.create_index([("status", 1), ("run_at", 1)])
+        await self.collection.create_index([("status", 1), ("lease_expires_at", 1)])
+        await self.collection.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+
+    async def enqueue(self, job_type: str, payload: dict, delay: float = 0, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        now = datetime.now(timezone.utc)
+        job_id = str(uuid.uuid4())
+        await self.collection.insert_one({
+            "id": job_id,
+            "type": job_type,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now + timedelta(seconds=delay),
+            "created_at": now
+        })
+        # Lets an in-process worker pick it up without waiting for the next poll
+        self.notify()
+        return job_id
+
+    async def claim(self, worker_id: str, exclude_types: list) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        query = {"$or": [
+            {"status": "queued", "run_at": {"$lte": now}},
+            # Lease ran out: the worker holding it died or stalled
+            {"status": "running", "lease_expires_at": {"$lt": now}}
+        ]}
+        if exclude_types:
+            query["type"] = {"$nin": exclude_types}
+        claimed = {
+            "status": "running",
+            "locked_by": worker_id,
+            "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS)
+        }
+        job = await self.collection.find_one_and_update(
+            query,
+            {"$set": claimed, "$inc": {"attempts": 1}},
+            projection={"_id": 0},
+            sort=[("run_at", 1)]
+        )
+        if job:
+            job.update(claimed, attempts=job["attempts"] + 1)
+        return job
+
+    async def extend_lease(self, job: dict, worker_id: str):
+        await self.collection.update_one(
+            {"id": job["id"], "locked_by": worker_id, "status": "running"},
+            {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)}}
+        )
+
+    async def complete(self, job: dict, worker_id: str):
+        await self.collection.update_one(
+            {"id": job["id"], "locked_by": worker_id},
+            {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}, "$unset": {"lease_expires_at": ""}}
+        )
+
+    async def fail(self, job: dict, worker_id: str, error: str):
+        now = datetime.now(timezone.utc)
+        if job["attempts"] >= job["max_attempts"]:
+            update = {"status": "failed", "finished_at": now, "last_error": error}
+        else:
+            update = {
+                "status": "queued",
+                "run_at": now + timedelta(seconds=backoff_delay(job["attempts"])),
+                "last_error": error
+            }
+        await self.collection.update_one(
+            {"id": job["id"], "locked_by": worker_id},
+            {"$set": update, "$unset": {"lease_expires_at": ""}}
+        )
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def wait_for_work(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+class JobWorker:
+    def __init__(self, queue: JobQueue, concurrency: int = 4):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.worker_id = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._slots = asyncio.Semaphore(concurrency)
+        self._running_by_type: Dict[str, int] = {}
+        self._tasks: set = set()
+
+    def _saturated_types(self) -> list:
+        return [
+            job_type for job_type, handler in _handlers.items()
+            if handler["concurrency"] and self._running_by_type.get(job_type, 0) >= handler["concurrency"]
+        ]
+
+    async def run(self):
+        logger.info(f"Job worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            while True:
+                await self._slots.acquire()
+                try:
+                    job = await self.queue.claim(self.worker_id, self._saturated_types())
+                except Exception as e:
+                    logger.error(f"Job claim failed: {e}")
+                    job = None
+                if not job:
+                    self._slots.release()
+                    await self.queue.wait_for_work(JOB_POLL_INTERVAL)
+                    continue
+                task = asyncio.create_task(self._execute(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    async def _keep_lease(self, job: dict):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await self.queue.extend_lease(job, self.worker_id)
+
+    async def _execute(self, job: dict):
+        job_type = job["type"]
+        self._running_by_type[job_type] = self._running_by_type.get(job_type, 0) + 1
+        lease = asyncio.create_task(self._keep_lease(job))
+        try:
+            handler = _handlers.get(job_type)
+            if not handler:
+                raise RuntimeError(f"No handler registered for job type {job_type}")
+            await handler["fn"](job["payload"])
+            await self.queue.complete(job, self.worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job_type}) attempt {job['attempts']} failed: {e}")
+            await self.queue.fail(job, self.worker_id, str(e))
+        finally:
+            lease.cancel()
+            self._running_by_type[job_type] -= 1
+            self._slots.release()
+            # A freed slot may unblock jobs skipped for concurrency limits
+            self.queue.notify()
+
+# ===================== EMAIL JOBS =====================
+
+def smtp_settings() -> dict:
+    # Imported here: core builds the app's JobQueue from this module
+    from core import settings
+    return {
+        "host": settings.smtp_host,
+        "port": settings.smtp_port,
+        "username": settings.smtp_username,
+        "password": settings.smtp_password,
+        "starttls": settings.smtp_starttls,
+        "sender": settings.smtp_from
+    }
+
+def deliver_email(settings: dict, to: str, subject: str, body: str):
+    message = EmailMessage()
+    message["From"] = settings["sender"]
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    with smtplib.SMTP(settings["host"], settings["port"], timeout=30) as smtp:
+        if settings["starttls"]:
+            smtp.starttls()
+        if settings["username"]:
+            smtp.login(settings["username"], settings["password"])
+        smtp.send_message(message)
+
+@job_handler("send_email", concurrency=2)
+async def send_email(payload: dict):
+    settings = smtp_settings()
+    if not settings["host"]:
+        logger.info(f"SMTP_HOST not set, dropping email to {payload['to']}: {payload['subject']}")
+        return
+    # smtplib blocks, so keep it off the event loop
+    await asyncio.to_thread(deliver_email, settings, payload["to"], payload["subject"], payload["body"])
+
+async def main():
+    from config import Settings
+    import core
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    core.configure(Settings.from_env())
+    try:
+        await core.job_queue.create_indexes()
+        await JobWorker(core.job_queue, core.settings.job_worker_concurrency).run()
+    finally:
+        core.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""One-time migration of stored money to integer cents.
+
+Adds the `*_cents` fields to products, order lines, order totals and
+payment transactions written before amounts were kept in cents. Documents
+that already have them are skipped, so it is safe to re-run or to stop
+halfway:
+
+    python migrate_money.py [--batch 1000] [--dry-run]
+
+An order keeps the total it was placed (and charged) with. The report counts
+orders whose stored total differs from the sum of their lines in cents, which
+are the float rounding drift this migration retires.
+"""
+import asyncio
+import argparse
+import logging
+from typing import List
+
+from pymongo import UpdateOne
+
+from core import db
+from money import to_cents, cents_of, money_fields, batch_totals
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH = 1000
+
+async def migrate_products(batch_size: int, dry_run: bool) -> int:
+    migrated = 0
+    batch: List[UpdateOne] = []
+    cursor = db.products.find({"price_bbd_cents": {"$exists": False}}, {"_id": 0, "id": 1, "price_bbd": 1, "price_usd": 1})
+    async for product in cursor:
+        update = {**money_fields("price_bbd", to_cents(product["price_bbd"]))}
+        if product.get("price_usd") is not None:
+            update.update(money_fields("price_usd", to_cents(product["price_usd"])))
+        batch.append(UpdateOne({"id": product["id"]}, {"$set": update}))
+        if len(batch) >= batch_size:
+            migrated += await apply(db.products, batch, dry_run)
+            batch = []
+    return migrated + await apply(db.products, batch, dry_run)
+
+async def migrate_order_batch(orders: List[dict], dry_run: bool) -> tuple:
+    """Convert one batch of orders; returns (migrated, orders whose lines don't sum to their total)"""
+    lines = [
+        {**item, "price_bbd_cents": cents_of(item, "price_bbd"), "price_usd_cents": cents_of(item, "price_usd")}
+        for order in orders for item in order.get("items", [])
+    ]
+    sizes = [len(order.get("items", [])) for order in orders]
+    quantities = [line["quantity"] for line in lines]
+    line_totals = batch_totals(
+        [line["price_bbd_cents"] for line in lines] + [line["price_usd_cents"] for line in lines],
+        quantities + quantities,
+        sizes + sizes
+    )
+    bbd_sums, usd_sums = line_totals[:len(orders)], line_totals[len(orders):]
+
+    operations = []
+    drifted = 0
+    start = 0
+    for order, size, bbd_sum, usd_sum in zip(orders, sizes, bbd_sums, usd_sums):
+        total_bbd_cents = cents_of(order, "total_bbd")
+        total_usd_cents = cents_of(order, "total_usd")
+        if (total_bbd_cents, total_usd_cents) != (bbd_sum, usd_sum):
+            drifted += 1
+        items = [
+            {**line, **money_fields("price_bbd", line["price_bbd_cents"]), **money_fields("price_usd", line["price_usd_cents"])}
+            for line in lines[start:start + size]
+        ]
+        start += size
+        operations.append(UpdateOne({"id": order["id"]}, {"$set": {
+            "items": items,
+            **money_fields("total_bbd", total_bbd_cents),
+            **money_fields("total_usd", total_usd_cents)
+        }}))
+    return await apply(db.orders, operations, dry_run), drifted
+
+async def migrate_orders(batch_size: int, dry_run: bool) -> tuple:
+    migrated = drifted = 0
+    batch: List[dict] = []
+    cursor = db.orders.find(
+        {"total_bbd_cents": {"$exists": False}},
+        {"_id": 0, "id": 1, "items": 1, "total_bbd": 1, "total_usd": 1}
+    )
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            done, drift = await migrate_order_batch(batch, dry_run)
+            migrated, drifted, batch = migrated + done, drifted + drift, []
+    if batch:
+        done, drift = await migrate_order_batch(batch, dry_run)
+        migrated, drifted = migrated + done, drifted + drift
+    return migrated, drifted
+
+async def migrate_transactions(batch_size: int, dry_run: bool) -> int:
+    migrated = 0
+    batch: List[UpdateOne] = []
+    cursor = db.payment_transactions.find({"amount_cents": {"$exists": False}}, {"_id": 0, "id": 1, "amount": 1})
+    async for transaction in cursor:
+        batch.append(UpdateOne({"id": transaction["id"]}, {"$set": {"amount_cents": to_cents(transaction["amount"])}}))
+        if len(batch) >= batch_size:
+            migrated += await apply(db.payment_transactions, batch, dry_run)
+            batch = []
+    return migrated + await apply(db.payment_transactions, batch, dry_run)
+
+async def apply(collection, operations: List[UpdateOne], dry_run: bool) -> int:
+    if operations and not dry_run:
+        await collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def migrate_money(batch_size: int = MIGRATION_BATCH, dry_run: bool = False) -> dict:
+    orders, drifted = await migrate_orders(batch_size, dry_run)
+    report = {
+        "products": await migrate_products(batch_size, dry_run),
+        "orders": orders,
+        "orders_with_drift": drifted,
+        "payment_transactions": await migrate_transactions(batch_size, dry_run),
+        "dry_run": dry_run
+    }
+    logger.info(f"Money migration: {report}")
+    return report
+
+async def main():
+    from config import Settings
+    import core
+
+    parser = argparse.ArgumentParser(description="Convert stored money amounts to integer cents")
+    parser.add_argument("--batch", type=int, default=MIGRATION_BATCH)
+    parser.add_argument("--dry-run", action="store_true", help="Count what would change without writing")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    core.configure(Settings.from_env())
+    try:
+        await migrate_money(args.batch, args.dry_run)
+    finally:
+        core.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+"""Request and response models shared by the route modules"""
+from typing import List, Optional, Dict
+
+from pydantic import BaseModel, Field, EmailStr
+
+class UserCreate(BaseModel):
+    email: EmailStr
+    password: str
+    first_name: str
+    last_name: str
+    phone: Optional[str] = None
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class UserResponse(BaseModel):
+    id: str
+    email: str
+    first_name: str
+    last_name: str
+    phone: Optional[str] = None
+    is_admin: bool = False
+    created_at: str
+
+class ProductCreate(BaseModel):
+    name: str
+    description: str
+    price_bbd: float
+    # Converted from price_bbd with the rates table when omitted
+    price_usd: Optional[float] = None
+    category: str  # resin, soaps, candles
+    images: List[str] = []
+    stock: int = 0
+    featured: bool = False
+
+class ProductUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price_bbd: Optional[float] = None
+    price_usd: Optional[float] = None
+    category: Optional[str] = None
+    images: Optional[List[str]] = None
+    stock: Optional[int] = None
+    featured: Optional[bool] = None
+
+class ProductResponse(BaseModel):
+    id: str
+    name: str
+    description: str
+    price_bbd: float
+    price_usd: float
+    price_bbd_cents: Optional[int] = None
+    price_usd_cents: Optional[int] = None
+    # Amount per currency code, BBD included
+    prices: Dict[str, float] = {}
+    category: str
+    images: List[str]
+    stock: int
+    featured: bool
+    created_at: str
+    average_rating: float = 0.0
+    review_count: int = 0
+
+class CurrencyRate(BaseModel):
+    code: str = Field(pattern=r"^[A-Z]{3}$")
+    # Units of this currency per 1 BBD
+    rate: float = Field(gt=0)
+    symbol: str = "$"
+    # Converted prices are rounded to a multiple of this
+    increment: float = Field(default=0.01, gt=0)
+    rounding: str = Field(default="nearest", pattern="^(nearest|up|down)$")
+
+class ReviewCreate(BaseModel):
+    product_id: str
+    rating: int = Field(ge=1, le=5)
+    comment: str
+
+class ReviewResponse(BaseModel):
+    id: str
+    product_id: str
+    user_id: str
+    user_name: str
+    rating: int
+    comment: str
+    created_at: str
+
+class ReviewPage(BaseModel):
+    items: List[ReviewResponse]
+    next_cursor: Optional[str] = None
+
+class ProductDetailResponse(BaseModel):
+    product: ProductResponse
+    rating_histogram: Dict[str, int]
+    reviews: ReviewPage
+
+class CartItem(BaseModel):
+    product_id: str
+    quantity: int = Field(ge=1)
+
+class CartUpdate(BaseModel):
+    items: List[CartItem]
+
+class CartResponse(BaseModel):
+    items: List[dict]
+    total_bbd: float
+    total_usd: float
+    total_bbd_cents: int = 0
+    total_usd_cents: int = 0
+    stock_issues: List[dict] = []
+    item_count: int = 0
+
+class OrderCreate(BaseModel):
+    items: List[CartItem]
+    shipping_address: str
+    city: str
+    postal_code: str
+    country: str = "Barbados"
+    phone: str
+    notes: Optional[str] = None
+    payment_method: str = "stripe"  # stripe or form
+
+class OrderResponse(BaseModel):
+    id: str
+    user_id: str
+    items: List[dict]
+    total_bbd: float
+    total_usd: float
+    total_bbd_cents: Optional[int] = None
+    total_usd_cents: Optional[int] = None
+    shipping_address: str
+    city: str
+    postal_code: str
+    country: str
+    phone: str
+    notes: Optional[str]
+    status: str
+    payment_status: str
+    payment_method: str
+    created_at: str
+    # Items paid for after their hold expired and someone else bought the stock
+    oversold: List[dict] = []
+
+class OrderSummary(BaseModel):
+    id: str
+    total_bbd: float
+    total_usd: float
+    total_bbd_cents: Optional[int] = None
+    total_usd_cents: Optional[int] = None
+    status: str
+    payment_status: str
+    payment_method: str
+    created_at: str
+    item_count: int
+    preview_image: Optional[str] = None
+
+class OrderPage(BaseModel):
+    items: List[OrderSummary]
+    next_cursor: Optional[str] = None
+
+class ContactMessage(BaseModel):
+    name: str
+    email: EmailStr
+    subject: str
+    message: str
+
+class CheckoutRequest(BaseModel):
+    order_id: str
+    origin_url: str
+
+class SocialLinks(BaseModel):
+    instagram: Optional[str] = ""
+    facebook: Optional[str] = ""
+    twitter: Optional[str] = ""
+    tiktok: Optional[str] = ""
+    whatsapp: Optional[str] = ""
+    youtube: Optional[str] = ""
+    pinterest: Optional[str] = ""
+
+class ContactInfo(BaseModel):
+    address: Optional[str] = "Bridgetown, Barbados"
+    phone: Optional[str] = "+1 (246) 123-4567"
+    email: Optional[str] = "info@perennia.bb"
+
+class HeroSection(BaseModel):
+    tagline: Optional[str] = "Handcrafted in Barbados"
+    title: Optional[str] = "Luxury Artisan"
+    subtitle: Optional[str] = "Gifts & Décor"
+    description: Optional[str] = "Discover our collection of handcrafted resin art, natural body care, and artisan candles. Each piece crafted with love and Caribbean spirit."
+    image_url: Optional[str] = ""
+
+class AboutSection(BaseModel):
+    title: Optional[str] = "Crafted with Love, Inspired by the Caribbean"
+    content: Optional[str] = "Perennia was born from a deep passion for artistry and the enchanting beauty of Barbados. What started as a personal creative journey has blossomed into a celebration of Caribbean craftsmanship."
+    quote: Optional[str] = "Every piece tells a story of Caribbean beauty and timeless elegance."
+    image_url: Optional[str] = ""
+
+class ThemeColors(BaseModel):
+    primary: Optional[str] = "#D4AF37"  # Gold
+    secondary: Optional[str] = "#40E0D0"  # Turquoise
+    accent: Optional[str] = "#4A0E5C"  # Deep purple
+    background: Optional[str] = "#050505"  # Near black
+    surface: Optional[str] = "#0F0F0F"  # Dark surface
+    text_primary: Optional[str] = "#F5F5F5"  # White text
+    text_secondary: Optional[str] = "#A3A3A3"  # Gray text
+
+class LayoutSettings(BaseModel):
+    show_hero: Optional[bool] = True
+    show_categories: Optional[bool] = True
+    show_featured: Optional[bool] = True
+    show_about_snippet: Optional[bool] = True
+    show_newsletter: Optional[bool] = True
+    navbar_style: Optional[str] = "glass"  # glass, solid, transparent
+    footer_style: Optional[str] = "full"  # full, minimal
+    product_card_style: Optional[str] = "default"  # default, minimal, detailed
+
+class SiteSettings(BaseModel):
+    business_name: Optional[str] = "Perennia"
+    tagline: Optional[str] = "Handcrafted Luxury from Barbados"
+    logo_url: Optional[str] = ""
+    social_links: Optional[SocialLinks] = None
+    contact_info: Optional[ContactInfo] = None
+    hero_section: Optional[HeroSection] = None
+    about_section: Optional[AboutSection] = None
+    footer_text: Optional[str] = "Handcrafted luxury from Barbados. Each piece tells a story of Caribbean artistry and timeless elegance."
+    theme_colors: Optional[ThemeColors] = None
+    layout_settings: Optional[LayoutSettings] = None
+    # Names the compiled stylesheet at /api/theme/{theme_hash}.css
+    theme_hash: Optional[str] = None
+
+class SiteSettingsUpdate(BaseModel):
+    business_name: Optional[str] = None
+    tagline: Optional[str] = None
+    logo_url: Optional[str] = None
+    social_links: Optional[SocialLinks] = None
+    contact_info: Optional[ContactInfo] = None
+    hero_section: Optional[HeroSection] = None
+    about_section: Optional[AboutSection] = None
+    footer_text: Optional[str] = None
+    theme_colors: Optional[ThemeColors] = None
+    layout_settings: Optional[LayoutSettings] = None
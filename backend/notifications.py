@@ -0,0 +1,60 @@
+"""Customer and admin emails.
+
+Emails are rendered here and handed to the job queue; SMTP never runs on the
+request path.
+"""
+import logging
+from typing import List
+
+from core import job_queue, settings
+
+logger = logging.getLogger(__name__)
+
+def format_order_lines(order: dict) -> str:
+    lines = [
+        f"  {item['quantity']} x {item['product_name']} @ ${item['price_bbd']:.2f} BBD"
+        for item in order["items"]
+    ]
+    lines.append(f"  Total: ${order['total_bbd']:.2f} BBD (${order['total_usd']:.2f} USD)")
+    return "\n".join(lines)
+
+def order_confirmation_email(order: dict) -> dict:
+    return {
+        "to": order["user_email"],
+        "subject": f"Your Perennia order {order['id'][:8]}",
+        "body": (
+            "Thank you for your order!\n\n"
+            f"{format_order_lines(order)}\n\n"
+            f"Shipping to: {order['shipping_address']}, {order['city']}, {order['country']}\n"
+        )
+    }
+
+def payment_received_email(order: dict) -> dict:
+    return {
+        "to": order["user_email"],
+        "subject": f"Payment received for order {order['id'][:8]}",
+        "body": (
+            "We have received your payment and are preparing your order.\n\n"
+            f"{format_order_lines(order)}\n"
+        )
+    }
+
+def contact_emails(msg: dict) -> List[dict]:
+    emails = [{
+        "to": msg["email"],
+        "subject": "We received your message",
+        "body": f"Hi {msg['name']},\n\nThanks for contacting Perennia. We will get back to you soon.\n"
+    }]
+    if settings.admin_notify_email:
+        emails.append({
+            "to": settings.admin_notify_email,
+            "subject": f"New contact message: {msg['subject']}",
+            "body": f"From: {msg['name']} <{msg['email']}>\n\n{msg['message']}\n"
+        })
+    return emails
+
+async def notify(email: dict):
+    try:
+        await job_queue.enqueue("send_email", email)
+    except Exception as e:
+        logger.error(f"Failed to queue email to {email['to']}: {e}")
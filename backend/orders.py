@@ -0,0 +1,206 @@
+"""Order placement, history and admin order management"""
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core import (
+    db, without_mongo_id, parse_fields, fields_projection, encode_cursor, decode_cursor, keyset_filter,
+    archive_of, find_one_or_archived
+)
+from money import money_fields
+from models import OrderResponse, OrderCreate, OrderPage
+from auth import get_current_user, get_admin_user
+from events import event_broker, publish_low_stock
+from caching import invalidate_stock
+from cart import price_cart, merge_cart_items
+from idempotency import run_idempotent
+from reservations import create_reservation, release_reservations
+from archive import ARCHIVED_STATUSES
+from notifications import notify, order_confirmation_email
+
+router = APIRouter()
+
+@router.post("/orders", response_model=OrderResponse)
+async def create_order(
+    order_data: OrderCreate,
+    user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent(
+        idempotency_key, f"orders:{user['id']}", order_data,
+        lambda: place_order(order_data, user)
+    )
+
+async def place_order(order_data: OrderCreate, user: dict) -> dict:
+    # Validate products and calculate totals in one round trip
+    priced = await price_cart(merge_cart_items(order_data.items))
+    for issue in priced["stock_issues"]:
+        if issue["reason"] == "not_found":
+            raise HTTPException(status_code=404, detail=f"Product {issue['product_id']} not found")
+        raise HTTPException(status_code=400, detail=f"Insufficient stock for {issue['product_name']}")
+
+    # Decrement stock only where enough remains; roll back if another order got there first
+    reserved = []
+    remaining = []
+    for line in priced["items"]:
+        updated = await db.products.find_one_and_update(
+            {"id": line["product_id"], "stock": {"$gte": line["quantity"]}},
+            {"$inc": {"stock": -line["quantity"]}},
+            projection={"_id": 0, "id": 1, "name": 1, "stock": 1}
+        )
+        if not updated:
+            for done in reserved:
+                await db.products.update_one({"id": done["product_id"]}, {"$inc": {"stock": done["quantity"]}})
+            if reserved:
+                await invalidate_stock(
+                    [done["product_id"] for done in reserved], any(product["stock"] == 0 for product in remaining)
+                )
+            raise HTTPException(status_code=400, detail=f"Insufficient stock for {line['product_name']}")
+        reserved.append(line)
+        remaining.append({**updated, "stock": updated["stock"] - line["quantity"]})
+    await invalidate_stock([line["product_id"] for line in reserved], any(product["stock"] == 0 for product in remaining))
+
+    items_with_details = [
+        {
+            "product_id": line["product_id"],
+            "product_name": line["product_name"],
+            "quantity": line["quantity"],
+            **money_fields("price_bbd", line["price_bbd_cents"]),
+            **money_fields("price_usd", line["price_usd_cents"]),
+            "image": line["image"]
+        }
+        for line in priced["items"]
+    ]
+    
+    order_id = str(uuid.uuid4())
+    order = {
+        "id": order_id,
+        "user_id": user["id"],
+        "user_email": user["email"],
+        "items": items_with_details,
+        **money_fields("total_bbd", priced["total_bbd_cents"]),
+        **money_fields("total_usd", priced["total_usd_cents"]),
+        "shipping_address": order_data.shipping_address,
+        "city": order_data.city,
+        "postal_code": order_data.postal_code,
+        "country": order_data.country,
+        "phone": order_data.phone,
+        "notes": order_data.notes,
+        "status": "pending",
+        "payment_status": "pending",
+        "payment_method": order_data.payment_method,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.orders.insert_one(order)
+    if order_data.payment_method == "stripe":
+        await create_reservation(order_id, items_with_details)
+    
+    await event_broker.publish("order_created", {"order": without_mongo_id(order)})
+    await notify(order_confirmation_email(order))
+    for product in remaining:
+        await publish_low_stock(product)
+    return order
+
+@router.get("/orders", response_model=List[OrderResponse])
+async def get_user_orders(user: dict = Depends(get_current_user)):
+    orders = await db.orders.find({"user_id": user["id"]}, {"_id": 0}).sort("created_at", -1).to_list(100)
+    return orders
+
+ORDER_PAGE_MAX = 50
+ORDER_HISTORY_SORT = [("created_at", -1), ("id", -1)]
+ORDER_CURSOR_FIELDS = ["created_at", "id"]
+
+@router.get("/orders/history", response_model=OrderPage)
+async def get_order_history(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    archived: bool = False,
+    user: dict = Depends(get_current_user)
+):
+    """Order summaries, newest first; line items come from GET /orders/{id}.
+
+    Old delivered and cancelled orders live in the archive, paged with archived=true.
+    """
+    limit = max(1, min(limit, ORDER_PAGE_MAX))
+    query = {"user_id": user["id"]}
+    if cursor:
+        query.update(keyset_filter(ORDER_HISTORY_SORT, decode_cursor(cursor, ORDER_CURSOR_FIELDS)))
+    
+    collection = archive_of(db.orders) if archived else db.orders
+    orders = await collection.aggregate([
+        {"$match": query},
+        {"$sort": dict(ORDER_HISTORY_SORT)},
+        {"$limit": limit + 1},
+        {"$project": {
+            "_id": 0, "id": 1, "total_bbd": 1, "total_usd": 1, "total_bbd_cents": 1, "total_usd_cents": 1, "status": 1,
+            "payment_status": 1, "payment_method": 1, "created_at": 1,
+            "item_count": {"$sum": "$items.quantity"},
+            "preview_image": {"$arrayElemAt": ["$items.image", 0]}
+        }}
+    ]).to_list(limit + 1)
+    next_cursor = encode_cursor(orders[limit - 1], ORDER_CURSOR_FIELDS) if len(orders) > limit else None
+    return {"items": orders[:limit], "next_cursor": next_cursor}
+
+@router.get("/orders/{order_id}", response_model=OrderResponse)
+async def get_order(order_id: str, user: dict = Depends(get_current_user)):
+    order = await find_one_or_archived(db.orders, {"id": order_id}, {"_id": 0, "archived_at": 0})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["user_id"] != user["id"] and not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return order
+
+@router.post("/orders/{order_id}/cancel")
+async def cancel_order(order_id: str, user: dict = Depends(get_current_user)):
+    """Release an unpaid order's stock hold, e.g. after an abandoned Stripe checkout"""
+    order = await find_one_or_archived(db.orders, {"id": order_id}, {"_id": 0, "user_id": 1, "payment_status": 1})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["user_id"] != user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if order["payment_status"] == "paid":
+        raise HTTPException(status_code=400, detail="Order already paid")
+    
+    if not await release_reservations({"order_id": order_id}, "cancelled"):
+        raise HTTPException(status_code=409, detail="Order has no stock hold to release")
+    return {"message": "Order cancelled"}
+
+ORDER_FIELDS = set(OrderResponse.model_fields)
+
+@router.get("/admin/orders", response_model=List[OrderResponse])
+async def get_all_orders(fields: Optional[str] = None, admin: dict = Depends(get_admin_user)):
+    selected = parse_fields(fields, ORDER_FIELDS)
+    projection = {"_id": 0} if selected is None else fields_projection(selected)
+    orders = await db.orders.find({}, projection).sort("created_at", -1).to_list(500)
+    if selected is None:
+        return orders
+    return JSONResponse(jsonable_encoder(orders))
+
+@router.put("/admin/orders/{order_id}/status")
+async def update_order_status(order_id: str, status: str, admin: dict = Depends(get_admin_user)):
+    valid_statuses = ["pending", "processing", "shipped", "delivered", "cancelled"]
+    if status not in valid_statuses:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    result = await db.orders.update_one({"id": order_id}, {"$set": {"status": status}})
+    if result.matched_count == 0:
+        # Archived orders are finished; they may move between finished states
+        # (a delivered order refunded as cancelled) but never reopen
+        archived = await archive_of(db.orders).find_one({"id": order_id}, {"_id": 0, "id": 1})
+        if not archived:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if status not in ARCHIVED_STATUSES:
+            raise HTTPException(status_code=409, detail="Archived orders can only be delivered or cancelled")
+        await archive_of(db.orders).update_one({"id": order_id}, {"$set": {"status": status}})
+    if status == "cancelled":
+        await release_reservations({"order_id": order_id}, "cancelled")
+    await event_broker.publish("order_status_changed", {"order_id": order_id, "status": status})
+    return {"message": "Status updated"}
+
+async def create_indexes():
+    await db.orders.create_index("id")
+    await db.orders.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
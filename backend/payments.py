@@ -0,0 +1,507 @@
+"""Payment provider access, checkout routes and reconciliation"""
+import asyncio
+import logging
+import uuid
+import time
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from core import db, settings, find_one_or_archived
+from money import cents_of, from_cents
+from models import CheckoutRequest
+from auth import get_admin_user, get_current_user
+from events import event_broker
+from idempotency import run_idempotent
+from reservations import commit_reservation, release_reservations
+from notifications import notify, payment_received_email
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# ===================== PAYMENT PROVIDER =====================
+
+# Every call to the payment provider runs under a deadline and through a
+# circuit breaker. After PAYMENT_BREAKER_THRESHOLD consecutive failures the
+# breaker opens and checkout fails fast for PAYMENT_BREAKER_RESET_SECONDS,
+# then a single probe call decides whether to close it again.
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Circuit open")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, window: int = 100):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejections = 0
+        # (latency_seconds, ok) for the last `window` calls
+        self.recent: deque = deque(maxlen=window)
+
+    def _allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def _record(self, latency: float, ok: bool):
+        self.recent.append((latency, ok))
+        if ok:
+            self.consecutive_failures = 0
+            if self.state != "closed":
+                logger.info(f"Circuit {self.name} closed")
+            self.state = "closed"
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit {self.name} opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    async def call(self, operation, timeout: float):
+        if not self._allow():
+            self.rejections += 1
+            raise CircuitOpenError(self.retry_after())
+        probing = self.state == "half_open"
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(operation(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._record(time.monotonic() - started, False)
+            raise
+        except asyncio.CancelledError:
+            # Our caller went away; says nothing about the upstream
+            raise
+        except Exception:
+            self._record(time.monotonic() - started, False)
+            raise
+        else:
+            self._record(time.monotonic() - started, True)
+            return result
+        finally:
+            if probing:
+                self.probe_in_flight = False
+
+    def stats(self) -> dict:
+        latencies = sorted(latency for latency, _ in self.recent)
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+        errors = sum(1 for _, ok in self.recent if not ok)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 1) if self.state == "open" else 0,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejections": self.rejections,
+            "recent_error_rate": round(errors / len(self.recent), 3) if self.recent else 0.0,
+            "latency_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max": round(latencies[-1] * 1000, 2) if latencies else None}
+        }
+
+# create_app() applies PAYMENT_BREAKER_THRESHOLD and PAYMENT_BREAKER_RESET_SECONDS
+payment_breaker = CircuitBreaker("payments", failure_threshold=5, reset_timeout=30)
+
+# The provider integrations are imported on first use, not at startup: the
+# Stripe SDK is slow to import and the fake gateway is only for tests.
+def payment_client(webhook_url: str = ""):
+    if settings.payment_provider == "fake":
+        from fake_payments import FakePaymentGateway
+        return FakePaymentGateway(webhook_url=webhook_url)
+    if not settings.stripe_api_key:
+        raise HTTPException(status_code=500, detail="Payment not configured")
+    from emergentintegrations.payments.stripe.checkout import StripeCheckout
+    return StripeCheckout(api_key=settings.stripe_api_key, webhook_url=webhook_url)
+
+def checkout_session_request(**fields):
+    if settings.payment_provider == "fake":
+        from fake_payments import FakeSessionRequest
+        return FakeSessionRequest(**fields)
+    from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
+    return CheckoutSessionRequest(**fields)
+
+async def call_payment_provider(operation):
+    """Run `operation()` against the provider, mapping upstream trouble to HTTP errors"""
+    try:
+        return await payment_breaker.call(operation, settings.payment_timeout_seconds)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Payment provider is temporarily unavailable, please try again shortly",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Payment provider timed out")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Payment provider error: {e}")
+        raise HTTPException(status_code=502, detail="Payment provider error")
+
+@router.get("/admin/payments/stats")
+async def get_payment_stats(admin: dict = Depends(get_admin_user)):
+    return {"provider": settings.payment_provider, "timeout_seconds": settings.payment_timeout_seconds, "breaker": payment_breaker.stats()}
+
+# ===================== STRIPE PAYMENT ROUTES =====================
+
+async def mark_order_paid(order_id: str):
+    """Record a confirmed payment once, whichever of webhook or status poll sees it first"""
+    order = await db.orders.find_one_and_update(
+        {"id": order_id, "payment_status": {"$ne": "paid"}},
+        {"$set": {"payment_status": "paid", "status": "processing", "paid_at": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0}
+    )
+    await db.payment_transactions.update_many(
+        {"order_id": order_id, "payment_status": {"$ne": "paid"}},
+        {"$set": {"payment_status": "paid"}}
+    )
+    if order:
+        await after_order_paid(order)
+
+async def after_order_paid(order: dict):
+    await commit_reservation(order["id"])
+    await event_broker.publish("payment_confirmed", {"order_id": order["id"]})
+    await notify(payment_received_email(order))
+
+@router.post("/checkout/create-session")
+async def create_checkout_session(
+    checkout_data: CheckoutRequest,
+    request: Request,
+    user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent(
+        idempotency_key, f"checkout:{user['id']}", checkout_data,
+        lambda: start_checkout_session(checkout_data, request, user)
+    )
+
+async def start_checkout_session(checkout_data: CheckoutRequest, request: Request, user: dict) -> dict:
+    order = await db.orders.find_one({"id": checkout_data.order_id}, {"_id": 0})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["user_id"] != user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if order["payment_status"] == "paid":
+        raise HTTPException(status_code=400, detail="Order already paid")
+    
+    host_url = str(request.base_url).rstrip("/")
+    webhook_url = f"{host_url}/api/webhook/stripe"
+    stripe_checkout = payment_client(webhook_url)
+    
+    origin_url = checkout_data.origin_url.rstrip("/")
+    success_url = f"{origin_url}/checkout/success?session_id={{CHECKOUT_SESSION_ID}}"
+    cancel_url = f"{origin_url}/checkout/cancel?order_id={checkout_data.order_id}"
+    
+    # Use USD for Stripe payment; the provider gets the exact cents as a decimal amount
+    amount_cents = cents_of(order, "total_usd")
+    amount = from_cents(amount_cents)
+    
+    checkout_request = checkout_session_request(
+        amount=amount,
+        currency="usd",
+        success_url=success_url,
+        cancel_url=cancel_url,
+        metadata={
+            "order_id": checkout_data.order_id,
+            "user_id": user["id"],
+            "user_email": user["email"]
+        }
+    )
+    
+    session = await call_payment_provider(
+        lambda: stripe_checkout.create_checkout_session(checkout_request)
+    )
+    
+    # Create payment transaction record
+    transaction = {
+        "id": str(uuid.uuid4()),
+        "session_id": session.session_id,
+        "order_id": checkout_data.order_id,
+        "user_id": user["id"],
+        "user_email": user["email"],
+        "amount": amount,
+        "amount_cents": amount_cents,
+        "currency": "usd",
+        "payment_status": "initiated",
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.payment_transactions.insert_one(transaction)
+    
+    return {"url": session.url, "session_id": session.session_id}
+
+@router.get("/checkout/status/{session_id}")
+async def get_checkout_status(session_id: str, user: dict = Depends(get_current_user)):
+    stripe_checkout = payment_client()
+    status = await call_payment_provider(
+        lambda: stripe_checkout.get_checkout_status(session_id)
+    )
+    
+    # Update payment transaction
+    transaction = await find_one_or_archived(db.payment_transactions, {"session_id": session_id}, {"_id": 0})
+    if transaction and status.amount_total is not None and transaction.get("amount_cents", status.amount_total) != status.amount_total:
+        logger.warning(
+            f"Amount mismatch for session {session_id}: charged {status.amount_total} cents, "
+            f"expected {transaction['amount_cents']}"
+        )
+    if transaction and transaction["payment_status"] != "paid":
+        new_status = "paid" if status.payment_status == "paid" else status.payment_status
+        await db.payment_transactions.update_one(
+            {"session_id": session_id},
+            {"$set": {"payment_status": new_status}}
+        )
+        
+        # Update order if paid
+        if status.payment_status == "paid":
+            await mark_order_paid(transaction["order_id"])
+    
+    return {
+        "status": status.status,
+        "payment_status": status.payment_status,
+        "amount_total": status.amount_total,
+        "currency": status.currency
+    }
+
+@router.post("/webhook/stripe")
+async def stripe_webhook(request: Request):
+    body = await request.body()
+    signature = request.headers.get("Stripe-Signature", "")
+    
+    try:
+        stripe_checkout = payment_client()
+        # Signature checks fail locally, so keep them out of the breaker; only bound the wait
+        webhook_response = await asyncio.wait_for(stripe_checkout.handle_webhook(body, signature), settings.payment_timeout_seconds)
+        
+        if webhook_response.payment_status == "paid":
+            order_id = webhook_response.metadata.get("order_id")
+            if order_id:
+                await mark_order_paid(order_id)
+        
+        return {"received": True}
+    except Exception as e:
+        logger.error(f"Webhook error: {e}")
+        return {"received": True}
+
+# ===================== PAYMENT RECONCILIATION =====================
+
+# Webhooks get lost and customers close the tab, leaving transactions
+# "initiated" forever. The reconciler pages through stale pending transactions,
+# asks the provider what happened and applies the answers in bulk. Only one
+# worker runs it at a time, guarded by a lease in task_locks.
+PENDING_PAYMENT_STATUSES = ["initiated", "unpaid"]
+PAYMENT_RECONCILE_PAGE = 500
+# Renewed before every page, so it only has to outlast one: 500 checks at
+# concurrency 8 under a 10 s deadline take at most ~630 s
+PAYMENT_RECONCILE_LEASE_SECONDS = 900
+PAYMENT_RECONCILE_LOCK = "payment_reconciliation"
+
+async def acquire_task_lock(name: str, owner: str, seconds: float) -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        await db.task_locks.update_one(
+            {"_id": name, "$or": [{"locked_until": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "locked_until": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Someone else holds an unexpired lease, so the upsert collided with it
+        return False
+    return True
+
+async def release_task_lock(name: str, owner: str):
+    await db.task_locks.delete_one({"_id": name, "owner": owner})
+
+async def check_payment(stripe_checkout, transaction: dict, limit: asyncio.Semaphore):
+    async with limit:
+        try:
+            status = await payment_breaker.call(
+                lambda: stripe_checkout.get_checkout_status(transaction["session_id"]), settings.payment_timeout_seconds
+            )
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            return transaction, None, str(e) or type(e).__name__
+        return transaction, status, None
+
+async def apply_payment_results(run_id: str, results: list, report: dict):
+    now = datetime.now(timezone.utc).isoformat()
+    transaction_ops = []
+    paid_orders = set()
+    expired_orders = set()
+    for transaction, status, error in results:
+        if error:
+            report["errors"] += 1
+            if len(report["error_samples"]) < 10:
+                report["error_samples"].append({"session_id": transaction["session_id"], "error": error})
+            continue
+        if status.payment_status == "paid":
+            new_status = "paid"
+            paid_orders.add(transaction["order_id"])
+            report["paid"] += 1
+        elif status.status == "expired":
+            new_status = "expired"
+            expired_orders.add(transaction["order_id"])
+            report["expired"] += 1
+        else:
+            # Still open at the provider: nothing to write
+            report["still_open"] += 1
+            continue
+        transaction_ops.append(UpdateOne(
+            {"session_id": transaction["session_id"], "payment_status": {"$in": PENDING_PAYMENT_STATUSES}},
+            {"$set": {"payment_status": new_status, "reconciled_at": now}}
+        ))
+    if transaction_ops:
+        await db.payment_transactions.bulk_write(transaction_ops, ordered=False)
+    
+    if paid_orders:
+        # Tag the orders this run flips so the follow-up only touches those,
+        # even if a webhook confirms some of them concurrently.
+        await db.orders.bulk_write([
+            UpdateOne(
+                {"id": order_id, "payment_status": {"$ne": "paid"}},
+                {"$set": {"payment_status": "paid", "status": "processing", "paid_at": now, "reconcile_run": run_id}}
+            )
+            for order_id in paid_orders
+        ], ordered=False)
+        async for order in db.orders.find({"id": {"$in": list(paid_orders)}, "reconcile_run": run_id}, {"_id": 0}):
+            report["orders_paid"] += 1
+            await after_order_paid(order)
+    
+    # A newer session for the same order may still be open or already paid
+    expired_orders -= paid_orders
+    if expired_orders:
+        still_pending = await db.payment_transactions.distinct(
+            "order_id", {"order_id": {"$in": list(expired_orders)}, "payment_status": {"$in": PENDING_PAYMENT_STATUSES + ["paid"]}}
+        )
+        expired_orders -= set(still_pending)
+    if expired_orders:
+        report["orders_cancelled"] += await release_reservations(
+            {"order_id": {"$in": list(expired_orders)}}, "expired", limit=len(expired_orders)
+        )
+
+async def reconcile_payments(run_id: str, max_transactions: Optional[int] = None) -> dict:
+    started = time.monotonic()
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=settings.payment_reconcile_after_minutes)).isoformat()
+    report = {
+        "run_id": run_id,
+        "status": "running",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "scanned": 0, "paid": 0, "expired": 0, "still_open": 0, "errors": 0,
+        "orders_paid": 0, "orders_cancelled": 0, "error_samples": []
+    }
+    await db.payment_reconciliations.insert_one(dict(report))
+    stripe_checkout = payment_client()
+    limit = asyncio.Semaphore(settings.payment_reconcile_concurrency)
+    last = None
+    try:
+        while max_transactions is None or report["scanned"] < max_transactions:
+            if not await acquire_task_lock(PAYMENT_RECONCILE_LOCK, run_id, PAYMENT_RECONCILE_LEASE_SECONDS):
+                # The lease ran out and another worker took over; leave the rest to it
+                report["status"] = "aborted"
+                report["error_samples"].append({"error": "Reconciliation lease lost"})
+                break
+            query = {"payment_status": {"$in": PENDING_PAYMENT_STATUSES}, "created_at": {"$lt": cutoff}}
+            if last:
+                query["$or"] = [
+                    {"created_at": {"$gt": last["created_at"]}},
+                    {"created_at": last["created_at"], "id": {"$gt": last["id"]}}
+                ]
+            page_size = PAYMENT_RECONCILE_PAGE
+            if max_transactions is not None:
+                page_size = min(page_size, max_transactions - report["scanned"])
+            page = await db.payment_transactions.find(
+                query, {"_id": 0, "id": 1, "session_id": 1, "order_id": 1, "created_at": 1}
+            ).sort([("created_at", 1), ("id", 1)]).limit(page_size).to_list(page_size)
+            if not page:
+                break
+            last = page[-1]
+            report["scanned"] += len(page)
+            # Let the whole page settle even if the circuit opens part way, so no
+            # check is left running and the answers already in are still applied
+            outcomes = await asyncio.gather(*[check_payment(stripe_checkout, t, limit) for t in page], return_exceptions=True)
+            await apply_payment_results(run_id, [o for o in outcomes if not isinstance(o, BaseException)], report)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            if len(page) < page_size:
+                break
+        if report["status"] == "running":
+            report["status"] = "finished"
+    except CircuitOpenError:
+        report["status"] = "aborted"
+        report["error_samples"].append({"error": "Payment provider circuit open"})
+    except Exception as e:
+        logger.error(f"Payment reconciliation {run_id} failed: {e}")
+        report["status"] = "failed"
+        report["error_samples"].append({"error": str(e)})
+    report["finished_at"] = datetime.now(timezone.utc).isoformat()
+    report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    await db.payment_reconciliations.update_one({"run_id": run_id}, {"$set": report})
+    logger.info(
+        f"Payment reconciliation {run_id} {report['status']}: scanned {report['scanned']}, "
+        f"paid {report['paid']}, expired {report['expired']}, open {report['still_open']}, errors {report['errors']}"
+    )
+    return report
+
+async def run_payment_reconciliation(max_transactions: Optional[int] = None) -> Optional[dict]:
+    """Run one reconciliation pass unless another worker is already doing so"""
+    run_id = str(uuid.uuid4())
+    if not await acquire_task_lock(PAYMENT_RECONCILE_LOCK, run_id, PAYMENT_RECONCILE_LEASE_SECONDS):
+        return None
+    try:
+        return await reconcile_payments(run_id, max_transactions)
+    finally:
+        await release_task_lock(PAYMENT_RECONCILE_LOCK, run_id)
+
+async def payment_reconciler():
+    while True:
+        await asyncio.sleep(settings.payment_reconcile_interval)
+        try:
+            await run_payment_reconciliation()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Payment reconciliation failed: {e}")
+
+@router.post("/admin/payments/reconcile")
+async def trigger_payment_reconciliation(limit: Optional[int] = None, admin: dict = Depends(get_admin_user)):
+    report = await run_payment_reconciliation(limit)
+    if report is None:
+        raise HTTPException(status_code=409, detail="A reconciliation is already running")
+    return report
+
+@router.get("/admin/payments/reconciliations")
+async def list_payment_reconciliations(admin: dict = Depends(get_admin_user)):
+    return await db.payment_reconciliations.find({}, {"_id": 0}).sort("started_at", -1).limit(20).to_list(20)
+
+async def create_indexes():
+    await db.payment_transactions.create_index([("payment_status", 1), ("created_at", 1), ("id", 1)])
+    await db.payment_transactions.create_index("session_id")
+    await db.payment_transactions.create_index("order_id")
+    await db.payment_reconciliations.create_index("run_id")
+    await db.payment_reconciliations.create_index("started_at")
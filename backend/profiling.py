@@ -0,0 +1,237 @@
+"""Opt-in per-request profiling.
+
+An admin adds `X-Profile: 1` (or `?_profile=1`) to a request. The middleware
+then samples the event loop thread's stack while the request runs and records
+every Mongo command it issues. A summary goes back in Server-Timing/X-Profile-Id
+headers and the full report is stored for GET /api/admin/profiles/{id}.
+
+Requests without the flag only pay for a header lookup here and a ContextVar
+read per Mongo command in the listener.
+"""
+import os
+import sys
+import time
+import uuid
+import threading
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs
+
+from pymongo import monitoring
+
+from request_logging import record_mongo_time
+
+logger = logging.getLogger(__name__)
+
+# Default stack sampling period; create_app passes PROFILE_SAMPLE_INTERVAL_MS
+PROFILE_SAMPLE_INTERVAL = 0.002
+PROFILE_TOP_N = 25
+PROFILE_STACK_DEPTH = 40
+PROFILE_SLOW_COMMANDS = 10
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Attributes Mongo commands to the profiled request they run under, and
+    their time to the request's log record.
+
+    Motor runs pymongo on an executor with the caller's context copied, so
+    the ContextVar set by the middleware is visible here.
+    """
+    def started(self, event):
+        profile = current_profile.get()
+        if profile is not None:
+            collection = event.command.get(event.command_name)
+            profile.pending[event.request_id] = (
+                event.command_name,
+                collection if isinstance(collection, str) else None
+            )
+
+    def succeeded(self, event):
+        record_mongo_time(event.duration_micros)
+        profile = current_profile.get()
+        if profile is not None:
+            profile.finish_command(event, returned_documents(event.reply))
+
+    def failed(self, event):
+        record_mongo_time(event.duration_micros)
+        profile = current_profile.get()
+        if profile is not None:
+            profile.finish_command(event, 0, failed=True)
+
+def returned_documents(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "value" in reply:
+        # findAndModify
+        return 1 if reply["value"] is not None else 0
+    return int(reply.get("n", 0))
+
+mongo_command_listener = MongoCommandListener()
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread"""
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < PROFILE_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self) -> dict:
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        def ranked(counter: Counter) -> list:
+            return [
+                {"function": function, "samples": count, "percent": round(100 * count / self.samples, 1)}
+                for function, count in counter.most_common(PROFILE_TOP_N)
+            ]
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            # The event loop thread is shared, so concurrent requests can show up here too
+            "self": ranked(own),
+            "cumulative": ranked(total),
+            "hottest_stack": list(self.stacks.most_common(1)[0][0]) if self.stacks else []
+        }
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, user_id: str):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.pending: dict = {}
+        self.commands: list = []
+        self.status: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def finish_command(self, event, documents: int, failed: bool = False):
+        name, collection = self.pending.pop(event.request_id, (event.command_name, None))
+        with self._lock:
+            self.commands.append({
+                "command": name,
+                "collection": collection,
+                "duration_ms": event.duration_micros / 1000,
+                "documents": documents,
+                "failed": failed
+            })
+
+    def mongo_summary(self) -> dict:
+        by_command: dict = {}
+        for command in self.commands:
+            key = (command["command"], command["collection"])
+            entry = by_command.setdefault(key, {
+                "command": command["command"], "collection": command["collection"],
+                "count": 0, "duration_ms": 0.0, "documents": 0
+            })
+            entry["count"] += 1
+            entry["duration_ms"] += command["duration_ms"]
+            entry["documents"] += command["documents"]
+        return {
+            "commands": len(self.commands),
+            "duration_ms": round(sum(c["duration_ms"] for c in self.commands), 3),
+            "documents": sum(c["documents"] for c in self.commands),
+            "by_command": sorted(by_command.values(), key=lambda e: e["duration_ms"], reverse=True),
+            "slowest": sorted(self.commands, key=lambda c: c["duration_ms"], reverse=True)[:PROFILE_SLOW_COMMANDS]
+        }
+
+    def server_timing(self) -> str:
+        mongo = self.mongo_summary()
+        elapsed = (time.perf_counter() - self.started) * 1000
+        return (
+            f'app;dur={elapsed:.1f}, '
+            f'mongo;dur={mongo["duration_ms"]:.1f};desc="{mongo["commands"]} commands, {mongo["documents"]} docs"'
+        )
+
+def profiling_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile" and value not in (b"", b"0", b"false"):
+            return True
+    query = scope.get("query_string", b"")
+    return b"_profile=" in query and parse_qs(query.decode()).get("_profile", ["0"])[0] not in ("", "0", "false")
+
+class ProfilingMiddleware:
+    """`authorize(authorization_header)` returns the admin user id or None;
+    `store(report)` persists a finished report."""
+    def __init__(self, app, authorize, store, sample_interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.app = app
+        self.authorize = authorize
+        self.store = store
+        self.sample_interval = sample_interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode()
+        user_id = await self.authorize(authorization)
+        if not user_id:
+            # Not an admin: serve the request as if the flag were absent
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], user_id)
+
+        async def send_with_report(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        token = current_profile.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            sampler.stop()
+            current_profile.reset(token)
+            report = {
+                "id": profile.id,
+                "method": profile.method,
+                "path": profile.path,
+                "query": scope.get("query_string", b"").decode(),
+                "status": profile.status,
+                "user_id": profile.user_id,
+                "duration_ms": round((time.perf_counter() - profile.started) * 1000, 2),
+                "mongo": profile.mongo_summary(),
+                "cpu": sampler.report(),
+                "created_at": datetime.now(timezone.utc)
+            }
+            try:
+                await self.store(report)
+            except Exception as e:
+                logger.error(f"Could not store request profile {profile.id}: {e}")
@@ -0,0 +1,298 @@
+"""Precomputed "customers also bought" recommendations.
+
+A batch job turns paid orders into a sparse item-item co-purchase matrix and
+stores each product's top neighbours, so /api/products/{id}/related is an
+indexed lookup instead of a scan over order history. Runs are incremental:
+only orders paid since the last run are read, their co-purchase counts are
+added to `product_copurchases`, and the products they touch are rescored along
+with every product bought with one of them (a product's order count is in the
+cosine denominator of each of its neighbours' scores). A full rebuild recounts
+everything from scratch:
+
+    python recommendations.py [--full]
+"""
+import asyncio
+import logging
+import uuid
+from array import array
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pymongo import UpdateOne
+
+from core import db, settings, archive_of
+from auth import get_admin_user
+from payments import acquire_task_lock, release_task_lock
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+RELATED_TOP_K = 8
+RELATED_LOCK = "related_products"
+# Renewed between phases, so it only has to outlast the longest one
+RELATED_LEASE_SECONDS = 1800
+RELATED_WRITE_BATCH = 1000
+RELATED_READ_BATCH = 10000
+# Orders paid this recently may still be committing; the next run picks them up
+RELATED_SETTLE_SECONDS = 60
+RELATED_STATE_ID = "co_purchases"
+RELATED_CARD_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "price_bbd": 1, "price_usd": 1,
+    "price_bbd_cents": 1, "price_usd_cents": 1, "prices": 1, "category": 1,
+    "images": {"$slice": 1}, "stock": 1, "featured": 1, "average_rating": 1, "review_count": 1
+}
+
+class Baskets:
+    """Orders as (order, product) index pairs, ready for a sparse matrix"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.product_ids: List[str] = []
+        self.rows = array("q")
+        self.cols = array("q")
+        self.count = 0
+
+    def column(self, product_id: str) -> int:
+        col = self.index.get(product_id)
+        if col is None:
+            col = self.index[product_id] = len(self.product_ids)
+            self.product_ids.append(product_id)
+        return col
+
+    def add(self, product_ids: List[str]):
+        for product_id in product_ids:
+            self.rows.append(self.count)
+            self.cols.append(self.column(product_id))
+        self.count += 1
+
+    def co_purchases(self):
+        """Sparse C where C[i, j] counts orders holding both i and j, and C[i, i] orders holding i"""
+        import numpy as np
+        from scipy import sparse
+        rows = np.frombuffer(self.rows, dtype=np.int64)
+        cols = np.frombuffer(self.cols, dtype=np.int64)
+        orders = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(self.count, len(self.product_ids))
+        )
+        # A product listed twice in one order still counts once
+        orders.data[:] = 1
+        return (orders.T @ orders).tocsr()
+
+def top_neighbours(counts, order_counts, k: int):
+    """Cosine-scored top `k` neighbours per row of a co-purchase count matrix.
+
+    `order_counts[j]` is how many orders hold product j. Returns parallel
+    (rows, cols, scores) arrays sorted by row, then by descending score.
+    """
+    import numpy as np
+    coo = counts.tocoo()
+    off_diagonal = coo.row != coo.col
+    rows, cols = coo.row[off_diagonal], coo.col[off_diagonal]
+    scores = coo.data[off_diagonal] / np.sqrt(order_counts[rows].astype(np.float64) * order_counts[cols])
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    return rows[keep], cols[keep], scores[keep]
+
+async def load_baskets(query: dict, collections: List) -> Baskets:
+    baskets = Baskets()
+    for collection in collections:
+        cursor = collection.find(query, {"_id": 0, "items.product_id": 1}).batch_size(RELATED_READ_BATCH)
+        async for order in cursor:
+            baskets.add([item["product_id"] for item in order.get("items", [])])
+    return baskets
+
+async def bulk_write_batched(collection, operations: List):
+    for start in range(0, len(operations), RELATED_WRITE_BATCH):
+        await collection.bulk_write(operations[start:start + RELATED_WRITE_BATCH], ordered=False)
+
+async def add_co_purchases(baskets: Baskets):
+    """Fold a batch of orders into the stored co-purchase counts"""
+    counts = baskets.co_purchases()
+    ids = baskets.product_ids
+    operations = []
+    for i in range(counts.shape[0]):
+        start, end = counts.indptr[i], counts.indptr[i + 1]
+        increments = {}
+        for j, count in zip(counts.indices[start:end], counts.data[start:end]):
+            key = "orders" if j == i else f"pairs.{ids[j]}"
+            increments[key] = int(count)
+        operations.append(UpdateOne({"product_id": ids[i]}, {"$inc": increments}, upsert=True))
+    await bulk_write_batched(db.product_copurchases, operations)
+
+async def with_neighbours(product_ids: List[str]) -> List[str]:
+    """`product_ids` and every product bought together with one of them"""
+    found = dict.fromkeys(product_ids)
+    for start in range(0, len(product_ids), RELATED_WRITE_BATCH):
+        batch = product_ids[start:start + RELATED_WRITE_BATCH]
+        async for row in db.product_copurchases.find({"product_id": {"$in": batch}}, {"_id": 0, "pairs": 1}):
+            found.update(dict.fromkeys(row.get("pairs", {})))
+    return list(found)
+
+async def rescore(product_ids: List[str]):
+    """Recompute and store the top neighbours of `product_ids` from the stored counts"""
+    import numpy as np
+    from scipy import sparse
+    index: Dict[str, int] = {}
+    order_counts = []
+    async for row in db.product_copurchases.find({}, {"_id": 0, "product_id": 1, "orders": 1}).batch_size(RELATED_READ_BATCH):
+        index[row["product_id"]] = len(order_counts)
+        order_counts.append(row.get("orders", 0))
+
+    targets = [product_id for product_id in product_ids if product_id in index]
+    rows, cols, data = array("q"), array("q"), array("q")
+    for start in range(0, len(targets), RELATED_WRITE_BATCH):
+        batch = targets[start:start + RELATED_WRITE_BATCH]
+        async for row in db.product_copurchases.find({"product_id": {"$in": batch}}, {"_id": 0, "product_id": 1, "pairs": 1}):
+            i = index[row["product_id"]]
+            for other_id, count in row.get("pairs", {}).items():
+                if other_id in index:
+                    rows.append(i)
+                    cols.append(index[other_id])
+                    data.append(count)
+    counts = sparse.coo_matrix(
+        (np.frombuffer(data, dtype=np.int64), (np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64))),
+        shape=(len(index), len(index))
+    )
+    top_rows, top_cols, top_scores = top_neighbours(counts, np.array(order_counts, dtype=np.int64), RELATED_TOP_K)
+
+    ids = list(index)
+    related: Dict[str, List[dict]] = {product_id: [] for product_id in targets}
+    for i, j, score in zip(top_rows.tolist(), top_cols.tolist(), top_scores.tolist()):
+        related[ids[i]].append({"product_id": ids[j], "score": round(score, 4)})
+    now = datetime.now(timezone.utc).isoformat()
+    await bulk_write_batched(db.related_products, [
+        UpdateOne({"product_id": product_id}, {"$set": {"related": neighbours, "updated_at": now}}, upsert=True)
+        for product_id, neighbours in related.items()
+    ])
+
+class LeaseLost(Exception):
+    pass
+
+async def renew_lease(run_id: str):
+    if not await acquire_task_lock(RELATED_LOCK, run_id, RELATED_LEASE_SECONDS):
+        raise LeaseLost()
+
+async def refresh_related_products(full: bool = False) -> Optional[dict]:
+    """One refresh pass, unless another worker is already running one"""
+    run_id = str(uuid.uuid4())
+    if not await acquire_task_lock(RELATED_LOCK, run_id, RELATED_LEASE_SECONDS):
+        return None
+    try:
+        return await run_refresh(run_id, full)
+    except LeaseLost:
+        logger.warning("Related products refresh stopped: another worker took over its lease")
+        return None
+    finally:
+        await release_task_lock(RELATED_LOCK, run_id)
+
+async def run_refresh(run_id: str, full: bool) -> dict:
+    started = datetime.now(timezone.utc)
+    cutoff = (started - timedelta(seconds=RELATED_SETTLE_SECONDS)).isoformat()
+    state = await db.recommendation_state.find_one({"_id": RELATED_STATE_ID}) or {}
+    full = full or "paid_through" not in state
+    if full:
+        # Orders paid before `paid_at` was recorded have none, so match on "not after"
+        query = {"payment_status": "paid", "paid_at": {"$not": {"$gt": cutoff}}}
+    else:
+        query = {"payment_status": "paid", "paid_at": {"$gt": state["paid_through"], "$lte": cutoff}}
+
+    # Orders are archived long after they are counted, so only a full rebuild reads the archive
+    baskets = await load_baskets(query, [db.orders, archive_of(db.orders)] if full else [db.orders])
+    # Counts are added, not set: make sure no one else is about to add them too
+    await renew_lease(run_id)
+    if full:
+        await db.product_copurchases.delete_many({})
+    if baskets.count:
+        await add_co_purchases(baskets)
+    if full:
+        rescored = await db.product_copurchases.distinct("product_id")
+        await db.related_products.delete_many({"product_id": {"$nin": rescored}})
+    else:
+        rescored = await with_neighbours(baskets.product_ids)
+    await renew_lease(run_id)
+    if rescored:
+        await rescore(rescored)
+
+    report = {
+        "full": full,
+        "orders": baskets.count,
+        "products_rescored": len(rescored),
+        "duration_ms": round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1)
+    }
+    await renew_lease(run_id)
+    await db.recommendation_state.update_one(
+        {"_id": RELATED_STATE_ID},
+        {"$set": {"paid_through": cutoff, "last_run": {**report, "finished_at": datetime.now(timezone.utc).isoformat()}}},
+        upsert=True
+    )
+    logger.info(f"Related products refreshed: {report}")
+    return report
+
+async def related_products_refresher():
+    while True:
+        await asyncio.sleep(settings.related_refresh_interval)
+        try:
+            await refresh_related_products()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Related products refresh failed: {e}")
+
+@router.get("/products/{product_id}/related")
+async def get_related_products(product_id: str, limit: int = 4):
+    """Products most often bought together with this one"""
+    limit = max(1, min(limit, RELATED_TOP_K))
+    stored = await db.related_products.find_one({"product_id": product_id}, {"_id": 0, "related": 1})
+    related_ids = [neighbour["product_id"] for neighbour in (stored or {}).get("related", [])[:limit]]
+    if not related_ids:
+        return []
+    products = {
+        product["id"]: product
+        async for product in db.products.find({"id": {"$in": related_ids}}, RELATED_CARD_PROJECTION)
+    }
+    cards = []
+    for related_id in related_ids:
+        product = products.get(related_id)
+        if product:
+            images = product.pop("images", [])
+            product["image"] = images[0] if images else ""
+            cards.append(product)
+    return cards
+
+@router.post("/admin/recommendations/refresh")
+async def trigger_related_refresh(full: bool = False, admin: dict = Depends(get_admin_user)):
+    report = await refresh_related_products(full)
+    if report is None:
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return report
+
+async def create_indexes():
+    await db.orders.create_index([("payment_status", 1), ("paid_at", 1)])
+    await db.product_copurchases.create_index("product_id", unique=True)
+    await db.related_products.create_index("product_id", unique=True)
+
+async def main():
+    import argparse
+    from config import Settings
+    import core
+
+    parser = argparse.ArgumentParser(description="Refresh the co-purchase recommendations")
+    parser.add_argument("--full", action="store_true", help="Recount all paid orders")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    core.configure(Settings.from_env())
+    await create_indexes()
+    try:
+        report = await refresh_related_products(args.full)
+        if report is None:
+            logger.info("Another refresh is already running")
+    finally:
+        core.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,217 @@
+"""Structured request logging with correlation IDs.
+
+RequestLogMiddleware gives every request an ID. The ID is the caller's
+X-Request-ID when it is a plain token, otherwise a new one, and it goes back
+in the X-Request-ID response header. Every record logged while the request
+runs carries it, so the ID a customer quotes finds all of that request's
+lines. One access record per request holds the route, status, duration, user
+id and time spent in Mongo. Access records are sampled per route
+(LOG_ROUTE_SAMPLE_RATES="/api/products=0.1,/api/admin/events=0"); 5xx
+responses and requests slower than LOG_SLOW_MS are always kept.
+
+Handlers on the event loop only put records on a bounded queue. A
+QueueListener thread formats and writes them, and records are dropped and
+counted if the queue is full, so logging never blocks a request.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+access_logger = logging.getLogger("perennia.access")
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Caller-supplied IDs end up in the logs, so only plain tokens are accepted
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+LOG_QUEUE_SIZE = 10000
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+class RequestContext:
+    __slots__ = ("request_id", "user_id", "mongo_ms", "mongo_commands")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.user_id: Optional[str] = None
+        self.mongo_ms = 0.0
+        self.mongo_commands = 0
+
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+def set_request_user(user_id: str):
+    context = current_request.get()
+    if context is not None:
+        context.user_id = user_id
+
+def record_mongo_time(duration_micros: int):
+    """Called by the Mongo command listener; Motor's executor threads share the request's context"""
+    context = current_request.get()
+    if context is not None:
+        context.mongo_ms += duration_micros / 1000
+        context.mongo_commands += 1
+
+# ===================== HANDLERS AND FORMATTERS =====================
+
+class RequestIdFilter(logging.Filter):
+    """Stamps the request ID while still on the thread that logged the record"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = current_request.get()
+        record.request_id = context.request_id if context is not None else None
+        return True
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.addFilter(RequestIdFilter())
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the message arguments and render any traceback here, while
+        # they are still valid; the listener thread does the rest
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+_queue_handler: Optional[LogQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(log_format: str = "json", level: str = "INFO"):
+    """Route the root logger through the queue; replaces an earlier configuration"""
+    global _queue_handler, _listener
+    stop_logging()
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    _queue_handler = LogQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+    _listener.start()
+
+def stop_logging():
+    """Write out whatever is still queued and detach the queue handler"""
+    global _queue_handler, _listener
+    if _listener is not None:
+        _listener.stop()
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = _listener = None
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+# ===================== ACCESS LOG =====================
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """"/api/products=0.1,/api/admin/events=0" -> {route: rate}"""
+    rates = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        route, _, rate = entry.rpartition("=")
+        if not route:
+            raise ValueError(f"Sample rate must look like ROUTE=RATE: {entry}")
+        rates[route.strip()] = float(rate)
+    return rates
+
+class RouteSampler:
+    def __init__(self, default_rate: float = 1.0, route_rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self.route_rates = route_rates or {}
+
+    def rate(self, route: str) -> float:
+        return self.route_rates.get(route, self.default_rate)
+
+    def keep(self, rate: float) -> bool:
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+def request_id_from(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            candidate = value.decode("latin-1")
+            if VALID_REQUEST_ID.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+class RequestLogMiddleware:
+    def __init__(self, app, sampler: RouteSampler, slow_ms: float):
+        self.app = app
+        self.sampler = sampler
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        context = RequestContext(request_id_from(scope))
+        token = current_request.set(context)
+        started = time.perf_counter()
+        status = 500
+        error = None
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, context.request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            error = sys.exc_info()
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            # FastAPI leaves the matched route in the scope; templates keep the sample keys bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            rate = self.sampler.rate(route)
+            slow = duration_ms >= self.slow_ms
+            if status >= 500 or slow or self.sampler.keep(rate):
+                level = logging.ERROR if status >= 500 else logging.WARNING if slow else logging.INFO
+                access_logger.log(level, "request", exc_info=error, extra={"fields": {
+                    "method": scope["method"],
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                    "user_id": context.user_id,
+                    "mongo_ms": round(context.mongo_ms, 2),
+                    "mongo_commands": context.mongo_commands,
+                    "sample_rate": rate
+                }})
+            current_request.reset(token)
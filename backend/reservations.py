@@ -0,0 +1,172 @@
+"""Stock holds for unpaid orders and the sweeper that releases them"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict
+
+from pymongo import UpdateOne
+
+from core import db, settings
+from events import event_broker
+from caching import invalidate_stock
+
+logger = logging.getLogger(__name__)
+
+# Stripe orders hold their stock for a limited time. A background sweeper hands
+# expired holds back to the catalog and cancels the order; a confirmed payment
+# commits the hold instead.
+RESERVATION_SWEEP_BATCH = 500
+# Closed reservations are kept this long for auditing before the TTL index drops them
+RESERVATION_RETENTION_SECONDS = 7 * 86400
+# A claim is settled within seconds; one this old belongs to a sweeper that died
+RESERVATION_CLAIM_TIMEOUT_SECONDS = 300
+
+async def create_reservation(order_id: str, items: List[dict]):
+    now = datetime.now(timezone.utc)
+    await db.stock_reservations.insert_one({
+        "id": str(uuid.uuid4()),
+        "order_id": order_id,
+        "items": [{"product_id": item["product_id"], "quantity": item["quantity"]} for item in items],
+        "status": "held",
+        "expires_at": now + timedelta(minutes=settings.reservation_ttl_minutes),
+        "created_at": now.isoformat()
+    })
+
+async def restock(reservations: List[dict]):
+    """Return the stock of several reservations with one bulk write"""
+    quantities: Dict[str, int] = {}
+    for reservation in reservations:
+        for item in reservation["items"]:
+            quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+    if quantities:
+        await db.products.bulk_write(
+            [UpdateOne({"id": pid}, {"$inc": {"stock": qty}}) for pid, qty in quantities.items()],
+            ordered=False
+        )
+        # A product is back in stock if no more than what we returned is on the shelf now
+        levels = await db.products.find({"id": {"$in": list(quantities)}}, {"_id": 0, "id": 1, "stock": 1}).to_list(None)
+        await invalidate_stock(quantities, any(product["stock"] <= quantities[product["id"]] for product in levels))
+
+async def release_reservations(query: dict, reason: str, limit: int = RESERVATION_SWEEP_BATCH) -> int:
+    """Claim held reservations matching `query`, restock them and cancel their orders.
+
+    Claiming flips status to "releasing" under a per-call token first, so two
+    sweepers (or a sweeper and a cancel request) never restock the same hold.
+    A payment can still commit a claimed hold; the claim is then settled as
+    "released" only for the holds it still owns, and only those are restocked.
+    """
+    candidates = await db.stock_reservations.find(
+        {**query, "status": "held"}, {"_id": 0, "id": 1}
+    ).sort("expires_at", 1).limit(limit).to_list(limit)
+    if not candidates:
+        return 0
+    
+    claim = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    await db.stock_reservations.update_many(
+        {"id": {"$in": [c["id"] for c in candidates]}, "status": "held"},
+        {"$set": {"status": "releasing", "claim": claim, "claimed_at": now}}
+    )
+    # `released_by` outlives a later commit, so it finds exactly what this call settled
+    await db.stock_reservations.update_many(
+        {"claim": claim, "status": "releasing"},
+        {"$set": {"status": "released", "released_by": claim, "closed_at": now}, "$unset": {"claim": "", "claimed_at": ""}}
+    )
+    released = await db.stock_reservations.find({"released_by": claim}, {"_id": 0}).to_list(limit)
+    if not released:
+        return 0
+    
+    await restock(released)
+    await db.orders.update_many(
+        {"id": {"$in": [r["order_id"] for r in released]}, "payment_status": {"$ne": "paid"}},
+        {"$set": {"status": "cancelled", "payment_status": reason}}
+    )
+    for reservation in released:
+        await event_broker.publish("order_status_changed", {"order_id": reservation["order_id"], "status": "cancelled"})
+    return len(released)
+
+async def commit_reservation(order_id: str):
+    """Make a paid order's stock hold permanent"""
+    # A hold a sweeper has claimed but not yet settled is taken over; the
+    # sweeper then neither restocks it nor cancels the order
+    reservation = await db.stock_reservations.find_one_and_update(
+        {"order_id": order_id, "status": {"$in": ["held", "releasing"]}},
+        {"$set": {"status": "committed", "closed_at": datetime.now(timezone.utc)}, "$unset": {"claim": "", "claimed_at": ""}}
+    )
+    if reservation:
+        return
+    
+    # Payment landed after the hold expired: the stock went back to the shelf,
+    # so take it again rather than lose a paid order.
+    released = await db.stock_reservations.find_one_and_update(
+        {"order_id": order_id, "status": "released"},
+        {"$set": {"status": "committed", "closed_at": datetime.now(timezone.utc)}}
+    )
+    if released:
+        logger.warning(f"Payment for order {order_id} arrived after its reservation expired")
+        await retake_stock(order_id, released["items"])
+
+async def retake_stock(order_id: str, items: List[dict]):
+    """Take a paid order's items off the shelf again, only where enough is left.
+
+    Whatever someone else bought in the meantime is recorded on the order as
+    oversold and reported to the admins; stock never goes negative.
+    """
+    taken, oversold = [], []
+    for item in items:
+        result = await db.products.update_one(
+            {"id": item["product_id"], "stock": {"$gte": item["quantity"]}},
+            {"$inc": {"stock": -item["quantity"]}}
+        )
+        (taken if result.modified_count else oversold).append(item)
+    if taken:
+        await invalidate_stock([item["product_id"] for item in taken], True)
+    if oversold:
+        logger.error(f"Order {order_id} was paid for {len(oversold)} items no longer in stock")
+        await db.orders.update_one({"id": order_id}, {"$set": {"oversold": oversold}})
+        await event_broker.publish("order_oversold", {"order_id": order_id, "items": oversold})
+
+async def reclaim_stale_claims() -> int:
+    """Hand holds left "releasing" by a sweeper that died mid-release back to "held".
+
+    Nothing was restocked for them yet, so the next release starts over.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=RESERVATION_CLAIM_TIMEOUT_SECONDS)
+    result = await db.stock_reservations.update_many(
+        {"status": "releasing", "claimed_at": {"$lt": cutoff}},
+        {"$set": {"status": "held"}, "$unset": {"claim": "", "claimed_at": ""}}
+    )
+    if result.modified_count:
+        logger.warning(f"Reclaimed {result.modified_count} stale reservation claims")
+    return result.modified_count
+
+async def sweep_expired_reservations() -> int:
+    await reclaim_stale_claims()
+    released = 0
+    while True:
+        count = await release_reservations(
+            {"expires_at": {"$lte": datetime.now(timezone.utc)}}, "expired"
+        )
+        released += count
+        if count < RESERVATION_SWEEP_BATCH:
+            return released
+
+async def reservation_sweeper():
+    while True:
+        try:
+            released = await sweep_expired_reservations()
+            if released:
+                logger.info(f"Released {released} expired stock reservations")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Reservation sweep failed: {e}")
+        await asyncio.sleep(settings.reservation_sweep_interval)
+
+async def create_indexes():
+    await db.stock_reservations.create_index([("status", 1), ("expires_at", 1)])
+    await db.stock_reservations.create_index("order_id")
+    await db.stock_reservations.create_index("claim", sparse=True)
+    await db.stock_reservations.create_index("released_by", sparse=True)
+    await db.stock_reservations.create_index("closed_at", expireAfterSeconds=RESERVATION_RETENTION_SECONDS)
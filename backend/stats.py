@@ -0,0 +1,145 @@
+"""Write-behind product view and add-to-cart counters"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+from pymongo import UpdateOne
+
+from core import db, settings
+from auth import get_admin_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Request paths only bump an in-memory counter; a background flusher folds the
+# pending counts into `product_stats` with one unordered bulk write per
+# interval. Each worker process keeps its own counters and `$inc` merges them
+# in Mongo, so a crash loses at most one interval of one worker's counts.
+COUNTER_FIELDS = ("views", "cart_adds")
+# Flush early once this many products have pending counts
+PENDING_FLUSH_THRESHOLD = 1000
+# An add-to-cart weighs this many views in the "popular" sort
+CART_ADD_WEIGHT = 5
+
+class ProductCounters:
+    def __init__(self):
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.wakeup: asyncio.Event = None
+
+    def record(self, product_id: str, field: str, amount: int = 1):
+        counts = self.pending.get(product_id)
+        if counts is None:
+            counts = self.pending[product_id] = dict.fromkeys(COUNTER_FIELDS, 0)
+            if len(self.pending) >= PENDING_FLUSH_THRESHOLD and self.wakeup is not None:
+                self.wakeup.set()
+        counts[field] += amount
+
+    def merge(self, batch: Dict[str, Dict[str, int]]):
+        for product_id, counts in batch.items():
+            for field, amount in counts.items():
+                if amount:
+                    self.record(product_id, field, amount)
+
+    async def flush(self) -> int:
+        """Write the pending counts; a failed write puts them back for the next try"""
+        batch, self.pending = self.pending, {}
+        if not batch:
+            return 0
+        now = datetime.now(timezone.utc).isoformat()
+        operations = [
+            UpdateOne(
+                {"product_id": product_id},
+                {"$inc": {field: amount for field, amount in counts.items() if amount}, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for product_id, counts in batch.items()
+        ]
+        try:
+            await db.product_stats.bulk_write(operations, ordered=False)
+        except Exception:
+            self.failed_flushes += 1
+            self.merge(batch)
+            raise
+        except BaseException:
+            # Cancelled mid-write (shutdown): keep the batch for the final flush.
+            # Should the write have landed anyway, these counts are applied
+            # twice; popularity tolerates that better than losing them.
+            self.merge(batch)
+            raise
+        self.flushed += len(batch)
+        return len(batch)
+
+    async def run(self):
+        # Created here so the event belongs to the running loop
+        self.wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=settings.product_stats_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Product stats flush failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending_products": len(self.pending),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes
+        }
+
+product_counters = ProductCounters()
+
+def record_view(product_id: str):
+    product_counters.record(product_id, "views")
+
+def record_cart_add(product_id: str, quantity: int = 1):
+    product_counters.record(product_id, "cart_adds", quantity)
+
+def popularity_stages() -> list:
+    """Aggregation stages that order products by their flushed counters"""
+    return [
+        {
+            "$lookup": {
+                "from": "product_stats",
+                "localField": "id",
+                "foreignField": "product_id",
+                "as": "product_stats"
+            }
+        },
+        {
+            "$addFields": {
+                "popularity": {
+                    "$add": [
+                        {"$ifNull": [{"$arrayElemAt": ["$product_stats.views", 0]}, 0]},
+                        {"$multiply": [{"$ifNull": [{"$arrayElemAt": ["$product_stats.cart_adds", 0]}, 0]}, CART_ADD_WEIGHT]}
+                    ]
+                }
+            }
+        },
+        {"$sort": {"popularity": -1, "id": 1}},
+        {"$project": {"product_stats": 0, "popularity": 0}}
+    ]
+
+@router.get("/admin/products/stats")
+async def get_product_stats(limit: int = 50, admin: dict = Depends(get_admin_user)):
+    """Most viewed products with their add-to-cart conversion"""
+    limit = max(1, min(limit, 500))
+    rows = await db.product_stats.find({}, {"_id": 0}).sort("views", -1).limit(limit).to_list(limit)
+    for row in rows:
+        views = row.get("views", 0)
+        row["conversion_rate"] = round(row.get("cart_adds", 0) / views, 4) if views else None
+    return {"products": rows, "counters": product_counters.stats()}
+
+async def create_indexes():
+    await db.product_stats.create_index("product_id", unique=True)
+    await db.product_stats.create_index([("views", -1)])
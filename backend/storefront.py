@@ -0,0 +1,257 @@
+"""Contact form, site settings and the first-render bootstrap"""
+import asyncio
+import uuid
+import json
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from core import db, parse_fields, fields_projection
+from models import ContactMessage, SiteSettingsUpdate, ThemeColors
+from auth import get_admin_user, get_optional_user, public_user
+from events import event_broker
+from caching import settings_cache, invalidation_bus, bootstrap_cache
+from catalog import list_products, load_product_facets
+from notifications import contact_emails, notify
+
+router = APIRouter()
+
+# Root endpoint
+@router.get("/")
+async def root():
+    return {"message": "Perennia API - Handcrafted Luxury"}
+
+# ===================== CONTACT ROUTES =====================
+
+@router.post("/contact")
+async def submit_contact(message: ContactMessage):
+    now = datetime.now(timezone.utc)
+    msg = {
+        "id": str(uuid.uuid4()),
+        **message.model_dump(),
+        "created_at": now.isoformat(),
+        "read": False
+    }
+    # A real date for the contact retention TTL index (see archive.py)
+    await db.contact_messages.insert_one({**msg, "received_at": now})
+    await event_broker.publish("contact_created", {"message": msg})
+    for email in contact_emails(msg):
+        await notify(email)
+    return {"message": "Message sent successfully"}
+
+CONTACT_FIELDS = set(ContactMessage.model_fields) | {"id", "created_at", "read"}
+
+@router.get("/admin/contacts")
+async def get_contact_messages(fields: Optional[str] = None, admin: dict = Depends(get_admin_user)):
+    selected = parse_fields(fields, CONTACT_FIELDS)
+    projection = {"_id": 0, "received_at": 0} if selected is None else fields_projection(selected)
+    messages = await db.contact_messages.find({}, projection).sort("created_at", -1).to_list(100)
+    return messages
+
+# ===================== SITE SETTINGS ROUTES =====================
+
+@router.get("/settings")
+async def get_site_settings():
+    """Get site settings (public endpoint)"""
+    settings = settings_cache.get("main")
+    if settings is not None:
+        return settings
+    generation = settings_cache.generation
+    settings = await db.site_settings.find_one({"id": "main"}, {"_id": 0})
+    if not settings:
+        # Return default settings
+        default_settings = {
+            "id": "main",
+            "business_name": "Perennia",
+            "tagline": "Handcrafted Luxury from Barbados",
+            "logo_url": "/logo-transparent.png",
+            "social_links": {
+                "instagram": "",
+                "facebook": "",
+                "twitter": "",
+                "tiktok": "",
+                "whatsapp": "",
+                "youtube": "",
+                "pinterest": ""
+            },
+            "contact_info": {
+                "address": "Bridgetown, Barbados",
+                "phone": "+1 (246) 123-4567",
+                "email": "info@perennia.bb"
+            },
+            "hero_section": {
+                "tagline": "Handcrafted in Barbados",
+                "title": "Luxury Artisan",
+                "subtitle": "Gifts & Décor",
+                "description": "Discover our collection of handcrafted resin art, natural body care, and artisan candles. Each piece crafted with love and Caribbean spirit.",
+                "image_url": "https://images.unsplash.com/photo-1668086682339-f14262879c18?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxOTF8MHwxfHNlYXJjaHwxfHxhcnRpc2FuJTIwc2NlbnRlZCUyMGNhbmRsZSUyMGRhcmslMjBtb29kJTIwZ29sZHxlbnwwfHx8fDE3Njg5NDMzNDR8MA&ixlib=rb-4.1.0&q=85"
+            },
+            "about_section": {
+                "title": "Crafted with Love, Inspired by the Caribbean",
+                "content": "Perennia was born from a deep passion for artistry and the enchanting beauty of Barbados. What started as a personal creative journey has blossomed into a celebration of Caribbean craftsmanship.\n\nBased in the vibrant island of Barbados, Perennia represents more than just handcrafted goods—it's a testament to the rich artistic heritage of the Caribbean. Each resin piece captures the turquoise waters of our beaches, each candle carries the warmth of our tropical sunsets.\n\nOur body care line is crafted with natural ingredients, drawing from the healing traditions that have been passed down through generations. We believe that luxury should be accessible, sustainable, and deeply personal.",
+                "quote": "Every piece tells a story of Caribbean beauty and timeless elegance.",
+                "image_url": "https://images.unsplash.com/photo-1759794108525-94ff060da692?crop=entropy&cs=srgb&fm=jpg&ixid=M3w4NTYxODh8MHwxfHNlYXJjaHwyfHxsdXh1cnklMjBoYW5kbWFkZSUyMHNvYXAlMjBkYXJrJTIwYmFja2dyb3VuZHxlbnwwfHx8fDE3Njg5NDMzNDJ8MA&ixlib=rb-4.1.0&q=85"
+            },
+            "footer_text": "Handcrafted luxury from Barbados. Each piece tells a story of Caribbean artistry and timeless elegance.",
+            "theme_colors": {
+                "primary": "#D4AF37",
+                "secondary": "#40E0D0",
+                "accent": "#4A0E5C",
+                "background": "#050505",
+                "surface": "#0F0F0F",
+                "text_primary": "#F5F5F5",
+                "text_secondary": "#A3A3A3"
+            },
+            "layout_settings": {
+                "show_hero": True,
+                "show_categories": True,
+                "show_featured": True,
+                "show_about_snippet": True,
+                "show_newsletter": True,
+                "navbar_style": "glass",
+                "footer_style": "full",
+                "product_card_style": "default"
+            }
+        }
+        default_settings["theme_hash"] = await save_theme_stylesheet(default_settings["theme_colors"])
+        result = await db.site_settings.insert_one(default_settings)
+        # Remove _id before returning
+        default_settings.pop("_id", None)
+        settings_cache.set("main", default_settings, generation)
+        return default_settings
+    if "theme_hash" not in settings:
+        # Saved before the theme was compiled to a stylesheet
+        settings["theme_hash"] = await save_theme_stylesheet(settings.get("theme_colors"))
+        await db.site_settings.update_one({"id": "main"}, {"$set": {"theme_hash": settings["theme_hash"]}})
+    settings_cache.set("main", settings, generation)
+    return settings
+
+@router.put("/admin/settings")
+async def update_site_settings(settings: SiteSettingsUpdate, admin: dict = Depends(get_admin_user)):
+    """Update site settings (admin only)"""
+    update_data = {k: v for k, v in settings.model_dump().items() if v is not None}
+    
+    # Handle nested objects
+    nested_fields = ["social_links", "contact_info", "hero_section", "about_section", "theme_colors", "layout_settings"]
+    for field in nested_fields:
+        if field in update_data and update_data[field]:
+            update_data[field] = update_data[field].model_dump() if hasattr(update_data[field], 'model_dump') else update_data[field]
+    
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No data to update")
+    if update_data.get("theme_colors"):
+        update_data["theme_hash"] = await save_theme_stylesheet(update_data["theme_colors"])
+    
+    # Check if settings exist
+    existing = await db.site_settings.find_one({"id": "main"})
+    if existing:
+        await db.site_settings.update_one({"id": "main"}, {"$set": update_data})
+    else:
+        update_data["id"] = "main"
+        await db.site_settings.insert_one(update_data)
+    
+    await invalidation_bus.publish("settings", "main")
+    updated = await db.site_settings.find_one({"id": "main"}, {"_id": 0})
+    return updated
+
+# ===================== BOOTSTRAP =====================
+
+# Everything the first page render needs in one round trip. The public part is
+# cached per worker and dropped on catalog or settings invalidation; the ETag
+# lets returning visitors revalidate with a 304.
+BOOTSTRAP_FEATURED_LIMIT = 6
+BOOTSTRAP_MAX_AGE = 60
+# Matches PRODUCT_CARD_FIELDS in the frontend's ProductCard
+BOOTSTRAP_PRODUCT_FIELDS = [
+    "id", "name", "price_bbd", "price_usd", "price_bbd_cents", "price_usd_cents", "prices", "category", "image",
+    "stock", "featured", "average_rating", "review_count"
+]
+
+def content_hash(value) -> str:
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+async def load_bootstrap() -> dict:
+    cached = bootstrap_cache.get("public")
+    if cached is not None:
+        return cached
+    generation = bootstrap_cache.generation
+    settings, featured, facets = await asyncio.gather(
+        get_site_settings(),
+        list_products(None, True, BOOTSTRAP_PRODUCT_FIELDS, BOOTSTRAP_FEATURED_LIMIT),
+        load_product_facets()
+    )
+    data = jsonable_encoder({"settings": settings, "featured_products": featured, "categories": facets["categories"]})
+    public = {"data": data, "hash": content_hash(data)}
+    bootstrap_cache.set("public", public, generation)
+    return public
+
+@router.get("/bootstrap")
+async def get_bootstrap(request: Request, user: Optional[dict] = Depends(get_optional_user)):
+    public = await load_bootstrap()
+    current_user = public_user(user) if user else None
+    etag = f'"{content_hash([public["hash"], current_user]) if current_user else public["hash"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if current_user else f"public, max-age={BOOTSTRAP_MAX_AGE}",
+        "Vary": "Authorization"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({**public["data"], "user": current_user}, headers=headers)
+
+# ===================== THEME STYLESHEET =====================
+
+# The theme colours compiled to CSS custom properties. Each stylesheet is
+# stored under the hash of its content and never changes, so it is served
+# with immutable caching; settings carry the current `theme_hash` and a
+# theme change is a new URL.
+THEME_CSS_VARIABLES = {
+    "primary": "--brand-gold",
+    "secondary": "--brand-turquoise",
+    "accent": "--brand-purple-haze",
+    "background": "--bg-default",
+    "surface": "--bg-paper",
+    "text_primary": "--text-primary",
+    "text_secondary": "--text-secondary"
+}
+THEME_MAX_AGE = 31536000
+# Values are written into a stylesheet, so anything beyond colour syntax falls back to the default
+SAFE_CSS_VALUE = re.compile(r"^[#A-Za-z0-9(),.% -]{1,64}$")
+
+def compile_theme_css(colors: Optional[dict]) -> str:
+    defaults = ThemeColors().model_dump()
+    declarations = []
+    for field, variable in THEME_CSS_VARIABLES.items():
+        value = (colors or {}).get(field)
+        if not isinstance(value, str) or not SAFE_CSS_VALUE.match(value):
+            value = defaults[field]
+        declarations.append(f"  {variable}: {value};")
+    # html:root outranks the :root defaults in index.css whatever order the stylesheets load in
+    return "html:root {\n" + "\n".join(declarations) + "\n}\n"
+
+async def save_theme_stylesheet(colors: Optional[dict]) -> str:
+    css = compile_theme_css(colors)
+    theme_hash = content_hash(css)[:16]
+    await db.theme_stylesheets.update_one(
+        {"_id": theme_hash},
+        {"$setOnInsert": {"css": css, "created_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    return theme_hash
+
+@router.get("/theme/{theme_hash}.css")
+async def get_theme_stylesheet(theme_hash: str):
+    stylesheet = await db.theme_stylesheets.find_one({"_id": theme_hash}, {"_id": 0, "css": 1})
+    if not stylesheet:
+        raise HTTPException(status_code=404, detail="Stylesheet not found")
+    return Response(
+        stylesheet["css"],
+        media_type="text/css",
+        headers={"Cache-Control": f"public, max-age={THEME_MAX_AGE}, immutable"}
+    )
@@ -0,0 +1,355 @@
+"""Synthetic catalog, customers, reviews and orders for load tests.
+
+Everything is derived from one seed, so the same arguments always produce the
+same documents. Popularity follows a Zipf-like curve: a few products collect
+most of the reviews and orders, as in a real shop. Documents are generated
+lazily and written with batched insert_many, so large runs stay flat in memory.
+
+    python synthetic.py --db perennia_load --scale 100
+    python synthetic.py --db perennia_load --products 50000 --users 200000 --orders 1000000
+
+The admin endpoint POST /api/admin/synthetic runs the same generator.
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Iterator, List, Optional
+
+import bcrypt
+
+from money import money_fields
+
+logger = logging.getLogger(__name__)
+
+# Per unit of --scale; roughly the size of the live shop today
+BASE_PRODUCTS = 9
+BASE_USERS = 25
+BASE_ORDERS = 40
+REVIEWS_PER_PRODUCT = 4
+INSERT_BATCH = 1000
+ZIPF_EXPONENT = 1.1
+SYNTHETIC_PASSWORD = "synthetic-password"
+
+CATEGORIES = {
+    "resin": (["Coaster Set", "Serving Tray", "Wall Clock", "Bookends", "Jewelry Dish", "Cheese Board"], (60, 320)),
+    "soaps": (["Body Scrub", "Shea Butter Soap", "Body Lotion", "Bath Bomb Set", "Lip Balm", "Body Oil"], (18, 70)),
+    "candles": (["Soy Candle", "Travel Tin", "Reed Diffuser", "Wax Melts", "Pillar Candle", "Candle Trio"], (30, 120))
+}
+ADJECTIVES = [
+    "Ocean Wave", "Coral Reef", "Sea Glass", "Sunset", "Turquoise", "Golden Sand", "Hibiscus",
+    "Coconut", "Mango", "Sea Salt", "Bajan Rum", "Passion Fruit", "Flying Fish", "Driftwood"
+]
+FIRST_NAMES = ["Amara", "Kemar", "Shanice", "Jaden", "Tamika", "Rohan", "Aaliyah", "Dwayne", "Keisha", "Marcus", "Nia", "Shamar"]
+LAST_NAMES = ["Alleyne", "Best", "Clarke", "Forde", "Greaves", "Holder", "Inniss", "King", "Layne", "Straker", "Thorne", "Walcott"]
+PARISHES = ["Christ Church", "St. Michael", "St. James", "St. Philip", "St. Peter", "St. Lucy", "St. George", "St. John"]
+COMMENTS = {
+    5: ["Absolutely beautiful, exceeded expectations.", "Gorgeous craftsmanship, buying another as a gift.", "Love it!"],
+    4: ["Lovely piece, shipping took a little while.", "Really nice, just slightly smaller than expected."],
+    3: ["It's okay. Nice but not quite what the photos showed."],
+    2: ["Disappointed with the finish on mine."],
+    1: ["Arrived damaged and the scent was very faint."]
+}
+# J-shaped, like most shop reviews
+RATING_WEIGHTS = {5: 0.52, 4: 0.24, 3: 0.09, 2: 0.05, 1: 0.10}
+
+class Generator:
+    def __init__(self, seed: int, products: int, users: int, orders: int,
+                 reviews_per_product: float, start: datetime, end: datetime):
+        self.rng = random.Random(seed)
+        self.product_count = products
+        self.user_count = users
+        self.order_count = orders
+        self.reviews_per_product = reviews_per_product
+        self.start = start
+        self.end = end
+        self.user_ids: List[str] = []
+        self.users_by_id: dict = {}
+        self.catalog: List[dict] = []
+        self.product_weights: List[float] = []
+        self.user_cum_weights: List[float] = []
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def timestamp(self, start: Optional[datetime] = None) -> datetime:
+        start = start or self.start
+        span = (self.end - start).total_seconds()
+        return start + timedelta(seconds=self.rng.random() * max(span, 0))
+
+    def password_hash(self) -> str:
+        # bcrypt is deliberately slow, so every synthetic user shares one hash;
+        # the salt comes from the seed to keep runs identical
+        alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+        salt = "".join(self.rng.choice(alphabet) for _ in range(21)) + self.rng.choice(".Oeu")
+        return bcrypt.hashpw(SYNTHETIC_PASSWORD.encode(), f"$2b$10${salt}".encode()).decode()
+
+    def users(self) -> Iterator[dict]:
+        password = self.password_hash()
+        for i in range(self.user_count):
+            user_id = self.uuid()
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            user = {
+                "id": user_id,
+                "email": f"user{i}@synthetic.perennia.test",
+                "password": password,
+                "first_name": first,
+                "last_name": last,
+                "phone": f"+1 (246) {self.rng.randint(200, 899)}-{self.rng.randint(1000, 9999)}",
+                "is_admin": False,
+                "created_at": self.timestamp().isoformat()
+            }
+            self.user_ids.append(user_id)
+            self.users_by_id[user_id] = {"email": user["email"], "name": f"{first} {last[0]}."}
+            yield user
+        # Repeat customers: a long tail of one-off buyers and a few regulars
+        self.user_cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** 0.8 for rank in range(self.user_count)
+        ))
+
+    def products(self) -> Iterator[tuple]:
+        """Yield (product, its reviews)"""
+        # Normalises the Zipf weights so the catalog averages reviews_per_product
+        harmonic = sum(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(self.product_count))
+        for rank in range(self.product_count):
+            category = self.rng.choice(list(CATEGORIES))
+            nouns, (low, high) = CATEGORIES[category]
+            price_bbd_cents = self.rng.randint(low // 2, high // 2) * 200
+            product_id = self.uuid()
+            created_at = self.timestamp()
+            weight = 1 / (rank + 1) ** ZIPF_EXPONENT
+            histogram = {str(star): 0 for star in range(1, 6)}
+            expected = self.reviews_per_product * self.product_count * weight / harmonic
+            reviews = list(self.reviews_for(product_id, expected, created_at))
+            for review in reviews:
+                histogram[str(review["rating"])] += 1
+            product = {
+                "id": product_id,
+                "name": f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(nouns)}",
+                "description": f"Handcrafted in Barbados. {self.rng.choice(COMMENTS[5])}",
+                **money_fields("price_bbd", price_bbd_cents),
+                **money_fields("price_usd", price_bbd_cents // 2),
+                "category": category,
+                "images": [f"https://picsum.photos/seed/{product_id[:8]}-{n}/600/750" for n in range(self.rng.randint(1, 4))],
+                "stock": self.rng.choice([0, 2, 5, 10, 25, 50, 100]),
+                "featured": rank < max(1, self.product_count // 20),
+                "created_at": created_at.isoformat(),
+                "review_count": sum(histogram.values()),
+                "rating_sum": sum(int(star) * count for star, count in histogram.items()),
+                "rating_histogram": histogram
+            }
+            self.catalog.append({
+                "id": product_id,
+                "name": product["name"],
+                "price_bbd_cents": price_bbd_cents,
+                "price_usd_cents": product["price_usd_cents"],
+                "image": product["images"][0]
+            })
+            self.product_weights.append(weight)
+            yield product, reviews
+
+    def reviews_for(self, product_id: str, expected: float, created_at: datetime) -> Iterator[dict]:
+        if not self.user_ids:
+            return
+        count = min(int(expected) + (self.rng.random() < expected % 1), len(self.user_ids))
+        stars = list(RATING_WEIGHTS)
+        for user_id in self.rng.sample(self.user_ids, count):
+            rating = self.rng.choices(stars, weights=list(RATING_WEIGHTS.values()))[0]
+            yield {
+                "id": self.uuid(),
+                "product_id": product_id,
+                "user_id": user_id,
+                "user_name": self.users_by_id[user_id]["name"],
+                "rating": rating,
+                "comment": self.rng.choice(COMMENTS[rating]),
+                "created_at": self.timestamp(created_at).isoformat()
+            }
+
+    def orders(self) -> Iterator[tuple]:
+        """Yield (order, payment transaction or None)"""
+        if not self.catalog or not self.user_ids:
+            return
+        product_cum_weights = list(itertools.accumulate(self.product_weights))
+        for _ in range(self.order_count):
+            user_id = self.user_ids[bisect.bisect(self.user_cum_weights, self.rng.random() * self.user_cum_weights[-1])]
+            lines = {}
+            for _ in range(self.rng.choices([1, 2, 3, 4], weights=[55, 25, 12, 8])[0]):
+                product = self.catalog[bisect.bisect(product_cum_weights, self.rng.random() * product_cum_weights[-1])]
+                lines[product["id"]] = (product, lines.get(product["id"], (None, 0))[1] + self.rng.choice([1, 1, 1, 2, 3]))
+            items = [
+                {
+                    "product_id": product["id"],
+                    "product_name": product["name"],
+                    "quantity": quantity,
+                    **money_fields("price_bbd", product["price_bbd_cents"]),
+                    **money_fields("price_usd", product["price_usd_cents"]),
+                    "image": product["image"]
+                }
+                for product, quantity in lines.values()
+            ]
+            created_at = self.timestamp()
+            age_days = (self.end - created_at).days
+            payment_method = self.rng.choices(["stripe", "form"], weights=[85, 15])[0]
+            if age_days > 14:
+                status = self.rng.choices(["delivered", "cancelled"], weights=[93, 7])[0]
+            else:
+                status = self.rng.choice(["pending", "processing", "shipped", "delivered"])
+            if status == "cancelled":
+                payment_status = "expired" if payment_method == "stripe" else "pending"
+            elif status == "pending":
+                payment_status = "pending"
+            else:
+                payment_status = "paid" if payment_method == "stripe" else self.rng.choice(["paid", "pending"])
+            order_id = self.uuid()
+            user = self.users_by_id[user_id]
+            order = {
+                "id": order_id,
+                "user_id": user_id,
+                "user_email": user["email"],
+                "items": items,
+                **money_fields("total_bbd", sum(i["price_bbd_cents"] * i["quantity"] for i in items)),
+                **money_fields("total_usd", sum(i["price_usd_cents"] * i["quantity"] for i in items)),
+                "shipping_address": f"{self.rng.randint(1, 200)} {self.rng.choice(ADJECTIVES)} Drive",
+                "city": self.rng.choice(PARISHES),
+                "postal_code": f"BB{self.rng.randint(11000, 27999)}",
+                "country": "Barbados",
+                "phone": "+1 (246) 555-0100",
+                "notes": None,
+                "status": status,
+                "payment_status": payment_status,
+                "payment_method": payment_method,
+                "created_at": created_at.isoformat()
+            }
+            if payment_status == "paid":
+                order["paid_at"] = order["created_at"]
+            transaction = None
+            if payment_method == "stripe":
+                transaction = {
+                    "id": self.uuid(),
+                    "session_id": f"cs_synthetic_{order_id.replace('-', '')}",
+                    "order_id": order_id,
+                    "user_id": user_id,
+                    "user_email": user["email"],
+                    "amount": order["total_usd"],
+                    "amount_cents": order["total_usd_cents"],
+                    "currency": "usd",
+                    "payment_status": {"pending": "initiated"}.get(payment_status, payment_status),
+                    "created_at": order["created_at"]
+                }
+            yield order, transaction
+
+class BatchWriter:
+    """Buffers documents for one collection and writes them with insert_many"""
+    def __init__(self, collection, batch_size: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.batch: List[dict] = []
+        self.inserted = 0
+
+    async def add(self, document: dict):
+        self.batch.append(document)
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if self.batch:
+            await self.collection.insert_many(self.batch, ordered=False)
+            self.inserted += len(self.batch)
+            self.batch = []
+
+async def chunks(documents: Iterator, size: int):
+    """Pull `size` documents at a time in a worker thread; generating them (and
+    the bcrypt hash behind the users) is CPU work the event loop shouldn't wait on"""
+    while True:
+        chunk = await asyncio.to_thread(list, itertools.islice(documents, size))
+        if not chunk:
+            return
+        yield chunk
+
+async def generate(db, seed: int = 1, products: int = BASE_PRODUCTS, users: int = BASE_USERS,
+                   orders: int = BASE_ORDERS, reviews_per_product: float = REVIEWS_PER_PRODUCT,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   batch_size: int = INSERT_BATCH) -> dict:
+    """Insert a synthetic data set into `db` and return what was written"""
+    started = time.monotonic()
+    end = end or datetime(2026, 1, 1, tzinfo=timezone.utc)
+    start = start or end - timedelta(days=365)
+    if start >= end:
+        raise ValueError("start must be before end")
+    generator = Generator(seed, products, users, orders, reviews_per_product, start, end)
+    writers = {
+        name: BatchWriter(db[name], batch_size)
+        for name in ["users", "products", "reviews", "orders", "payment_transactions"]
+    }
+
+    async for users in chunks(generator.users(), batch_size):
+        for user in users:
+            await writers["users"].add(user)
+    async for products in chunks(generator.products(), batch_size):
+        for product, reviews in products:
+            await writers["products"].add(product)
+            for review in reviews:
+                await writers["reviews"].add(review)
+    async for orders in chunks(generator.orders(), batch_size):
+        for order, transaction in orders:
+            await writers["orders"].add(order)
+            if transaction:
+                await writers["payment_transactions"].add(transaction)
+    for writer in writers.values():
+        await writer.flush()
+
+    report = {
+        "seed": seed,
+        "database": db.name,
+        **{name: writer.inserted for name, writer in writers.items()},
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "duration_ms": round((time.monotonic() - started) * 1000, 1)
+    }
+    logger.info(f"Generated synthetic data: {report}")
+    return report
+
+def parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+async def main():
+    import argparse
+    from config import Settings
+    import core
+
+    parser = argparse.ArgumentParser(description="Generate synthetic Perennia data for load testing")
+    parser.add_argument("--db", required=True, help="Target database name (use a dedicated one, not production)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scale", type=float, default=1, help="Multiplier for the default volumes")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--reviews-per-product", type=float, default=REVIEWS_PER_PRODUCT)
+    parser.add_argument("--start", type=parse_date, help="First order date, YYYY-MM-DD")
+    parser.add_argument("--end", type=parse_date, help="Last order date, YYYY-MM-DD (default 2026-01-01)")
+    parser.add_argument("--batch-size", type=int, default=INSERT_BATCH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    core.configure(Settings.from_env())
+    try:
+        await generate(
+            core.client[args.db],
+            seed=args.seed,
+            products=args.products if args.products is not None else round(BASE_PRODUCTS * args.scale),
+            users=args.users if args.users is not None else round(BASE_USERS * args.scale),
+            orders=args.orders if args.orders is not None else round(BASE_ORDERS * args.scale),
+            reviews_per_product=args.reviews_per_product,
+            start=args.start,
+            end=args.end,
+            batch_size=args.batch_size
+        )
+    finally:
+        core.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,9 +7,9 @@ import { Button } from '@/components/ui/button';
 
 const CartDrawer = () => {
   const { items, isOpen, setIsOpen, removeItem, updateQuantity, totalBBD, totalUSD } = useCart();
-  const { currency, formatPrice } = useCurrency();
+  const { currency, formatPrice, getPrice } = useCurrency();
 
-  const displayTotal = currency === 'USD' ? totalUSD : totalBBD;
+  const displayTotal = getPrice(totalBBD, totalUSD);
 
   return (
     <AnimatePresence>
@@ -73,7 +73,7 @@ const CartDrawer = () => {
                         <div className="flex-1 min-w-0">
                           <h3 className="text-sm text-[var(--text-primary)] truncate">{product.name}</h3>
                           <p className="text-xs text-[var(--brand-gold)] mt-1">
-                            {formatPrice(product.price_bbd, product.price_usd)}
+                            {formatPrice(product.price_bbd, product.price_usd, product.prices)}
                           </p>
 
                           {/* Quantity */}
@@ -75,7 +75,7 @@ const Navbar = () => {
                 onClick={toggleCurrency}
                 className="px-2 py-1 text-xs font-medium uppercase tracking-wider border border-[var(--brand-gold)]/50 text-[var(--brand-gold)] hover:bg-[var(--brand-gold)] hover:text-black transition-all duration-300"
                 data-testid="currency-switcher"
-                title={`Switch to ${currency === 'BBD' ? 'USD' : 'BBD'}`}
+                title="Switch currency"
               >
                 {currency}
               </button>
@@ -5,14 +5,18 @@ import { useCart } from '@/context/CartContext';
 import { useCurrency } from '@/context/CurrencyContext';
 import { toast } from 'sonner';
 
+// Everything the card renders; list endpoints accept it as `fields=` to skip the rest
+export const PRODUCT_CARD_FIELDS = 'id,name,price_bbd,price_usd,price_bbd_cents,price_usd_cents,prices,category,image,stock,featured,average_rating,review_count';
+
 const ProductCard = ({ product, index = 0 }) => {
   const { addItem } = useCart();
   const { formatPrice } = useCurrency();
+  const image = product.image ?? product.images?.[0];
 
   const handleAddToCart = (e) => {
     e.preventDefault();
     e.stopPropagation();
-    addItem(product);
+    addItem({ ...product, images: product.images || [image] });
     toast.success(`${product.name} added to cart`);
   };
 
@@ -28,7 +32,7 @@ const ProductCard = ({ product, index = 0 }) => {
         {/* Image */}
         <div className="relative aspect-[4/5] bg-[var(--bg-subtle)] overflow-hidden mb-4">
           <img
-            src={product.images[0]}
+            src={image}
             alt={product.name}
             className="w-full h-full object-cover"
           />
@@ -80,7 +84,7 @@ const ProductCard = ({ product, index = 0 }) => {
           {/* Price */}
           <div className="flex items-baseline space-x-2">
             <span className="text-[var(--brand-gold)] font-serif">
-              {formatPrice(product.price_bbd, product.price_usd)}
+              {formatPrice(product.price_bbd, product.price_usd, product.prices)}
             </span>
           </div>
         </div>
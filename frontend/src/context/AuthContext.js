@@ -1,5 +1,6 @@
 import { createContext, useContext, useState, useEffect } from 'react';
 import axios from 'axios';
+import { loadBootstrap, resetBootstrap } from '@/lib/bootstrap';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -25,6 +26,20 @@ export const AuthProvider = ({ children }) => {
     if (savedToken && savedUser) {
       setToken(savedToken);
       setUser(JSON.parse(savedUser));
+      // Refresh the stored profile; a token the server no longer accepts ends the session
+      loadBootstrap()
+        .then((data) => {
+          if (data.user) {
+            setUser(data.user);
+            localStorage.setItem('perennia_user', JSON.stringify(data.user));
+          } else {
+            setToken(null);
+            setUser(null);
+            localStorage.removeItem('perennia_token');
+            localStorage.removeItem('perennia_user');
+          }
+        })
+        .catch((error) => console.error('Error loading session:', error));
     }
     setLoading(false);
   }, []);
@@ -37,6 +52,7 @@ export const AuthProvider = ({ children }) => {
     setUser(userData);
     localStorage.setItem('perennia_token', newToken);
     localStorage.setItem('perennia_user', JSON.stringify(userData));
+    resetBootstrap();
     
     return userData;
   };
@@ -49,6 +65,7 @@ export const AuthProvider = ({ children }) => {
     setUser(newUser);
     localStorage.setItem('perennia_token', newToken);
     localStorage.setItem('perennia_user', JSON.stringify(newUser));
+    resetBootstrap();
     
     return newUser;
   };
@@ -58,6 +75,7 @@ export const AuthProvider = ({ children }) => {
     setUser(null);
     localStorage.removeItem('perennia_token');
     localStorage.removeItem('perennia_user');
+    resetBootstrap();
   };
 
   const getAuthHeaders = () => {
@@ -1,4 +1,22 @@
-import { createContext, useContext, useState, useEffect } from 'react';
+import { createContext, useContext, useState, useEffect, useRef } from 'react';
+import axios from 'axios';
+import { useAuth } from '@/context/AuthContext';
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+// Server cart lines are flat; the drawer and cart page expect { product, quantity }
+const fromServerLine = (line) => ({
+  product: {
+    id: line.product_id,
+    name: line.product_name,
+    category: line.category,
+    price_bbd: line.price_bbd,
+    price_usd: line.price_usd,
+    stock: line.stock,
+    images: line.image ? [line.image] : []
+  },
+  quantity: line.quantity
+});
 
 const CartContext = createContext();
 
@@ -13,6 +31,9 @@ export const useCart = () => {
 export const CartProvider = ({ children }) => {
   const [items, setItems] = useState([]);
   const [isOpen, setIsOpen] = useState(false);
+  const [stockIssues, setStockIssues] = useState([]);
+  const { token } = useAuth();
+  const syncedToken = useRef(null);
 
   // Load cart from localStorage on mount
   useEffect(() => {
@@ -27,6 +48,43 @@ export const CartProvider = ({ children }) => {
     localStorage.setItem('perennia_cart', JSON.stringify(items));
   }, [items]);
 
+  // On login, adopt the server cart unless this device already has items
+  useEffect(() => {
+    if (!token) {
+      syncedToken.current = null;
+      return;
+    }
+    const headers = { Authorization: `Bearer ${token}` };
+    const savedCart = JSON.parse(localStorage.getItem('perennia_cart') || '[]');
+    const request = savedCart.length
+      ? axios.put(`${API}/cart`, {
+          items: savedCart.map(item => ({ product_id: item.product.id, quantity: item.quantity }))
+        }, { headers })
+      : axios.get(`${API}/cart`, { headers });
+    request
+      .then(response => {
+        setItems(response.data.items.map(fromServerLine));
+        setStockIssues(response.data.stock_issues || []);
+      })
+      .catch(() => {})
+      .finally(() => {
+        syncedToken.current = token;
+      });
+  }, [token]);
+
+  // Mirror local changes to the server cart once the initial sync is done
+  useEffect(() => {
+    if (!token || syncedToken.current !== token) return;
+    const handle = setTimeout(() => {
+      axios.put(`${API}/cart`, {
+        items: items.map(item => ({ product_id: item.product.id, quantity: item.quantity }))
+      }, { headers: { Authorization: `Bearer ${token}` } })
+        .then(response => setStockIssues(response.data.stock_issues || []))
+        .catch(() => {});
+    }, 500);
+    return () => clearTimeout(handle);
+  }, [items, token]);
+
   const addItem = (product, quantity = 1) => {
     setItems(current => {
       const existing = current.find(item => item.product.id === product.id);
@@ -63,15 +121,18 @@ export const CartProvider = ({ children }) => {
 
   const totalItems = items.reduce((sum, item) => sum + item.quantity, 0);
   
+  // Summed in integer cents, like the server, so totals never drift by a cent
+  const toCents = (amount) => Math.round(amount * 100);
+
   const totalBBD = items.reduce(
-    (sum, item) => sum + item.product.price_bbd * item.quantity,
+    (sum, item) => sum + (item.product.price_bbd_cents ?? toCents(item.product.price_bbd)) * item.quantity,
     0
-  );
+  ) / 100;
   
   const totalUSD = items.reduce(
-    (sum, item) => sum + item.product.price_usd * item.quantity,
+    (sum, item) => sum + (item.product.price_usd_cents ?? toCents(item.product.price_usd)) * item.quantity,
     0
-  );
+  ) / 100;
 
   return (
     <CartContext.Provider
@@ -84,6 +145,7 @@ export const CartProvider = ({ children }) => {
         totalItems,
         totalBBD,
         totalUSD,
+        stockIssues,
         isOpen,
         setIsOpen
       }}
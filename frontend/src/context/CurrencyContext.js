@@ -1,4 +1,24 @@
 import { createContext, useContext, useState, useEffect } from 'react';
+import axios from 'axios';
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+// Until /api/currencies answers; BBD is pegged to USD at 2:1
+const DEFAULT_CURRENCIES = [
+  { code: 'BBD', rate: 1, symbol: '$', increment: 0.01, rounding: 'nearest' },
+  { code: 'USD', rate: 0.5, symbol: '$', increment: 0.01, rounding: 'nearest' }
+];
+
+const ROUNDING_MODES = { nearest: Math.round, up: Math.ceil, down: Math.floor };
+
+// Same as convert() in backend/currency.py: BBD amount in the rule's currency,
+// rounded to its increment. Steps are trimmed to 9 places first so float noise
+// (2.4999999) doesn't round the other way.
+const convert = (amountBBD, rule) => {
+  const steps = Number(((amountBBD * rule.rate) / rule.increment).toFixed(9));
+  const rounded = (ROUNDING_MODES[rule.rounding] || Math.round)(steps) * rule.increment;
+  return Number(rounded.toFixed(2));
+};
 
 const CurrencyContext = createContext();
 
@@ -11,36 +31,54 @@ export const useCurrency = () => {
 };
 
 export const CurrencyProvider = ({ children }) => {
-  const [currency, setCurrency] = useState(() => {
+  const [selected, setCurrency] = useState(() => {
     // Load from localStorage or default to BBD
     const saved = localStorage.getItem('perennia_currency');
     return saved || 'BBD';
   });
 
+  const [currencies, setCurrencies] = useState(DEFAULT_CURRENCIES);
+
   useEffect(() => {
-    localStorage.setItem('perennia_currency', currency);
-  }, [currency]);
+    axios.get(`${API}/currencies`)
+      .then((response) => setCurrencies(response.data))
+      .catch((error) => console.error('Error fetching currencies:', error));
+  }, []);
+
+  useEffect(() => {
+    localStorage.setItem('perennia_currency', selected);
+  }, [selected]);
+
+  // A saved currency whose rate hasn't loaded yet is shown as BBD, labelled BBD
+  const currentRate = currencies.find((c) => c.code === selected) || currencies[0];
+  const currency = currentRate.code;
 
   const toggleCurrency = () => {
-    setCurrency(prev => prev === 'BBD' ? 'USD' : 'BBD');
+    const index = currencies.findIndex((c) => c.code === currency);
+    setCurrency(currencies[(index + 1) % currencies.length].code);
   };
 
-  const formatPrice = (priceBBD, priceUSD) => {
-    if (currency === 'USD') {
-      return `$${priceUSD.toFixed(2)} USD`;
+  // Products carry precomputed `prices` per currency; anything else (cart
+  // totals, products saved before repricing) is converted from BBD here
+  const getPrice = (priceBBD, priceUSD, prices) => {
+    if (prices && prices[currency] !== undefined) {
+      return prices[currency];
     }
-    return `$${priceBBD.toFixed(2)} BBD`;
+    if (currency === 'USD' && priceUSD !== undefined) {
+      return priceUSD;
+    }
+    return convert(priceBBD, currentRate);
   };
 
-  const getPrice = (priceBBD, priceUSD) => {
-    return currency === 'USD' ? priceUSD : priceBBD;
-  };
+  const formatPrice = (priceBBD, priceUSD, prices) =>
+    `${currentRate.symbol}${getPrice(priceBBD, priceUSD, prices).toFixed(2)} ${currency}`;
 
-  const getSymbol = () => currency === 'USD' ? 'USD' : 'BBD';
+  const getSymbol = () => currency;
 
   return (
     <CurrencyContext.Provider value={{
       currency,
+      currencies,
       setCurrency,
       toggleCurrency,
       formatPrice,
@@ -1,7 +1,10 @@
 import { createContext, useContext, useState, useEffect } from 'react';
 import axios from 'axios';
+import { loadBootstrap } from '@/lib/bootstrap';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+// Read by public/index.html to link the stylesheet before first paint
+const THEME_HASH_KEY = 'perennia_theme_hash';
 
 const SiteSettingsContext = createContext();
 
@@ -82,12 +85,38 @@ export const SiteSettingsProvider = ({ children }) => {
     root.style.setProperty('--text-secondary', colors.text_secondary || '#A3A3A3');
   };
 
-  const fetchSettings = async () => {
+  // The compiled stylesheet is cached forever under its hash; a new theme is a new URL
+  const applyTheme = (newSettings) => {
+    if (!newSettings.theme_hash) {
+      applyThemeColors(newSettings.theme_colors);
+      return;
+    }
+    let link = document.getElementById('theme-stylesheet');
+    if (!link) {
+      link = document.createElement('link');
+      link.id = 'theme-stylesheet';
+      link.rel = 'stylesheet';
+      document.head.appendChild(link);
+    }
+    const href = `${API}/theme/${newSettings.theme_hash}.css`;
+    if (link.getAttribute('href') !== href) {
+      link.setAttribute('href', href);
+    }
     try {
-      const response = await axios.get(`${API}/settings`);
-      const newSettings = { ...defaultSettings, ...response.data };
+      localStorage.setItem(THEME_HASH_KEY, newSettings.theme_hash);
+    } catch (error) {
+      // Private browsing; the theme still applies, just after first paint
+    }
+  };
+
+  const fetchSettings = async (fromBootstrap = false) => {
+    try {
+      const data = fromBootstrap
+        ? (await loadBootstrap()).settings
+        : (await axios.get(`${API}/settings`)).data;
+      const newSettings = { ...defaultSettings, ...data };
       setSettings(newSettings);
-      applyThemeColors(newSettings.theme_colors);
+      applyTheme(newSettings);
     } catch (error) {
       console.error('Error fetching settings:', error);
       setSettings(defaultSettings);
@@ -98,7 +127,7 @@ export const SiteSettingsProvider = ({ children }) => {
   };
 
   useEffect(() => {
-    fetchSettings();
+    fetchSettings(true);
   }, []);
 
   const updateSettings = async (newSettings, token) => {
@@ -108,7 +137,7 @@ export const SiteSettingsProvider = ({ children }) => {
       });
       const updated = { ...defaultSettings, ...response.data };
       setSettings(updated);
-      applyThemeColors(updated.theme_colors);
+      applyTheme(updated);
       return response.data;
     } catch (error) {
       throw error;
@@ -0,0 +1,39 @@
+import axios from 'axios';
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+// Long enough to cover one page load's worth of callers; later reads go back
+// to the server, which answers a 304 while nothing has changed.
+const BOOTSTRAP_SHARE_MS = 5000;
+
+let pending = null;
+
+// First-render data (settings, featured products, categories, current user)
+// in one request, shared by every context and page that hydrates from it.
+// The shared request is tied to the token it was made with.
+export const loadBootstrap = () => {
+  const token = localStorage.getItem('perennia_token');
+  if (pending && (pending.token !== token || Date.now() - pending.startedAt > BOOTSTRAP_SHARE_MS)) {
+    pending = null;
+  }
+  if (!pending) {
+    const request = axios
+      .get(`${API}/bootstrap`, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {}
+      })
+      .then((response) => response.data)
+      .catch((error) => {
+        if (pending && pending.request === request) {
+          pending = null;
+        }
+        throw error;
+      });
+    pending = { token, request, startedAt: Date.now() };
+  }
+  return pending.request;
+};
+
+// Call when the session changes so the next load carries the new user
+export const resetBootstrap = () => {
+  pending = null;
+};
@@ -1,7 +1,7 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
-import { Package, User, LogOut } from 'lucide-react';
+import { Package, User, LogOut, ChevronDown, ChevronUp } from 'lucide-react';
 import axios from 'axios';
 import { useAuth } from '@/context/AuthContext';
 import { Button } from '@/components/ui/button';
@@ -13,7 +13,29 @@ const Account = () => {
   const navigate = useNavigate();
   const { user, logout, isAuthenticated, getAuthHeaders } = useAuth();
   const [orders, setOrders] = useState([]);
+  // { cursor, archived } for the next history page, or null at the end
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [expanded, setExpanded] = useState({});
+  const [details, setDetails] = useState({});
+
+  // Old delivered and cancelled orders are archived; page on into them once the recent ones run out
+  const fetchOrders = useCallback(async (page) => {
+    const { cursor = null, archived = false } = page || {};
+    const response = await axios.get(`${API}/orders/history`, {
+      headers: getAuthHeaders(),
+      params: { limit: 20, ...(cursor ? { cursor } : {}), ...(archived ? { archived: true } : {}) }
+    });
+    setOrders((prev) => (page ? [...prev, ...response.data.items] : response.data.items));
+    if (response.data.next_cursor) {
+      setNextPage({ cursor: response.data.next_cursor, archived });
+    } else if (!archived) {
+      await fetchOrders({ archived: true });
+    } else {
+      setNextPage(null);
+    }
+  }, [getAuthHeaders]);
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -21,21 +43,35 @@ const Account = () => {
       return;
     }
 
-    const fetchOrders = async () => {
-      try {
-        const response = await axios.get(`${API}/orders`, {
-          headers: getAuthHeaders()
-        });
-        setOrders(response.data);
-      } catch (error) {
-        console.error('Error fetching orders:', error);
-      } finally {
-        setLoading(false);
-      }
-    };
+    fetchOrders()
+      .catch((error) => console.error('Error fetching orders:', error))
+      .finally(() => setLoading(false));
+  }, [isAuthenticated, navigate, fetchOrders]);
 
-    fetchOrders();
-  }, [isAuthenticated, navigate, getAuthHeaders]);
+  const loadMoreOrders = async () => {
+    setLoadingMore(true);
+    try {
+      await fetchOrders(nextPage);
+    } catch (error) {
+      console.error('Error fetching orders:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const toggleOrder = async (orderId) => {
+    const open = !expanded[orderId];
+    setExpanded((prev) => ({ ...prev, [orderId]: open }));
+    if (!open || details[orderId]) return;
+    try {
+      const response = await axios.get(`${API}/orders/${orderId}`, {
+        headers: getAuthHeaders()
+      });
+      setDetails((prev) => ({ ...prev, [orderId]: response.data }));
+    } catch (error) {
+      console.error('Error fetching order:', error);
+    }
+  };
 
   const handleLogout = () => {
     logout();
@@ -148,26 +184,67 @@ const Account = () => {
                       </div>
                     </div>
 
-                    {/* Items */}
-                    <div className="border-t border-white/5 pt-4 space-y-3">
-                      {order.items.map((item, idx) => (
-                        <div key={idx} className="flex items-center gap-3">
-                          {item.image && (
-                            <div className="w-10 h-12 bg-[#1A1A1A] overflow-hidden flex-shrink-0">
-                              <img src={item.image} alt="" className="w-full h-full object-cover" />
-                            </div>
-                          )}
-                          <div className="flex-1 min-w-0">
-                            <p className="text-sm text-white truncate">{item.product_name}</p>
-                            <p className="text-xs text-[#A3A3A3]">
-                              Qty: {item.quantity} × ${item.price_bbd.toFixed(2)} BBD
-                            </p>
-                          </div>
+                    {/* Items, loaded on demand */}
+                    <button
+                      type="button"
+                      onClick={() => toggleOrder(order.id)}
+                      className="w-full flex items-center gap-3 border-t border-white/5 pt-4 text-left"
+                      data-testid={`order-toggle-${order.id}`}
+                    >
+                      {order.preview_image && (
+                        <div className="w-10 h-12 bg-[#1A1A1A] overflow-hidden flex-shrink-0">
+                          <img src={order.preview_image} alt="" className="w-full h-full object-cover" />
                         </div>
-                      ))}
-                    </div>
+                      )}
+                      <span className="flex-1 text-sm text-[#A3A3A3]">
+                        {order.item_count} {order.item_count === 1 ? 'item' : 'items'}
+                      </span>
+                      {expanded[order.id] ? (
+                        <ChevronUp size={16} className="text-[#A3A3A3]" />
+                      ) : (
+                        <ChevronDown size={16} className="text-[#A3A3A3]" />
+                      )}
+                    </button>
+
+                    {expanded[order.id] && (
+                      <div className="pt-4 space-y-3">
+                        {!details[order.id] ? (
+                          <div className="h-12 bg-[#1A1A1A] skeleton" />
+                        ) : (
+                          details[order.id].items.map((item, idx) => (
+                            <div key={idx} className="flex items-center gap-3">
+                              {item.image && (
+                                <div className="w-10 h-12 bg-[#1A1A1A] overflow-hidden flex-shrink-0">
+                                  <img src={item.image} alt="" className="w-full h-full object-cover" />
+                                </div>
+                              )}
+                              <div className="flex-1 min-w-0">
+                                <p className="text-sm text-white truncate">{item.product_name}</p>
+                                <p className="text-xs text-[#A3A3A3]">
+                                  Qty: {item.quantity} × ${item.price_bbd.toFixed(2)} BBD
+                                </p>
+                              </div>
+                            </div>
+                          ))
+                        )}
+                      </div>
+                    )}
                   </motion.div>
                 ))}
+
+                {nextPage && (
+                  <div className="text-center pt-4">
+                    <Button
+                      onClick={loadMoreOrders}
+                      disabled={loadingMore}
+                      variant="ghost"
+                      className="text-[#A3A3A3] hover:text-white"
+                      data-testid="load-more-orders"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more orders'}
+                    </Button>
+                  </div>
+                )}
               </div>
             )}
           </TabsContent>
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback, createContext, useContext } from 'react';
 import { Routes, Route, Link, useNavigate, useLocation } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { 
@@ -45,11 +45,36 @@ import { toast } from 'sonner';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+const ADMIN_EVENT_TYPES = ['order_created', 'payment_confirmed', 'order_status_changed', 'order_oversold', 'low_stock', 'contact_created', 'resync'];
+// Matches the stream's `retry:` hint
+const ADMIN_EVENTS_RETRY_MS = 5000;
+
+// One EventSource per dashboard session; sections subscribe to the events they care about
+const AdminEventsContext = createContext(null);
+
+const useAdminEvents = (handler) => {
+  const subscribe = useContext(AdminEventsContext);
+  const handlerRef = useRef(handler);
+  handlerRef.current = handler;
+
+  useEffect(() => {
+    if (!subscribe) return undefined;
+    return subscribe((event) => handlerRef.current(event));
+  }, [subscribe]);
+};
+
 // Dashboard Overview
 const DashboardOverview = () => {
   const [stats, setStats] = useState({ products: 0, orders: 0, messages: 0 });
+  const [reloadKey, setReloadKey] = useState(0);
   const { getAuthHeaders } = useAuth();
 
+  useAdminEvents(({ type }) => {
+    if (type === 'order_created') setStats(current => ({ ...current, orders: current.orders + 1 }));
+    if (type === 'contact_created') setStats(current => ({ ...current, messages: current.messages + 1 }));
+    if (type === 'resync') setReloadKey(key => key + 1);
+  });
+
   useEffect(() => {
     const fetchStats = async () => {
       try {
@@ -68,7 +93,7 @@ const DashboardOverview = () => {
       }
     };
     fetchStats();
-  }, [getAuthHeaders]);
+  }, [getAuthHeaders, reloadKey]);
 
   return (
     <div>
@@ -120,6 +145,13 @@ const ProductsManagement = () => {
 
   useEffect(() => { fetchProducts(); }, []);
 
+  useAdminEvents(({ type, data }) => {
+    if (type === 'low_stock') {
+      setProducts(current => current.map(p => p.id === data.product_id ? { ...p, stock: data.stock } : p));
+    }
+    if (type === 'resync') fetchProducts();
+  });
+
   const resetForm = () => {
     setFormData({ name: '', description: '', price_bbd: '', price_usd: '', category: 'resin', images: '', stock: '', featured: false });
     setEditingProduct(null);
@@ -250,8 +282,23 @@ const ProductsManagement = () => {
 const OrdersManagement = () => {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [reloadKey, setReloadKey] = useState(0);
   const { getAuthHeaders } = useAuth();
 
+  useAdminEvents(({ type, data }) => {
+    if (type === 'order_created') {
+      setOrders(current => [data.order, ...current.filter(o => o.id !== data.order.id)]);
+    } else if (type === 'payment_confirmed') {
+      setOrders(current => current.map(o => o.id === data.order_id ? { ...o, payment_status: 'paid', status: 'processing' } : o));
+    } else if (type === 'order_status_changed') {
+      setOrders(current => current.map(o => o.id === data.order_id ? { ...o, status: data.status } : o));
+    } else if (type === 'order_oversold') {
+      setOrders(current => current.map(o => o.id === data.order_id ? { ...o, oversold: data.items } : o));
+    } else if (type === 'resync') {
+      setReloadKey(key => key + 1);
+    }
+  });
+
   useEffect(() => {
     const fetchOrders = async () => {
       try {
@@ -264,7 +311,7 @@ const OrdersManagement = () => {
       }
     };
     fetchOrders();
-  }, [getAuthHeaders]);
+  }, [getAuthHeaders, reloadKey]);
 
   const updateStatus = async (orderId, status) => {
     try {
@@ -297,7 +344,7 @@ const OrdersManagement = () => {
                 <div><p className="text-xs text-[#A3A3A3] uppercase">Customer</p><p className="text-white text-sm">{order.user_email}</p></div>
                 <div><p className="text-xs text-[#A3A3A3] uppercase">Date</p><p className="text-white text-sm">{new Date(order.created_at).toLocaleDateString()}</p></div>
                 <div><p className="text-xs text-[#A3A3A3] uppercase">Total</p><p className="text-[var(--brand-gold)] font-serif">${order.total_bbd.toFixed(2)} BBD</p></div>
-                <div><p className="text-xs text-[#A3A3A3] uppercase">Payment</p><span className={`px-2 py-1 text-xs uppercase ${order.payment_status === 'paid' ? 'status-delivered' : 'status-pending'}`}>{order.payment_status}</span></div>
+                <div><p className="text-xs text-[#A3A3A3] uppercase">Payment</p><span className={`px-2 py-1 text-xs uppercase ${order.payment_status === 'paid' ? 'status-delivered' : 'status-pending'}`}>{order.payment_status}</span>{order.oversold?.length > 0 && <span className="ml-2 px-2 py-1 text-xs uppercase status-cancelled">Oversold</span>}</div>
               </div>
               <div className="flex items-center justify-between pt-4 border-t border-white/5">
                 <span className={`px-3 py-1 text-xs uppercase ${getStatusClass(order.status)}`}>{order.status}</span>
@@ -328,8 +375,14 @@ const OrdersManagement = () => {
 const MessagesManagement = () => {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [reloadKey, setReloadKey] = useState(0);
   const { getAuthHeaders } = useAuth();
 
+  useAdminEvents(({ type, data }) => {
+    if (type === 'contact_created') setMessages(current => [data.message, ...current]);
+    if (type === 'resync') setReloadKey(key => key + 1);
+  });
+
   useEffect(() => {
     const fetchMessages = async () => {
       try {
@@ -342,7 +395,7 @@ const MessagesManagement = () => {
       }
     };
     fetchMessages();
-  }, [getAuthHeaders]);
+  }, [getAuthHeaders, reloadKey]);
 
   return (
     <div>
@@ -697,13 +750,66 @@ const SiteSettingsManagement = () => {
 const AdminDashboard = () => {
   const navigate = useNavigate();
   const location = useLocation();
-  const { user, logout, isAuthenticated, isAdmin } = useAuth();
+  const { user, token, logout, isAuthenticated, isAdmin } = useAuth();
   const { settings } = useSiteSettings();
+  const listeners = useRef(new Set());
 
   useEffect(() => {
     if (!isAuthenticated || !isAdmin) navigate('/admin/login');
   }, [isAuthenticated, isAdmin, navigate]);
 
+  const subscribe = useCallback((listener) => {
+    listeners.current.add(listener);
+    return () => listeners.current.delete(listener);
+  }, []);
+
+  useEffect(() => {
+    if (!token || !isAdmin) return undefined;
+    let source = null;
+    let retry = null;
+    let stopped = false;
+    let connected = false;
+    const reconnect = () => {
+      if (!stopped) retry = setTimeout(connect, ADMIN_EVENTS_RETRY_MS);
+    };
+    // Stream tickets are single-use, so every (re)connect asks for a new one
+    const connect = async () => {
+      try {
+        const response = await axios.post(`${API}/admin/stream-tickets`, {}, { headers: { Authorization: `Bearer ${token}` } });
+        if (stopped) return;
+        source = new EventSource(`${API}/admin/events?ticket=${encodeURIComponent(response.data.ticket)}`);
+      } catch (error) {
+        reconnect();
+        return;
+      }
+      source.onopen = () => {
+        // Events sent while we were away are gone; have sections refetch
+        if (connected) listeners.current.forEach(listener => listener({ type: 'resync', data: {} }));
+        connected = true;
+      };
+      // The browser's own retry would replay the spent ticket
+      source.onerror = () => {
+        source.close();
+        reconnect();
+      };
+      ADMIN_EVENT_TYPES.forEach(type => {
+        source.addEventListener(type, (e) => {
+          const event = { type, data: JSON.parse(e.data) };
+          if (type === 'order_created') toast.info(`New order from ${event.data.order.user_email}`);
+          if (type === 'order_oversold') toast.error(`Order ${event.data.order_id.slice(0, 8)} was paid for items that are out of stock`);
+          if (type === 'low_stock') toast.warning(`${event.data.name} is low on stock (${event.data.stock} left)`);
+          listeners.current.forEach(listener => listener(event));
+        });
+      });
+    };
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  }, [token, isAdmin]);
+
   const handleLogout = () => { logout(); navigate('/admin/login'); };
 
   const navItems = [
@@ -744,14 +850,16 @@ const AdminDashboard = () => {
         </div>
       </aside>
       <main className="flex-1 ml-64 p-8">
-        <Routes>
-          <Route path="dashboard" element={<DashboardOverview />} />
-          <Route path="products" element={<ProductsManagement />} />
-          <Route path="orders" element={<OrdersManagement />} />
-          <Route path="messages" element={<MessagesManagement />} />
-          <Route path="settings" element={<SiteSettingsManagement />} />
-          <Route path="*" element={<DashboardOverview />} />
-        </Routes>
+        <AdminEventsContext.Provider value={subscribe}>
+          <Routes>
+            <Route path="dashboard" element={<DashboardOverview />} />
+            <Route path="products" element={<ProductsManagement />} />
+            <Route path="orders" element={<OrdersManagement />} />
+            <Route path="messages" element={<MessagesManagement />} />
+            <Route path="settings" element={<SiteSettingsManagement />} />
+            <Route path="*" element={<DashboardOverview />} />
+          </Routes>
+        </AdminEventsContext.Provider>
       </main>
     </div>
   );
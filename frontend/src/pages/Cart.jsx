@@ -9,7 +9,7 @@ const Cart = () => {
   const { items, removeItem, updateQuantity, totalBBD, totalUSD } = useCart();
   const { currency, formatPrice, getPrice } = useCurrency();
 
-  const displayTotal = currency === 'USD' ? totalUSD : totalBBD;
+  const displayTotal = getPrice(totalBBD, totalUSD);
 
   if (items.length === 0) {
     return (
@@ -93,7 +93,7 @@ const Cart = () => {
                     {/* Price */}
                     <div className="text-right">
                       <p className="text-[var(--brand-gold)] font-serif">
-                        ${(getPrice(product.price_bbd, product.price_usd) * quantity).toFixed(2)} {currency}
+                        ${(getPrice(product.price_bbd, product.price_usd, product.prices) * quantity).toFixed(2)} {currency}
                       </p>
                     </div>
                   </div>
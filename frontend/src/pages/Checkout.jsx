@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useState, useRef } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { CreditCard, FileText, ArrowLeft } from 'lucide-react';
@@ -19,6 +19,12 @@ const Checkout = () => {
 
   const [paymentMethod, setPaymentMethod] = useState('stripe');
   const [loading, setLoading] = useState(false);
+  // One key per checkout attempt. Retries replay it, so a timed-out or
+  // still-running order POST is never placed twice; only a 4xx rejection of
+  // the order itself starts a fresh attempt.
+  const attemptKey = useRef(crypto.randomUUID());
+  // Once the order exists, a retry only repeats the payment session step
+  const placedOrder = useRef(null);
   const [formData, setFormData] = useState({
     shipping_address: '',
     city: '',
@@ -47,24 +53,34 @@ const Checkout = () => {
     }
 
     setLoading(true);
+    let orderRejected = false;
     try {
-      // Create order
-      const orderData = {
-        items: items.map(({ product, quantity }) => ({
-          product_id: product.id,
-          quantity
-        })),
-        ...formData,
-        payment_method: paymentMethod
-      };
+      let order = placedOrder.current;
+      if (!order) {
+        const orderData = {
+          items: items.map(({ product, quantity }) => ({
+            product_id: product.id,
+            quantity
+          })),
+          ...formData,
+          payment_method: paymentMethod
+        };
 
-      const orderResponse = await axios.post(`${API}/orders`, orderData, {
-        headers: getAuthHeaders()
-      });
-
-      const order = orderResponse.data;
+        try {
+          const orderResponse = await axios.post(`${API}/orders`, orderData, {
+            headers: { ...getAuthHeaders(), 'Idempotency-Key': `${attemptKey.current}:order` }
+          });
+          order = orderResponse.data;
+        } catch (error) {
+          const status = error.response?.status;
+          orderRejected = status >= 400 && status < 500 && status !== 409;
+          throw error;
+        }
+        placedOrder.current = order;
+      }
 
-      if (paymentMethod === 'stripe') {
+      // The placed order's method wins if it was changed after the order went through
+      if (order.payment_method === 'stripe') {
         // Create Stripe checkout session
         const checkoutResponse = await axios.post(
           `${API}/checkout/create-session`,
@@ -72,7 +88,7 @@ const Checkout = () => {
             order_id: order.id,
             origin_url: window.location.origin
           },
-          { headers: getAuthHeaders() }
+          { headers: { ...getAuthHeaders(), 'Idempotency-Key': `${attemptKey.current}:session` } }
         );
 
         // Redirect to Stripe
@@ -84,6 +100,9 @@ const Checkout = () => {
         navigate('/account');
       }
     } catch (error) {
+      if (orderRejected) {
+        attemptKey.current = crypto.randomUUID();
+      }
       toast.error(error.response?.data?.detail || 'Failed to place order');
       setLoading(false);
     }
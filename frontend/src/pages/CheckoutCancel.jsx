@@ -1,11 +1,25 @@
+import { useEffect } from 'react';
 import { Link, useSearchParams } from 'react-router-dom';
+import axios from 'axios';
 import { motion } from 'framer-motion';
 import { XCircle } from 'lucide-react';
 import { Button } from '@/components/ui/button';
+import { useAuth } from '@/context/AuthContext';
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 const CheckoutCancel = () => {
   const [searchParams] = useSearchParams();
   const orderId = searchParams.get('order_id');
+  const { token } = useAuth();
+
+  // Hand the abandoned order's stock hold back straight away
+  useEffect(() => {
+    if (!orderId || !token) return;
+    axios.post(`${API}/orders/${orderId}/cancel`, {}, {
+      headers: { Authorization: `Bearer ${token}` }
+    }).catch(() => {});
+  }, [orderId, token]);
 
   return (
     <div className="min-h-screen pt-20 flex items-center justify-center" data-testid="checkout-cancel-page">
@@ -2,12 +2,10 @@ import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { ArrowRight, Sparkles } from 'lucide-react';
-import axios from 'axios';
 import { Button } from '@/components/ui/button';
 import { useSiteSettings } from '@/context/SiteSettingsContext';
 import ProductCard from '@/components/ProductCard';
-
-const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+import { loadBootstrap } from '@/lib/bootstrap';
 
 const Home = () => {
   const [featuredProducts, setFeaturedProducts] = useState([]);
@@ -21,8 +19,8 @@ const Home = () => {
   useEffect(() => {
     const fetchFeatured = async () => {
       try {
-        const response = await axios.get(`${API}/products?featured=true`);
-        setFeaturedProducts(response.data.slice(0, 6));
+        const data = await loadBootstrap();
+        setFeaturedProducts(data.featured_products);
       } catch (error) {
         console.error('Error fetching products:', error);
       } finally {
@@ -7,6 +7,7 @@ import { useCart } from '@/context/CartContext';
 import { useAuth } from '@/context/AuthContext';
 import { Button } from '@/components/ui/button';
 import { Textarea } from '@/components/ui/textarea';
+import ProductCard from '@/components/ProductCard';
 import { toast } from 'sonner';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
@@ -18,23 +19,24 @@ const ProductDetail = () => {
   
   const [product, setProduct] = useState(null);
   const [reviews, setReviews] = useState([]);
+  const [reviewsCursor, setReviewsCursor] = useState(null);
+  const [loadingMoreReviews, setLoadingMoreReviews] = useState(false);
   const [loading, setLoading] = useState(true);
   const [quantity, setQuantity] = useState(1);
   const [selectedImage, setSelectedImage] = useState(0);
   const [reviewRating, setReviewRating] = useState(5);
   const [reviewComment, setReviewComment] = useState('');
   const [submittingReview, setSubmittingReview] = useState(false);
+  const [related, setRelated] = useState([]);
 
   useEffect(() => {
     const fetchProduct = async () => {
       setLoading(true);
       try {
-        const [productRes, reviewsRes] = await Promise.all([
-          axios.get(`${API}/products/${id}`),
-          axios.get(`${API}/products/${id}/reviews`)
-        ]);
-        setProduct(productRes.data);
-        setReviews(reviewsRes.data);
+        const response = await axios.get(`${API}/products/${id}/detail`);
+        setProduct(response.data.product);
+        setReviews(response.data.reviews.items);
+        setReviewsCursor(response.data.reviews.next_cursor);
       } catch (error) {
         console.error('Error fetching product:', error);
       } finally {
@@ -42,8 +44,26 @@ const ProductDetail = () => {
       }
     };
     fetchProduct();
+    axios.get(`${API}/products/${id}/related`)
+      .then((response) => setRelated(response.data))
+      .catch(() => setRelated([]));
   }, [id]);
 
+  const handleLoadMoreReviews = async () => {
+    setLoadingMoreReviews(true);
+    try {
+      const response = await axios.get(`${API}/products/${id}/reviews/page`, {
+        params: { cursor: reviewsCursor }
+      });
+      setReviews(current => [...current, ...response.data.items]);
+      setReviewsCursor(response.data.next_cursor);
+    } catch (error) {
+      toast.error('Failed to load more reviews');
+    } finally {
+      setLoadingMoreReviews(false);
+    }
+  };
+
   const handleAddToCart = () => {
     if (product) {
       addItem(product, quantity);
@@ -318,9 +338,31 @@ const ProductDetail = () => {
                   <p className="text-[#A3A3A3] text-sm">{review.comment}</p>
                 </div>
               ))}
+              {reviewsCursor && (
+                <Button
+                  variant="outline"
+                  onClick={handleLoadMoreReviews}
+                  disabled={loadingMoreReviews}
+                  data-testid="load-more-reviews"
+                >
+                  {loadingMoreReviews ? 'Loading...' : 'Load More Reviews'}
+                </Button>
+              )}
             </div>
           )}
         </section>
+
+        {/* Customers Also Bought */}
+        {related.length > 0 && (
+          <section className="mt-24 pt-12 border-t border-white/5" data-testid="related-products">
+            <h2 className="text-2xl font-serif text-white mb-8">Customers Also Bought</h2>
+            <div className="products-grid">
+              {related.map((item, index) => (
+                <ProductCard key={item.id} product={item} index={index} />
+              ))}
+            </div>
+          </section>
+        )}
       </div>
     </div>
   );
@@ -3,34 +3,61 @@ import { useParams } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { Filter, X } from 'lucide-react';
 import axios from 'axios';
-import ProductCard from '@/components/ProductCard';
+import ProductCard, { PRODUCT_CARD_FIELDS } from '@/components/ProductCard';
 import { Button } from '@/components/ui/button';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+const CATEGORY_LABELS = {
+  resin: 'Resin Art & Décor',
+  soaps: 'Soaps, Lotions & Scrubs',
+  candles: 'Candles'
+};
+
+const categoryLabel = (value) => {
+  const name = value || 'other';
+  return CATEGORY_LABELS[name] || name.charAt(0).toUpperCase() + name.slice(1);
+};
+
 const Shop = () => {
   const { category } = useParams();
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filterOpen, setFilterOpen] = useState(false);
   const [selectedCategory, setSelectedCategory] = useState(category || 'all');
+  const [facets, setFacets] = useState(null);
+  const [sortBy, setSortBy] = useState('');
+
+  useEffect(() => {
+    axios.get(`${API}/products/facets`)
+      .then((response) => setFacets(response.data))
+      .catch((error) => console.error('Error fetching facets:', error));
+  }, []);
 
   const categories = [
-    { value: 'all', label: 'All Products' },
-    { value: 'resin', label: 'Resin Art & Décor' },
-    { value: 'soaps', label: 'Soaps, Lotions & Scrubs' },
-    { value: 'candles', label: 'Candles' }
+    { value: 'all', label: 'All Products', count: facets?.count },
+    ...(facets
+      // Uncategorised products still show under "All Products"
+      ? facets.categories.filter((facet) => facet.category).map((facet) => ({
+          value: facet.category,
+          label: categoryLabel(facet.category),
+          count: facet.count
+        }))
+      : Object.keys(CATEGORY_LABELS).map((value) => ({ value, label: categoryLabel(value) })))
   ];
 
   useEffect(() => {
     const fetchProducts = async () => {
       setLoading(true);
       try {
-        let url = `${API}/products`;
+        const params = { fields: PRODUCT_CARD_FIELDS };
         if (category) {
-          url += `?category=${category}`;
+          params.category = category;
+        }
+        if (sortBy) {
+          params.sort = sortBy;
         }
-        const response = await axios.get(url);
+        const response = await axios.get(`${API}/products`, { params });
         setProducts(response.data);
       } catch (error) {
         console.error('Error fetching products:', error);
@@ -40,7 +67,7 @@ const Shop = () => {
     };
     fetchProducts();
     setSelectedCategory(category || 'all');
-  }, [category]);
+  }, [category, sortBy]);
 
   const filteredProducts = selectedCategory === 'all'
     ? products
@@ -92,6 +119,9 @@ const Shop = () => {
                         data-testid={`filter-${cat.value}`}
                       >
                         {cat.label}
+                        {cat.count !== undefined && (
+                          <span className="ml-2 text-xs text-[#A3A3A3]/60">({cat.count})</span>
+                        )}
                       </button>
                     </li>
                   ))}
@@ -145,6 +175,9 @@ const Shop = () => {
                           }`}
                         >
                           {cat.label}
+                          {cat.count !== undefined && (
+                            <span className="ml-2 text-xs text-[#A3A3A3]/60">({cat.count})</span>
+                          )}
                         </button>
                       </li>
                     ))}
@@ -155,6 +188,17 @@ const Shop = () => {
 
             {/* Products Grid */}
             <div className="flex-1">
+              <div className="flex justify-end mb-6">
+                <select
+                  value={sortBy}
+                  onChange={(e) => setSortBy(e.target.value)}
+                  className="bg-[#0F0F0F] border border-white/10 text-sm text-[#A3A3A3] px-3 py-2"
+                  data-testid="sort-select"
+                >
+                  <option value="">Featured</option>
+                  <option value="popular">Most Popular</option>
+                </select>
+              </div>
               {loading ? (
                 <div className="products-grid">
                   {[...Array(6)].map((_, i) => (
@@ -0,0 +1,161 @@
+"""In-process API fixtures.
+
+The app runs inside the test process behind an ASGI transport, with the fake
+payment gateway. The database is chosen by environment:
+
+    (default)               in-memory mongomock-motor, nothing to install
+    TEST_MONGO_URL=...      an existing MongoDB server
+    TEST_MONGOD=1           spawn a throwaway mongod from PATH per worker
+
+Every pytest-xdist worker uses its own database, so `pytest -n auto` is safe
+against a shared server too.
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import subprocess
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from config import Settings
+from fake_payments import FakePaymentGateway
+import caching
+import core
+import idempotency
+import payments
+import server
+import stats
+
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def spawn_mongod(dbpath: Path) -> tuple:
+    binary = shutil.which("mongod")
+    if not binary:
+        pytest.exit("TEST_MONGOD is set but mongod is not on PATH", returncode=2)
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", str(dbpath), "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"mongodb://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    pytest.exit("mongod did not start within 30s", returncode=2)
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="session")
+def mongo_url(tmp_path_factory):
+    """URL of a real MongoDB, or None for the in-memory stand-in"""
+    if os.environ.get("TEST_MONGO_URL"):
+        yield os.environ["TEST_MONGO_URL"]
+    elif os.environ.get("TEST_MONGOD"):
+        process, url = spawn_mongod(tmp_path_factory.mktemp(f"mongod-{WORKER_ID}"))
+        yield url
+        process.terminate()
+        process.wait(timeout=30)
+    else:
+        yield None
+
+@pytest.fixture
+def settings(mongo_url):
+    return Settings(
+        mongo_url=mongo_url or "mongodb://in-memory",
+        db_name=f"perennia_test_{WORKER_ID}",
+        jwt_secret="test-secret-long-enough-for-hs256-keys",
+        bcrypt_rounds=4,
+        payment_provider="fake",
+        payment_timeout_seconds=1,
+        payment_reconcile_interval=0,
+        reservation_sweep_interval=3600,
+        related_refresh_interval=0,
+        archive_interval=0,
+        run_job_worker=False
+    )
+
+def reset_process_state():
+    """Module-level caches outlive an app instance; start every test clean"""
+    for cache in caching.local_caches:
+        cache.invalidate()
+    caching.invalidation_bus.versions.clear()
+    idempotency._idempotency_cache.clear()
+    payments.payment_breaker = payments.CircuitBreaker("payments", failure_threshold=5, reset_timeout=30)
+    FakePaymentGateway.reset()
+    stats.product_counters = stats.ProductCounters()
+
+@pytest.fixture
+async def app(settings, mongo_url):
+    reset_process_state()
+    mongo_client = None
+    if mongo_url is None:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo_client = AsyncMongoMockClient()
+    application = server.create_app(settings, mongo_client)
+    async with application.router.lifespan_context(application):
+        try:
+            yield application
+        finally:
+            await core.client.drop_database(settings.db_name)
+
+@pytest.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+        yield http
+
+@pytest.fixture
+async def seeded(client):
+    response = await client.post("/api/seed")
+    assert response.status_code == 200
+    return (await client.get("/api/products")).json()
+
+@pytest.fixture
+async def admin_headers(client):
+    assert (await client.post("/api/admin/setup")).status_code == 200
+    response = await client.post("/api/auth/login", json={"email": "admin@perennia.bb", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+@pytest.fixture
+async def user_headers(client):
+    response = await client.post("/api/auth/register", json={
+        "email": "customer@example.com",
+        "password": "testpass123",
+        "first_name": "Test",
+        "last_name": "Customer"
+    })
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+# Shipping details for orders placed through the API
+ORDER = {
+    "shipping_address": "123 Test Street",
+    "city": "Bridgetown",
+    "postal_code": "BB11000",
+    "phone": "246-123-4567"
+}
+
+def order_body(product_id: str, quantity: int = 1, payment_method: str = "form") -> dict:
+    return {**ORDER, "payment_method": payment_method, "items": [{"product_id": product_id, "quantity": quantity}]}
+
+async def place_order(client, headers, product_id: str, quantity: int = 1, payment_method: str = "form") -> dict:
+    """Place a one-line order and return it"""
+    response = await client.post("/api/orders", json=order_body(product_id, quantity, payment_method), headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
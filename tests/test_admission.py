@@ -0,0 +1,110 @@
+"""Admission control: class caps, priority order and load shedding"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, LoadShed, classify_request, route_classes
+
+pytestmark = pytest.mark.anyio
+
+def controller(capacity: int = 10, target_delay: float = 0.05) -> AdmissionController:
+    return AdmissionController(capacity, route_classes(capacity), target_delay)
+
+async def queued(admission, name):
+    """Start an acquire that has to wait and return its task once it is in the queue"""
+    task = asyncio.ensure_future(admission.acquire(admission.classes[name]))
+    await asyncio.sleep(0)
+    assert not task.done()
+    return task
+
+async def fill(admission, name, count):
+    for _ in range(count):
+        await admission.acquire(admission.classes[name])
+
+def test_requests_are_classified_by_route():
+    assert classify_request("POST", "/api/orders") == "checkout"
+    assert classify_request("GET", "/api/orders") == "browse"
+    assert classify_request("POST", "/api/checkout/create-session") == "checkout"
+    assert classify_request("POST", "/api/auth/login") == "auth"
+    assert classify_request("GET", "/api/admin/orders") == "admin"
+    assert classify_request("GET", "/api/products") == "browse"
+
+async def test_waiter_at_its_own_cap_does_not_block_lower_priority():
+    admission = controller()
+    auth, browse = admission.classes["auth"], admission.classes["browse"]
+    await fill(admission, "auth", auth.max_concurrency)
+    waiting = await queued(admission, "auth")
+
+    # Plenty of global capacity left: browse goes straight in past the capped auth queue
+    await admission.acquire(browse)
+    assert browse.in_flight == 1 and admission.stats()["classes"]["auth"]["queued"] == 1
+
+    admission.release(auth)
+    await waiting
+    assert auth.in_flight == auth.max_concurrency
+
+async def test_higher_priority_is_admitted_first():
+    admission = controller(capacity=2)
+    checkout, browse = admission.classes["checkout"], admission.classes["browse"]
+    await fill(admission, "checkout", 2)
+    browse_waiter = await queued(admission, "browse")
+    checkout_waiter = await queued(admission, "checkout")
+
+    # Slots are handed over on release, before either waiter wakes
+    admission.release(checkout)
+    assert (checkout.in_flight, browse.in_flight) == (2, 0)
+    admission.release(checkout)
+    assert (checkout.in_flight, browse.in_flight) == (1, 1)
+    await asyncio.gather(checkout_waiter, browse_waiter)
+    assert admission.stats()["queued"] == 0
+
+async def test_newcomer_does_not_jump_a_runnable_queue():
+    admission = controller(capacity=1)
+    checkout, browse = admission.classes["checkout"], admission.classes["browse"]
+    await fill(admission, "checkout", 1)
+    first = await queued(admission, "browse")
+    admission.release(checkout)
+    assert browse.in_flight == 1
+
+    second = await queued(admission, "browse")
+    admission.release(browse)
+    await first
+    assert browse.in_flight == 1
+    admission.release(browse)
+    await second
+
+async def test_shed_when_queue_delay_passes_target():
+    admission = controller(capacity=1, target_delay=0.05)
+    await fill(admission, "checkout", 1)
+    admission.queue_delay = 0.15
+
+    with pytest.raises(LoadShed):
+        await admission.acquire(admission.classes["browse"])
+    assert admission.classes["browse"].shed == 1
+    # Checkout is never shed early; it waits for its own deadline
+    waiting = await queued(admission, "checkout")
+    admission.release(admission.classes["checkout"])
+    await waiting
+
+async def test_queue_timeout_sheds_and_leaves_the_queue(monkeypatch):
+    admission = controller(capacity=1)
+    browse = admission.classes["browse"]
+    monkeypatch.setattr(browse, "queue_timeout", 0.01)
+    await fill(admission, "checkout", 1)
+
+    with pytest.raises(LoadShed):
+        await admission.acquire(browse)
+    assert browse.shed == 1 and not browse.waiters
+    assert admission.queue_delay > 0
+
+async def test_cancelled_waiter_is_purged():
+    admission = controller(capacity=1)
+    await fill(admission, "checkout", 1)
+    waiting = await queued(admission, "browse")
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert admission.stats()["queued"] == 0
+
+    admission.release(admission.classes["checkout"])
+    assert admission.in_flight == 0
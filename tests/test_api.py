@@ -0,0 +1,108 @@
+"""
+Core API flows: catalog, auth, orders, contact and checkout
+(the in-process counterpart of backend_test.py)
+"""
+import json
+
+import pytest
+
+from fake_payments import FakePaymentGateway
+from tests.conftest import order_body, place_order
+
+pytestmark = pytest.mark.anyio
+
+async def test_root(client):
+    response = await client.get("/api/")
+    assert response.status_code == 200
+    assert "Perennia" in response.json()["message"]
+
+async def test_seed_products(client, seeded):
+    assert len(seeded) > 0
+    # Seeding is idempotent
+    response = await client.post("/api/seed")
+    assert response.json()["message"] == "Data already seeded"
+
+async def test_product_details_and_reviews(client, seeded):
+    product_id = seeded[0]["id"]
+    assert (await client.get(f"/api/products/{product_id}")).json()["id"] == product_id
+    assert (await client.get(f"/api/products/{product_id}/reviews")).json() == []
+    assert (await client.get("/api/products/missing")).status_code == 404
+
+async def test_register_login_and_me(client):
+    user = {"email": "new@example.com", "password": "secret123", "first_name": "New", "last_name": "User"}
+    assert (await client.post("/api/auth/register", json=user)).status_code == 200
+    assert (await client.post("/api/auth/register", json=user)).status_code == 400
+
+    response = await client.post("/api/auth/login", json={"email": user["email"], "password": user["password"]})
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    assert (await client.get("/api/auth/me", headers=headers)).json()["email"] == user["email"]
+
+    wrong = await client.post("/api/auth/login", json={"email": user["email"], "password": "nope"})
+    assert wrong.status_code == 401
+
+async def test_protected_endpoints_require_auth(client):
+    assert (await client.get("/api/auth/me")).status_code == 401
+    assert (await client.get("/api/orders")).status_code == 401
+
+async def test_admin_setup_only_once(client):
+    assert (await client.post("/api/admin/setup")).status_code == 200
+    assert (await client.post("/api/admin/setup")).status_code == 400
+
+async def test_admin_endpoints(client, admin_headers, user_headers):
+    assert (await client.get("/api/admin/orders", headers=admin_headers)).status_code == 200
+    assert (await client.get("/api/admin/contacts", headers=admin_headers)).status_code == 200
+    assert (await client.get("/api/admin/orders", headers=user_headers)).status_code == 403
+
+async def test_contact_form(client, admin_headers):
+    response = await client.post("/api/contact", json={
+        "name": "Test User",
+        "email": "test@example.com",
+        "subject": "Test Message",
+        "message": "This is a test message."
+    })
+    assert response.status_code == 200
+    contacts = (await client.get("/api/admin/contacts", headers=admin_headers)).json()
+    assert [c["subject"] for c in contacts] == ["Test Message"]
+
+async def test_form_order_takes_stock(client, seeded, user_headers):
+    product = seeded[0]
+    order = await place_order(client, user_headers, product["id"], quantity=2)
+    assert order["total_bbd"] == product["price_bbd"] * 2
+
+    assert (await client.get(f"/api/products/{product['id']}")).json()["stock"] == product["stock"] - 2
+    orders = (await client.get("/api/orders", headers=user_headers)).json()
+    assert [o["id"] for o in orders] == [order["id"]]
+
+async def test_order_rejects_insufficient_stock(client, seeded, user_headers):
+    body = order_body(seeded[0]["id"], quantity=10_000)
+    assert (await client.post("/api/orders", json=body, headers=user_headers)).status_code == 400
+
+async def test_checkout_with_fake_gateway(client, seeded, user_headers):
+    order = await place_order(client, user_headers, seeded[0]["id"], payment_method="stripe")
+
+    response = await client.post(
+        "/api/checkout/create-session",
+        json={"order_id": order["id"], "origin_url": "http://shop.test"},
+        headers=user_headers
+    )
+    assert response.status_code == 200
+    session_id = response.json()["session_id"]
+
+    FakePaymentGateway.complete(session_id)
+    response = await client.post("/api/webhook/stripe", content=json.dumps({"session_id": session_id}))
+    assert response.json() == {"received": True}
+
+    paid = (await client.get(f"/api/orders/{order['id']}", headers=user_headers)).json()
+    assert paid["payment_status"] == "paid"
+
+async def test_checkout_provider_failure_maps_to_502(client, seeded, user_headers):
+    order = await place_order(client, user_headers, seeded[0]["id"], payment_method="stripe")
+
+    FakePaymentGateway.faults.fail_next = 1
+    response = await client.post(
+        "/api/checkout/create-session",
+        json={"order_id": order["id"], "origin_url": "http://shop.test"},
+        headers=user_headers
+    )
+    assert response.status_code == 502
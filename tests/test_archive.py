@@ -0,0 +1,50 @@
+"""Moving old finished orders to the archive, and reading them back"""
+import pytest
+
+import core
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+async def place_order_at(client, headers, product_id, created_at) -> str:
+    order_id = (await place_order(client, headers, product_id))["id"]
+    await core.db.orders.update_one({"id": order_id}, {"$set": {"created_at": created_at}})
+    return order_id
+
+async def test_old_finished_orders_move_to_archive(client, seeded, admin_headers, user_headers):
+    product_id = seeded[0]["id"]
+    old_delivered = await place_order_at(client, user_headers, product_id, "2020-01-01T00:00:00+00:00")
+    old_pending = await place_order_at(client, user_headers, product_id, "2020-01-02T00:00:00+00:00")
+    recent = await place_order_at(client, user_headers, product_id, "2099-01-01T00:00:00+00:00")
+    for order_id in (old_delivered, recent):
+        await client.put(f"/api/admin/orders/{order_id}/status?status=delivered", headers=admin_headers)
+    await core.db.payment_transactions.insert_one({"id": "t1", "order_id": old_delivered, "session_id": "cs_1", "payment_status": "paid"})
+
+    report = (await client.post("/api/admin/archive/orders", headers=admin_headers)).json()
+    assert report["orders_archived"] == 1
+    assert sorted(await core.db.orders.distinct("id")) == sorted([old_pending, recent])
+    assert await core.db.payment_transactions.count_documents({}) == 0
+    assert (await core.db.payment_transactions_archive.find_one({"id": "t1"}))["order_id"] == old_delivered
+
+    # Direct lookups fall back to the archive
+    response = await client.get(f"/api/orders/{old_delivered}", headers=user_headers)
+    assert response.status_code == 200 and response.json()["status"] == "delivered"
+    history = (await client.get("/api/orders/history?archived=true", headers=user_headers)).json()
+    assert [order["id"] for order in history["items"]] == [old_delivered]
+    # An archived order can move to another finished status but never reopens
+    response = await client.put(f"/api/admin/orders/{old_delivered}/status?status=cancelled", headers=admin_headers)
+    assert response.status_code == 200
+    response = await client.put(f"/api/admin/orders/{old_delivered}/status?status=processing", headers=admin_headers)
+    assert response.status_code == 409
+    assert (await core.db.orders_archive.find_one({"id": old_delivered}))["status"] == "cancelled"
+    assert (await client.put("/api/admin/orders/missing/status?status=cancelled", headers=admin_headers)).status_code == 404
+
+    # Nothing left to move
+    assert (await client.post("/api/admin/archive/orders", headers=admin_headers)).json()["orders_archived"] == 0
+
+async def test_contact_messages_are_dated_for_ttl(client, admin_headers):
+    await client.post("/api/contact", json={"name": "A", "email": "a@example.com", "subject": "Hi", "message": "Hello"})
+    stored = await core.db.contact_messages.find_one({})
+    assert stored["received_at"] is not None
+    [message] = (await client.get("/api/admin/contacts", headers=admin_headers)).json()
+    assert "received_at" not in message
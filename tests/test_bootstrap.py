@@ -0,0 +1,39 @@
+"""/api/bootstrap: one first-render payload with ETag revalidation"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_anonymous_bootstrap_revalidates_with_304(client, seeded):
+    response = await client.get("/api/bootstrap")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"] is None
+    assert {"settings", "featured_products", "categories"} <= set(body)
+    assert response.headers["cache-control"].startswith("public")
+    etag = response.headers["etag"]
+
+    again = await client.get("/api/bootstrap", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag and not again.content
+
+async def test_etag_follows_settings_and_catalog_changes(client, seeded, admin_headers):
+    etag = (await client.get("/api/bootstrap")).headers["etag"]
+    await client.put("/api/admin/settings", json={"business_name": "Renamed"}, headers=admin_headers)
+    response = await client.get("/api/bootstrap", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["settings"]["business_name"] == "Renamed"
+
+    etag = response.headers["etag"]
+    await client.put(f"/api/admin/products/{seeded[0]['id']}", json={"price_bbd": 1}, headers=admin_headers)
+    assert (await client.get("/api/bootstrap", headers={"If-None-Match": etag})).status_code == 200
+
+async def test_signed_in_bootstrap_is_private_to_the_user(client, seeded, user_headers, admin_headers):
+    anonymous = (await client.get("/api/bootstrap")).headers["etag"]
+    response = await client.get("/api/bootstrap", headers=user_headers)
+    assert response.json()["user"]["is_admin"] is False
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+    assert etag != anonymous
+
+    assert (await client.get("/api/bootstrap", headers={**user_headers, "If-None-Match": etag})).status_code == 304
+    # Another session's tag never matches
+    assert (await client.get("/api/bootstrap", headers={**admin_headers, "If-None-Match": etag})).status_code == 200
+    assert (await client.get("/api/bootstrap", headers={"If-None-Match": etag})).status_code == 200
@@ -0,0 +1,77 @@
+"""Per-worker caches and the versioned invalidation bus"""
+import time
+
+import pytest
+
+import caching
+from caching import InvalidationBus, LocalCache
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+def message(version: int, key=None) -> dict:
+    return {"namespace": "things", "key": key, "version": version, "published_at": time.time()}
+
+async def test_bus_applies_versions_in_order_and_flushes_on_a_gap(app):
+    bus = InvalidationBus(transport=None)
+    cache = LocalCache("things")
+    bus.subscribe("things", cache.invalidate)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    bus.deliver(message(1, "a"))
+    assert cache.get("a") is None and cache.get("b") == "B"
+    # A replayed or reordered message is ignored
+    cache.set("a", "A")
+    bus.deliver(message(1, "a"))
+    assert cache.get("a") == "A"
+
+    # Version 2 went missing: whatever it named is unknown, so everything goes
+    bus.deliver(message(3, "b"))
+    assert (cache.get("a"), cache.get("c")) == (None, None)
+    assert bus.version("things") == 3 and bus.gaps == 1
+
+async def test_flush_discards_values_computed_before_it(app):
+    cache = LocalCache("things")
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("a", "stale", generation)
+    assert cache.get("a") is None
+
+async def test_publish_bumps_the_shared_counter(app):
+    await caching.invalidation_bus.publish("things", "a")
+    await caching.invalidation_bus.publish("things")
+    assert caching.invalidation_bus.version("things") == 2
+
+async def test_orders_only_reprice_carts_holding_their_products(client, seeded, user_headers, admin_headers):
+    sold, other = seeded[0], seeded[1]
+    await client.put("/api/cart", json={"items": [{"product_id": other["id"], "quantity": 1}]}, headers=user_headers)
+    await client.put("/api/cart", json={"items": [{"product_id": sold["id"], "quantity": 1}]}, headers=admin_headers)
+    await client.get("/api/products/facets")
+    carts_before = set(caching.cart_cache.entries)
+
+    await place_order(client, user_headers, sold["id"])
+    # The admin's cart holds the product and was dropped; the user's did not
+    assert len(caching.cart_cache.entries) == len(carts_before) - 1
+    assert caching.facets_cache.get("all") is not None
+    cart = (await client.get("/api/cart", headers=admin_headers)).json()
+    assert cart["items"][0]["stock"] == sold["stock"] - 1
+
+async def test_selling_out_refreshes_facets(client, seeded, user_headers, admin_headers):
+    product = seeded[0]
+    await client.put(f"/api/admin/products/{product['id']}", json={"stock": 1}, headers=admin_headers)
+    in_stock = (await client.get("/api/products/facets")).json()["in_stock"]
+
+    await place_order(client, user_headers, product["id"])
+    assert (await client.get("/api/products/facets")).json()["in_stock"] == in_stock - 1
+
+async def test_reviews_keep_carts_cached(client, seeded, user_headers):
+    product = seeded[0]
+    await client.put("/api/cart", json={"items": [{"product_id": product["id"], "quantity": 1}]}, headers=user_headers)
+    await client.get("/api/products/facets")
+    assert caching.cart_cache.entries
+
+    review = {"product_id": product["id"], "rating": 5, "comment": "Lovely"}
+    assert (await client.post(f"/api/products/{product['id']}/reviews", json=review, headers=user_headers)).status_code == 200
+    assert caching.cart_cache.entries
+    assert caching.facets_cache.get("all") is None
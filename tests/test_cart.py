@@ -0,0 +1,57 @@
+"""Server-side cart: line edits, repricing and stock issues"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_cart_lines_are_merged_and_repriced(client, seeded, user_headers, admin_headers):
+    a, b = seeded[0], seeded[1]
+    assert (await client.get("/api/cart", headers=user_headers)).json()["items"] == []
+
+    response = await client.put("/api/cart", headers=user_headers, json={"items": [
+        {"product_id": a["id"], "quantity": 1}, {"product_id": b["id"], "quantity": 2}, {"product_id": a["id"], "quantity": 2}
+    ]})
+    cart = response.json()
+    assert [(line["product_id"], line["quantity"]) for line in cart["items"]] == [(a["id"], 3), (b["id"], 2)]
+    assert cart["total_bbd_cents"] == a["price_bbd_cents"] * 3 + b["price_bbd_cents"] * 2
+    assert cart["item_count"] == 5
+
+    # A catalog price change shows up on the next read
+    await client.put(f"/api/admin/products/{a['id']}", json={"price_bbd": 10}, headers=admin_headers)
+    cart = (await client.get("/api/cart", headers=user_headers)).json()
+    assert cart["items"][0]["price_bbd_cents"] == 1000
+    assert cart["total_bbd_cents"] == 3000 + b["price_bbd_cents"] * 2
+
+async def test_cart_item_edits(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    await client.post("/api/cart/items", json={"product_id": product_id, "quantity": 1}, headers=user_headers)
+    cart = (await client.post("/api/cart/items", json={"product_id": product_id, "quantity": 2}, headers=user_headers)).json()
+    assert cart["items"][0]["quantity"] == 3
+
+    cart = (await client.put(f"/api/cart/items/{product_id}?quantity=5", headers=user_headers)).json()
+    assert cart["items"][0]["quantity"] == 5
+    assert (await client.put("/api/cart/items/missing?quantity=1", headers=user_headers)).status_code == 404
+    # Quantity 0 removes the line
+    assert (await client.put(f"/api/cart/items/{product_id}?quantity=0", headers=user_headers)).json()["items"] == []
+
+    await client.post("/api/cart/items", json={"product_id": product_id, "quantity": 1}, headers=user_headers)
+    assert (await client.delete(f"/api/cart/items/{product_id}", headers=user_headers)).json()["items"] == []
+    await client.post("/api/cart/items", json={"product_id": product_id, "quantity": 1}, headers=user_headers)
+    assert (await client.delete("/api/cart", headers=user_headers)).json()["item_count"] == 0
+
+    bad = await client.post("/api/cart/items", json={"product_id": product_id, "quantity": 0}, headers=user_headers)
+    assert bad.status_code == 422
+
+async def test_cart_reports_stock_issues(client, seeded, user_headers):
+    product = seeded[0]
+    cart = (await client.put("/api/cart", headers=user_headers, json={"items": [
+        {"product_id": product["id"], "quantity": product["stock"] + 1}, {"product_id": "gone", "quantity": 1}
+    ]})).json()
+    issues = {issue["product_id"]: issue for issue in cart["stock_issues"]}
+    assert issues[product["id"]]["reason"] == "insufficient_stock"
+    assert issues[product["id"]]["available"] == product["stock"]
+    assert issues["gone"]["reason"] == "not_found"
+    # Unknown products are not priced
+    assert [line["product_id"] for line in cart["items"]] == [product["id"]]
+
+async def test_cart_requires_login(client):
+    assert (await client.get("/api/cart")).status_code in (401, 403)
@@ -0,0 +1,54 @@
+"""Rates table, rounding rules and catalog repricing"""
+import pytest
+
+from currency import convert
+
+pytestmark = pytest.mark.anyio
+
+RATES = [
+    {"code": "USD", "rate": 0.5, "increment": 0.01},
+    {"code": "EUR", "rate": 0.4613, "symbol": "€", "increment": 0.05},
+    {"code": "JPY", "rate": 73.21, "symbol": "¥", "increment": 1, "rounding": "up"}
+]
+
+def test_rounding_rules():
+    assert convert(120, {"rate": 0.4613, "increment": 0.05, "rounding": "nearest"}) == 55.35
+    assert convert(120, {"rate": 0.4613, "increment": 0.05, "rounding": "down"}) == 55.35
+    assert convert(120, {"rate": 0.4613, "increment": 0.05, "rounding": "up"}) == 55.4
+    assert convert(0.1, {"rate": 3, "increment": 0.01, "rounding": "nearest"}) == 0.3
+
+async def test_seeded_products_carry_default_currencies(client, seeded):
+    product = seeded[0]
+    assert set(product["prices"]) == {"BBD", "USD", "EUR", "GBP", "CAD"}
+    assert product["prices"]["USD"] == product["price_usd"]
+
+async def test_rates_update_and_reprice(client, seeded, admin_headers, user_headers):
+    assert (await client.put("/api/admin/currencies", json=RATES, headers=user_headers)).status_code == 403
+    bad = await client.put("/api/admin/currencies", json=[{"code": "eur", "rate": 1}], headers=admin_headers)
+    assert bad.status_code == 422
+
+    assert (await client.put("/api/admin/currencies", json=RATES, headers=admin_headers)).status_code == 200
+    codes = [c["code"] for c in (await client.get("/api/currencies")).json()]
+    assert codes == ["BBD", "EUR", "JPY", "USD"]
+
+    report = (await client.post("/api/admin/products/reprice", headers=admin_headers)).json()
+    assert report["repriced"] == len(seeded)
+    product = (await client.get(f"/api/products/{seeded[0]['id']}")).json()
+    assert set(product["prices"]) == {"BBD", "EUR", "JPY", "USD"}
+    assert product["prices"]["JPY"] == convert(product["price_bbd"], {**RATES[2], "rounding": "up"})
+
+async def test_price_change_reprices_product(client, seeded, admin_headers):
+    product_id = seeded[0]["id"]
+    response = await client.put(f"/api/admin/products/{product_id}", json={"price_bbd": 200}, headers=admin_headers)
+    updated = response.json()
+    assert updated["price_usd"] == 100
+    assert updated["prices"]["BBD"] == 200 and updated["prices"]["EUR"] == 92
+
+async def test_rates_table_must_price_usd(client, admin_headers):
+    response = await client.put("/api/admin/currencies", json=[{"code": "EUR", "rate": 0.46}], headers=admin_headers)
+    assert response.status_code == 422
+    # The rejected table changed nothing, so new products still get a USD price
+    product = await client.post("/api/admin/products", headers=admin_headers, json={
+        "name": "Rate Check", "description": "x", "price_bbd": 10, "category": "soaps", "stock": 1
+    })
+    assert product.status_code == 200 and product.json()["price_usd"] == 5
@@ -0,0 +1,84 @@
+"""Admin event stream: broker fan-out, SSE framing and stream tickets"""
+import json
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import admin
+import core
+import events
+from events import EventBroker, LocalEventTransport
+
+pytestmark = pytest.mark.anyio
+
+async def test_broker_fans_out_to_every_subscriber():
+    broker = EventBroker(LocalEventTransport())
+    first, second = broker.subscribe(), broker.subscribe()
+    await broker.publish("low_stock", {"product_id": "p1", "stock": 2})
+
+    for queue in (first, second):
+        event = queue.get_nowait()
+        assert (event["type"], event["data"]) == ("low_stock", {"product_id": "p1", "stock": 2})
+    broker.unsubscribe(second)
+    await broker.publish("contact_created", {})
+    assert first.qsize() == 1 and second.empty()
+
+async def test_slow_subscriber_is_told_to_resync(monkeypatch):
+    monkeypatch.setattr(events, "EVENT_QUEUE_SIZE", 2)
+    broker = EventBroker(LocalEventTransport())
+    slow = broker.subscribe()
+    for n in range(3):
+        await broker.publish("order_created", {"n": n})
+    # The backlog is dropped in favour of one resync marker
+    assert [slow.get_nowait()["type"] for _ in range(slow.qsize())] == ["resync"]
+
+async def test_streams_receive_published_events(app, monkeypatch):
+    monkeypatch.setattr(admin, "event_broker", EventBroker(LocalEventTransport()))
+
+    async def connected():
+        return False
+    request = SimpleNamespace(is_disconnected=connected)
+    streams = [(await admin.admin_events(request, {"id": "admin"})).body_iterator for _ in range(2)]
+    for stream in streams:
+        assert await stream.__anext__() == "retry: 5000\n\n"
+
+    await admin.event_broker.publish("order_status_changed", {"order_id": "o1", "status": "shipped"})
+    for stream in streams:
+        frame = await stream.__anext__()
+        lines = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+        assert lines["event"] == "order_status_changed"
+        assert json.loads(lines["data"]) == {"order_id": "o1", "status": "shipped"}
+        await stream.aclose()
+    assert not admin.event_broker.subscribers
+
+class TestStreamTickets:
+    async def ticket(self, client, headers) -> str:
+        response = await client.post("/api/admin/stream-tickets", headers=headers)
+        assert response.status_code == 200
+        return response.json()["ticket"]
+
+    async def test_ticket_opens_one_stream(self, client, admin_headers):
+        ticket = await self.ticket(client, admin_headers)
+        user = await admin.get_admin_user_for_stream(ticket=ticket, authorization=None)
+        assert user["is_admin"]
+        with pytest.raises(admin.HTTPException) as spent:
+            await admin.get_admin_user_for_stream(ticket=ticket, authorization=None)
+        assert spent.value.status_code == 401
+
+    async def test_expired_ticket_is_refused(self, client, admin_headers):
+        ticket = await self.ticket(client, admin_headers)
+        await core.db.stream_tickets.update_one(
+            {"_id": ticket}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        with pytest.raises(admin.HTTPException) as expired:
+            await admin.get_admin_user_for_stream(ticket=ticket, authorization=None)
+        assert expired.value.status_code == 401
+
+    async def test_only_admins_get_tickets_and_jwts_stay_out_of_urls(self, client, admin_headers, user_headers):
+        assert (await client.post("/api/admin/stream-tickets", headers=user_headers)).status_code == 403
+        assert (await client.post("/api/admin/stream-tickets")).status_code == 401
+        # The old ?token= form is no longer accepted
+        jwt = admin_headers["Authorization"].split(" ")[1]
+        assert (await client.get(f"/api/admin/events?token={jwt}")).status_code == 401
+        assert (await client.get("/api/admin/events?ticket=made-up")).status_code == 401
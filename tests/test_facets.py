@@ -0,0 +1,37 @@
+"""Category counts, price ranges and rating buckets from /api/products/facets"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_facets_summarise_the_catalog(client, seeded):
+    facets = (await client.get("/api/products/facets")).json()
+    assert facets["count"] == len(seeded)
+    assert facets["in_stock"] == sum(1 for product in seeded if product["stock"] > 0)
+    assert facets["price_bbd"] == {
+        "min": min(product["price_bbd"] for product in seeded),
+        "max": max(product["price_bbd"] for product in seeded)
+    }
+
+    by_category = {bucket["category"]: bucket for bucket in facets["categories"]}
+    assert sorted(by_category) == sorted({product["category"] for product in seeded})
+    for category, bucket in by_category.items():
+        members = [product for product in seeded if product["category"] == category]
+        assert bucket["count"] == len(members)
+        assert bucket["price_usd"]["max"] == max(product["price_usd"] for product in members)
+
+async def test_facets_follow_catalog_changes(client, seeded, admin_headers, user_headers):
+    before = (await client.get("/api/products/facets")).json()
+    product_id = seeded[0]["id"]
+    for rating, headers in ((5, user_headers), (4, admin_headers)):
+        await client.post(
+            f"/api/products/{product_id}/reviews",
+            json={"product_id": product_id, "rating": rating, "comment": ""},
+            headers=headers
+        )
+    await client.put(f"/api/admin/products/{product_id}", json={"stock": 0}, headers=admin_headers)
+
+    after = (await client.get("/api/products/facets")).json()
+    assert after["in_stock"] == before["in_stock"] - (seeded[0]["stock"] > 0)
+    # One product averaging 4.5 stars counts towards "4 & up" and every lower bucket
+    assert [bucket["count"] for bucket in after["ratings"]] == [1, 1, 1, 1]
+    assert after["unrated"] == before["unrated"] - 1
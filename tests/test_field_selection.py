@@ -0,0 +1,29 @@
+"""fields= projections on product, admin order and contact listings"""
+import pytest
+
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+async def test_product_fields(client, seeded):
+    products = (await client.get("/api/products?fields=name,image,average_rating")).json()
+    assert len(products) == len(seeded)
+    # id always comes along; image is the first of `images`
+    assert set(products[0]) == {"id", "name", "image", "average_rating"}
+    assert products[0]["image"] == seeded[0]["images"][0]
+
+    lean = (await client.get("/api/products?fields=price_bbd")).json()
+    assert set(lean[0]) == {"id", "price_bbd"}
+
+    response = await client.get("/api/products?fields=name,password")
+    assert response.status_code == 400 and "password" in response.json()["detail"]
+
+async def test_admin_order_and_contact_fields(client, seeded, admin_headers, user_headers):
+    await place_order(client, user_headers, seeded[0]["id"])
+    orders = (await client.get("/api/admin/orders?fields=status,total_bbd", headers=admin_headers)).json()
+    assert [set(order) for order in orders] == [{"id", "status", "total_bbd"}]
+    assert (await client.get("/api/admin/orders?fields=items.secret", headers=admin_headers)).status_code == 400
+
+    await client.post("/api/contact", json={"name": "A", "email": "a@example.com", "subject": "Hi", "message": "Hello"})
+    contacts = (await client.get("/api/admin/contacts?fields=subject", headers=admin_headers)).json()
+    assert contacts == [{"id": contacts[0]["id"], "subject": "Hi"}]
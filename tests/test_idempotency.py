@@ -0,0 +1,78 @@
+"""Idempotency-Key replay on order creation"""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import core
+import idempotency
+from models import OrderCreate
+from tests.conftest import ORDER
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def order_body(seeded):
+    return {**ORDER, "payment_method": "form", "items": [{"product_id": seeded[0]["id"], "quantity": 1}]}
+
+async def test_retry_replays_the_first_order(client, seeded, user_headers, order_body):
+    headers = {**user_headers, "Idempotency-Key": "order-1"}
+    first = await client.post("/api/orders", json=order_body, headers=headers)
+    # From the in-process cache, then from Mongo as another worker would see it
+    second = await client.post("/api/orders", json=order_body, headers=headers)
+    idempotency._idempotency_cache.clear()
+    third = await client.post("/api/orders", json=order_body, headers=headers)
+
+    assert first.status_code == second.status_code == third.status_code == 200
+    assert first.json()["id"] == second.json()["id"] == third.json()["id"]
+    assert await core.db.orders.count_documents({}) == 1
+    product = (await client.get(f"/api/products/{seeded[0]['id']}")).json()
+    assert product["stock"] == seeded[0]["stock"] - 1
+
+async def test_reused_key_with_other_body_is_422(client, user_headers, order_body):
+    headers = {**user_headers, "Idempotency-Key": "order-2"}
+    assert (await client.post("/api/orders", json=order_body, headers=headers)).status_code == 200
+    changed = {**order_body, "city": "Oistins"}
+    assert (await client.post("/api/orders", json=changed, headers=headers)).status_code == 422
+
+async def start_attempt(client, user_headers, order_body, idempotency_key: str, started_at: datetime):
+    """An in-progress record as left by a request still running (or whose worker died)"""
+    user_id = (await client.get("/api/auth/me", headers=user_headers)).json()["id"]
+    await core.db.idempotency_keys.insert_one({
+        "key": f"orders:{user_id}:{idempotency_key}",
+        "fingerprint": idempotency.request_fingerprint(OrderCreate(**order_body)),
+        "status": "in_progress",
+        "attempt": "elsewhere",
+        "started_at": started_at,
+        "created_at": started_at
+    })
+
+async def test_in_progress_key_is_409(client, user_headers, order_body):
+    await start_attempt(client, user_headers, order_body, "order-3", datetime.now(timezone.utc))
+    response = await client.post("/api/orders", json=order_body, headers={**user_headers, "Idempotency-Key": "order-3"})
+    assert response.status_code == 409
+    assert await core.db.orders.count_documents({}) == 0
+
+async def test_abandoned_attempt_is_taken_over_after_its_lease(client, user_headers, order_body):
+    started_at = datetime.now(timezone.utc) - timedelta(seconds=idempotency.IDEMPOTENCY_LEASE_SECONDS + 1)
+    await start_attempt(client, user_headers, order_body, "order-5", started_at)
+    headers = {**user_headers, "Idempotency-Key": "order-5"}
+    first = await client.post("/api/orders", json=order_body, headers=headers)
+    assert first.status_code == 200
+    assert (await client.post("/api/orders", json=order_body, headers=headers)).json()["id"] == first.json()["id"]
+    assert await core.db.orders.count_documents({}) == 1
+
+async def test_cached_responses_age_out(client, user_headers, order_body, monkeypatch):
+    headers = {**user_headers, "Idempotency-Key": "order-6"}
+    await client.post("/api/orders", json=order_body, headers=headers)
+    [key] = idempotency._idempotency_cache
+    assert idempotency._cached_idempotent(key) is not None
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_CACHE_SECONDS", -1)
+    assert idempotency._cached_idempotent(key) is None and not idempotency._idempotency_cache
+
+async def test_failed_attempt_releases_the_key(client, seeded, user_headers, order_body):
+    headers = {**user_headers, "Idempotency-Key": "order-4"}
+    too_many = {**order_body, "items": [{"product_id": seeded[0]["id"], "quantity": 10_000}]}
+    assert (await client.post("/api/orders", json=too_many, headers=headers)).status_code == 400
+    assert await core.db.idempotency_keys.count_documents({}) == 0
+    # The same key can carry the corrected request
+    assert (await client.post("/api/orders", json=order_body, headers=headers)).status_code == 200
@@ -0,0 +1,111 @@
+"""Job queue leases, retries and dead-lettering, with email sent to a local SMTP sink"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+from email import message_from_bytes
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import core
+from jobs import JobQueue, JobWorker, JOB_BACKOFF_BASE
+from tests.conftest import free_port
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = {"to": "customer@example.com", "subject": "Order received", "body": "Thanks!"}
+
+class SinkHandler:
+    """Keeps delivered messages; answers 451 (try again later) while `failures` lasts"""
+    def __init__(self):
+        self.messages = []
+        self.failures = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failures:
+            self.failures -= 1
+            return "451 Try again later"
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 OK"
+
+@pytest.fixture
+def smtp_sink():
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    handler.port = controller.port
+    yield handler
+    controller.stop()
+
+@pytest.fixture
+def settings(settings, smtp_sink):
+    return settings.model_copy(update={"smtp_host": "127.0.0.1", "smtp_port": smtp_sink.port})
+
+@pytest.fixture
+async def queue(app):
+    return JobQueue(core.db, "test_jobs")
+
+@pytest.fixture
+async def worker(queue):
+    task = asyncio.create_task(JobWorker(queue, concurrency=2).run())
+    yield
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+async def wait_for_job(queue, job_id, **expected) -> dict:
+    for _ in range(200):
+        job = await queue.collection.find_one({"id": job_id}, {"_id": 0})
+        if all(job.get(field) == value for field, value in expected.items()):
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"Job never reached {expected}: {job}")
+
+async def run_now(queue, job_id):
+    """Skip the retry backoff"""
+    await queue.collection.update_one({"id": job_id}, {"$set": {"run_at": datetime.now(timezone.utc)}})
+    queue.notify()
+
+async def test_email_is_delivered(smtp_sink, queue, worker):
+    job_id = await queue.enqueue("send_email", EMAIL)
+    job = await wait_for_job(queue, job_id, status="done")
+    assert job["attempts"] == 1
+    [message] = smtp_sink.messages
+    assert (message["To"], message["Subject"]) == (EMAIL["to"], EMAIL["subject"])
+
+async def test_transient_failure_is_retried_with_backoff(smtp_sink, queue, worker):
+    smtp_sink.failures = 1
+    job_id = await queue.enqueue("send_email", EMAIL)
+    job = await wait_for_job(queue, job_id, status="queued", attempts=1)
+    assert "451" in job["last_error"]
+    delay = (job["run_at"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+    assert JOB_BACKOFF_BASE * 0.5 < delay <= JOB_BACKOFF_BASE * 1.2
+    assert smtp_sink.messages == []
+
+    await run_now(queue, job_id)
+    await wait_for_job(queue, job_id, status="done", attempts=2)
+    assert len(smtp_sink.messages) == 1
+
+async def test_exhausted_attempts_dead_letter(smtp_sink, queue, worker):
+    smtp_sink.failures = 10
+    job_id = await queue.enqueue("send_email", EMAIL, max_attempts=2)
+    await wait_for_job(queue, job_id, status="queued", attempts=1)
+    await run_now(queue, job_id)
+    job = await wait_for_job(queue, job_id, status="failed", attempts=2)
+    assert "451" in job["last_error"] and job["finished_at"]
+    assert smtp_sink.messages == []
+
+async def test_claim_takes_over_expired_leases_only(queue):
+    now = datetime.now(timezone.utc)
+    await queue.collection.insert_many([
+        {"id": "live", "type": "send_email", "status": "running", "attempts": 1, "max_attempts": 5,
+         "run_at": now - timedelta(minutes=5), "locked_by": "other", "lease_expires_at": now + timedelta(minutes=1)},
+        {"id": "stalled", "type": "send_email", "status": "running", "attempts": 1, "max_attempts": 5,
+         "run_at": now - timedelta(minutes=5), "locked_by": "dead", "lease_expires_at": now - timedelta(seconds=1)},
+        {"id": "later", "type": "send_email", "status": "queued", "attempts": 0, "max_attempts": 5,
+         "run_at": now + timedelta(minutes=5)}
+    ])
+    job = await queue.claim("me", [])
+    assert (job["id"], job["locked_by"], job["attempts"]) == ("stalled", "me", 2)
+    assert await queue.claim("me", []) is None
+    # The previous holder can no longer finish it
+    await queue.complete({"id": "stalled"}, "dead")
+    assert (await queue.collection.find_one({"id": "stalled"}))["status"] == "running"
@@ -0,0 +1,55 @@
+"""Integer-cent money arithmetic and the one-time cents migration"""
+import pytest
+
+import core
+from money import to_cents, batch_totals
+from migrate_money import migrate_money
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+def test_to_cents_is_exact():
+    assert to_cents(19.99) == 1999
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents("1.005") == 101
+    assert to_cents(-2.5) == -250
+
+def test_batch_totals_groups_lines():
+    # Three groups: two lines, none, one line
+    assert batch_totals([1999, 1, 500], [3, 7, 2], [2, 0, 1]) == [6004, 0, 1000]
+    assert batch_totals([], [], [0, 0]) == [0, 0]
+
+async def test_orders_total_in_cents(client, admin_headers, user_headers):
+    product = (await client.post("/api/admin/products", headers=admin_headers, json={
+        "name": "Cent Test", "description": "x", "price_bbd": 0.35, "price_usd": 0.17, "category": "soaps", "stock": 10
+    })).json()
+    assert (product["price_bbd_cents"], product["price_usd_cents"]) == (35, 17)
+
+    order = await place_order(client, user_headers, product["id"], quantity=3)
+    assert (order["total_bbd_cents"], order["total_usd_cents"]) == (105, 51)
+    assert order["total_usd"] == 0.51
+    assert order["items"][0]["price_usd_cents"] == 17
+
+async def test_migration_converts_legacy_documents(app):
+    await core.db.products.insert_one({"id": "p1", "price_bbd": 19.99, "price_usd": 9.995})
+    await core.db.orders.insert_one({
+        "id": "o1",
+        "items": [{"product_id": "p1", "quantity": 3, "price_bbd": 19.99, "price_usd": 9.995}],
+        # Float drift: the line sum is 59.97 BBD
+        "total_bbd": 59.970000000000006, "total_usd": 29.99
+    })
+    await core.db.payment_transactions.insert_one({"id": "t1", "amount": 29.99})
+
+    assert (await migrate_money(dry_run=True))["orders"] == 1
+    assert "total_bbd_cents" not in await core.db.orders.find_one({"id": "o1"})
+
+    report = await migrate_money(batch_size=1)
+    assert report == {"products": 1, "orders": 1, "orders_with_drift": 1, "payment_transactions": 1, "dry_run": False}
+    order = await core.db.orders.find_one({"id": "o1"})
+    assert (order["total_bbd_cents"], order["total_usd_cents"]) == (5997, 2999)
+    assert order["items"][0]["price_usd_cents"] == 1000
+    assert (await core.db.products.find_one({"id": "p1"}))["price_usd_cents"] == 1000
+    assert (await core.db.payment_transactions.find_one({"id": "t1"}))["amount_cents"] == 2999
+
+    # Already migrated documents are left alone
+    assert (await migrate_money())["orders"] == 0
@@ -0,0 +1,38 @@
+"""Customer order history: keyset pages of order summaries"""
+import pytest
+
+import core
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+async def test_history_pages_newest_first(client, seeded, user_headers):
+    product = seeded[0]
+    ids = []
+    for quantity in (1, 2, 1, 3, 1):
+        ids.append((await place_order(client, user_headers, product["id"], quantity))["id"])
+    # Two orders in the same instant: the id breaks the tie
+    await core.db.orders.update_many({"id": {"$in": ids[1:3]}}, {"$set": {"created_at": "2030-01-01T00:00:00+00:00"}})
+    expected = [order["id"] for order in await core.db.orders.find().sort([("created_at", -1), ("id", -1)]).to_list(None)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/orders/history", params=params, headers=user_headers)).json()
+        assert len(page["items"]) <= 2
+        seen += [order["id"] for order in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == expected
+
+    summary = (await client.get("/api/orders/history", params={"limit": 50}, headers=user_headers)).json()["items"]
+    summary = next(order for order in summary if order["id"] == ids[3])
+    # Summaries carry counts instead of line items
+    assert summary["item_count"] == 3 and "items" not in summary
+    assert summary["preview_image"] == product["images"][0]
+
+async def test_history_is_per_customer(client, seeded, user_headers, admin_headers):
+    await place_order(client, admin_headers, seeded[0]["id"])
+    assert (await client.get("/api/orders/history", headers=user_headers)).json() == {"items": [], "next_cursor": None}
+    assert (await client.get("/api/orders/history?cursor=garbage", headers=user_headers)).status_code == 400
@@ -0,0 +1,77 @@
+"""The payment provider deadline and circuit breaker, driven through the fake gateway"""
+import pytest
+
+import payments
+from fake_payments import FakePaymentGateway
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def settings(settings):
+    return settings.model_copy(update={
+        "payment_breaker_threshold": 2,
+        "payment_breaker_reset_seconds": 30,
+        "payment_timeout_seconds": 0.1
+    })
+
+@pytest.fixture
+async def checkout(client, seeded, user_headers):
+    order = await place_order(client, user_headers, seeded[0]["id"], payment_method="stripe")
+
+    async def start():
+        return await client.post(
+            "/api/checkout/create-session",
+            json={"order_id": order["id"], "origin_url": "http://shop.test"},
+            headers=user_headers
+        )
+    return start
+
+def let_reset_timeout_pass():
+    payments.payment_breaker.opened_at -= payments.payment_breaker.reset_timeout
+
+async def test_breaker_opens_and_fails_fast(checkout):
+    FakePaymentGateway.faults.fail_next = 2
+    assert [(await checkout()).status_code for _ in range(2)] == [502, 502]
+    assert payments.payment_breaker.state == "open"
+
+    calls = FakePaymentGateway.calls
+    response = await checkout()
+    assert response.status_code == 503
+    assert 1 <= int(response.headers["retry-after"]) <= 30
+    # Rejected without reaching the provider
+    assert FakePaymentGateway.calls == calls
+    assert payments.payment_breaker.rejections == 1
+
+async def test_half_open_probe_closes_or_reopens(checkout):
+    FakePaymentGateway.faults.fail_next = 3
+    for _ in range(2):
+        await checkout()
+    let_reset_timeout_pass()
+    # The probe fails: straight back to open
+    assert (await checkout()).status_code == 502
+    assert payments.payment_breaker.state == "open"
+    assert (await checkout()).status_code == 503
+
+    let_reset_timeout_pass()
+    assert (await checkout()).status_code == 200
+    assert payments.payment_breaker.state == "closed"
+    assert payments.payment_breaker.consecutive_failures == 0
+
+async def test_hung_provider_hits_the_deadline(checkout, client, admin_headers):
+    FakePaymentGateway.faults.hang = True
+    assert (await checkout()).status_code == 504
+    assert (await checkout()).status_code == 504
+    assert (await checkout()).status_code == 503
+
+    breaker = (await client.get("/api/admin/payments/stats", headers=admin_headers)).json()["breaker"]
+    assert (breaker["state"], breaker["timeouts"], breaker["rejections"]) == ("open", 2, 1)
+
+class TestStandingFaults:
+    @pytest.fixture
+    def settings(self, settings):
+        return settings.model_copy(update={"payment_fake_failure_rate": 1.0, "payment_fake_latency_ms": 5})
+
+    async def test_fault_settings_reach_the_gateway(self, checkout):
+        assert (FakePaymentGateway.faults.latency, FakePaymentGateway.faults.failure_rate) == (0.005, 1.0)
+        assert (await checkout()).status_code == 502
@@ -0,0 +1,91 @@
+"""Composite product detail, rating histogram and keyset-paginated reviews"""
+import base64
+import json
+
+import pytest
+
+import catalog
+import core
+
+pytestmark = pytest.mark.anyio
+
+async def add_reviews(product_id: str, ratings: list):
+    await core.db.reviews.insert_many([
+        # Pairs share a timestamp so the id tie-breaker matters
+        {"id": f"r{n:02d}", "product_id": product_id, "user_id": f"u{n}", "user_name": "A B.",
+         "rating": rating, "comment": "", "created_at": f"2024-01-{n // 2 + 1:02d}T00:00:00+00:00"}
+        for n, rating in enumerate(ratings)
+    ])
+
+async def all_pages(client, product_id: str, sort: str) -> list:
+    seen, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get(f"/api/products/{product_id}/reviews/page", params=params)).json()
+        seen += [review["id"] for review in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+async def test_review_pages_follow_each_sort(client, seeded):
+    product_id = seeded[0]["id"]
+    ratings = [5, 3, 4, 5, 1, 3, 4]
+    await add_reviews(product_id, ratings)
+    reviews = await core.db.reviews.find({"product_id": product_id}, {"_id": 0}).to_list(None)
+
+    def expected(key):
+        return [review["id"] for review in sorted(reviews, key=key)]
+    newest = expected(lambda r: (r["created_at"], r["id"]))[::-1]
+    assert await all_pages(client, product_id, "newest") == newest
+    # Stable sorts of the newest-first order: ties stay newest first
+    assert await all_pages(client, product_id, "highest") == sorted(newest, key=lambda rid: -ratings[int(rid[1:])])
+    assert await all_pages(client, product_id, "lowest") == sorted(newest, key=lambda rid: ratings[int(rid[1:])])
+
+async def test_bad_cursor_or_sort_is_400(client, seeded):
+    url = f"/api/products/{seeded[0]['id']}/reviews/page"
+    assert (await client.get(url, params={"cursor": "not base64!"})).status_code == 400
+    wrong_shape = base64.urlsafe_b64encode(json.dumps(["only-one"]).encode()).decode()
+    assert (await client.get(url, params={"cursor": wrong_shape})).status_code == 400
+    assert (await client.get(url, params={"sort": "random"})).status_code == 400
+
+async def test_detail_has_histogram_and_first_page(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    url = f"/api/products/{product_id}/reviews"
+    review = {"product_id": product_id, "rating": 4, "comment": "Lovely"}
+    assert (await client.post(url, json=review, headers=user_headers)).status_code == 200
+    # One review per customer
+    assert (await client.post(url, json={**review, "rating": 5}, headers=user_headers)).status_code == 400
+
+    detail = (await client.get(f"/api/products/{product_id}/detail")).json()
+    assert detail["rating_histogram"] == {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}
+    assert (detail["product"]["average_rating"], detail["product"]["review_count"]) == (4.0, 1)
+    assert [review["comment"] for review in detail["reviews"]["items"]] == ["Lovely"]
+    assert detail["reviews"]["next_cursor"] is None
+    assert (await client.get("/api/products/missing/detail")).status_code == 404
+
+async def test_listings_read_the_stored_rating_counters(client, seeded, user_headers, admin_headers):
+    product_id = seeded[0]["id"]
+    for rating, headers in ((5, user_headers), (2, admin_headers)):
+        review = {"product_id": product_id, "rating": rating, "comment": ""}
+        await client.post(f"/api/products/{product_id}/reviews", json=review, headers=headers)
+
+    listed = {p["id"]: p for p in (await client.get("/api/products")).json()}
+    assert (listed[product_id]["average_rating"], listed[product_id]["review_count"]) == (3.5, 2)
+    # Reviews alone, without counters, are not joined in
+    await add_reviews(seeded[1]["id"], [5])
+    assert {p["id"]: p for p in (await client.get("/api/products")).json()}[seeded[1]["id"]]["review_count"] == 0
+
+async def test_backfill_counts_reviews_of_products_without_counters(client, seeded):
+    product_id = seeded[0]["id"]
+    await core.db.products.update_one(
+        {"id": product_id}, {"$unset": {"rating_histogram": "", "rating_sum": "", "review_count": ""}}
+    )
+    await add_reviews(product_id, [5, 4, 4])
+    # Reads no longer write the counters themselves
+    assert (await client.get(f"/api/products/{product_id}/detail")).json()["product"]["review_count"] == 0
+
+    assert await catalog.backfill_rating_stats() == 1
+    detail = (await client.get(f"/api/products/{product_id}/detail")).json()
+    assert detail["rating_histogram"] == {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}
+    assert detail["product"]["average_rating"] == pytest.approx(13 / 3)
+    assert await catalog.backfill_rating_stats() == 0
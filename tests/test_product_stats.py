@@ -0,0 +1,60 @@
+"""Write-behind view/add-to-cart counters and the "popular" catalog sort"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import stats
+
+pytestmark = pytest.mark.anyio
+
+async def test_counts_are_buffered_until_flush(client, seeded, admin_headers):
+    product_id = seeded[0]["id"]
+    for _ in range(3):
+        assert (await client.get(f"/api/products/{product_id}/detail")).status_code == 200
+    assert stats.product_counters.pending[product_id]["views"] == 3
+
+    report = (await client.get("/api/admin/products/stats", headers=admin_headers)).json()
+    assert report["products"] == []
+
+    assert await stats.product_counters.flush() == 1
+    assert stats.product_counters.pending == {}
+    report = (await client.get("/api/admin/products/stats", headers=admin_headers)).json()
+    assert [(row["product_id"], row["views"]) for row in report["products"]] == [(product_id, 3)]
+
+async def test_cart_sync_counts_quantity_increases(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    await client.put("/api/cart", json={"items": [{"product_id": product_id, "quantity": 2}]}, headers=user_headers)
+    await client.put("/api/cart", json={"items": [{"product_id": product_id, "quantity": 1}]}, headers=user_headers)
+    await client.post("/api/cart/items", json={"product_id": product_id, "quantity": 1}, headers=user_headers)
+    assert stats.product_counters.pending[product_id]["cart_adds"] == 3
+
+async def test_popular_sort(client, seeded):
+    least, most = seeded[0]["id"], seeded[-1]["id"]
+    stats.record_view(least)
+    stats.record_view(least)
+    stats.record_view(most)
+    stats.record_cart_add(most)
+    await stats.product_counters.flush()
+
+    ranked = [p["id"] for p in (await client.get("/api/products", params={"sort": "popular"})).json()]
+    assert ranked[:2] == [most, least]
+    assert len(ranked) == len(seeded)
+    assert (await client.get("/api/products", params={"sort": "cheapest"})).status_code == 400
+
+async def test_flush_cancelled_mid_write_keeps_its_batch(app, monkeypatch):
+    stats.record_view("p1")
+    started = asyncio.Event()
+
+    async def slow_write(operations, ordered):
+        started.set()
+        await asyncio.sleep(10)
+    monkeypatch.setattr(stats, "db", SimpleNamespace(product_stats=SimpleNamespace(bulk_write=slow_write)))
+
+    flusher = asyncio.ensure_future(stats.product_counters.flush())
+    await asyncio.wait_for(started.wait(), 5)
+    stats.record_view("p1")
+    flusher.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flusher
+    assert stats.product_counters.pending["p1"]["views"] == 2
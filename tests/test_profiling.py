@@ -0,0 +1,61 @@
+"""Admin-triggered request profiling and Mongo command attribution"""
+from types import SimpleNamespace
+
+import pytest
+
+from profiling import RequestProfile, current_profile, mongo_command_listener, profiling_requested
+
+pytestmark = pytest.mark.anyio
+
+async def test_admin_can_profile_a_request(client, seeded, admin_headers):
+    response = await client.get("/api/products", headers={**admin_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    assert "mongo;dur=" in response.headers["server-timing"]
+
+    report = (await client.get(f"/api/admin/profiles/{profile_id}", headers=admin_headers)).json()
+    assert (report["method"], report["path"], report["status"]) == ("GET", "/api/products", 200)
+    assert {"samples", "self", "cumulative"} <= set(report["cpu"])
+    listed = (await client.get("/api/admin/profiles?path=/api/products", headers=admin_headers)).json()
+    assert [entry["id"] for entry in listed] == [profile_id]
+
+async def test_flag_is_ignored_without_admin(client, seeded, user_headers, admin_headers):
+    for headers in ({"X-Profile": "1"}, {**user_headers, "X-Profile": "1"}, admin_headers):
+        response = await client.get("/api/products", headers=headers)
+        assert response.status_code == 200 and "x-profile-id" not in response.headers
+    assert (await client.get("/api/admin/profiles", headers=admin_headers)).json() == []
+
+def test_profiling_flag_parsing():
+    def scope(headers=(), query=b""):
+        return {"headers": list(headers), "query_string": query}
+    assert profiling_requested(scope([(b"x-profile", b"1")]))
+    assert not profiling_requested(scope([(b"x-profile", b"0")]))
+    assert profiling_requested(scope(query=b"limit=5&_profile=1"))
+    assert not profiling_requested(scope(query=b"_profile=false"))
+    assert not profiling_requested(scope())
+
+def test_mongo_commands_are_attributed_to_the_profile():
+    profile = RequestProfile("GET", "/api/products", "admin")
+
+    def run_command(request_id, name, collection, micros, reply):
+        mongo_command_listener.started(SimpleNamespace(request_id=request_id, command_name=name, command={name: collection}))
+        mongo_command_listener.succeeded(SimpleNamespace(
+            request_id=request_id, command_name=name, duration_micros=micros, reply=reply
+        ))
+
+    # Outside a profiled request nothing is recorded
+    run_command(0, "find", "products", 100, {"cursor": {"firstBatch": [{}]}})
+    token = current_profile.set(profile)
+    try:
+        run_command(1, "find", "products", 1500, {"cursor": {"firstBatch": [{}, {}, {}]}})
+        run_command(2, "find", "products", 500, {"cursor": {"nextBatch": [{}]}})
+        run_command(3, "findAndModify", "orders", 2000, {"value": {"id": "o1"}})
+    finally:
+        current_profile.reset(token)
+
+    summary = profile.mongo_summary()
+    assert (summary["commands"], summary["documents"], summary["duration_ms"]) == (3, 5, 4.0)
+    assert [(e["command"], e["collection"], e["count"]) for e in summary["by_command"]] == [
+        ("find", "products", 2), ("findAndModify", "orders", 1)
+    ]
+    assert summary["slowest"][0]["duration_ms"] == 2.0
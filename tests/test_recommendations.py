@@ -0,0 +1,79 @@
+"""Co-purchase recommendations: batch refresh and /api/products/{id}/related"""
+from datetime import datetime, timezone
+
+import pytest
+
+import core
+import recommendations
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def no_settle_delay(monkeypatch):
+    monkeypatch.setattr(recommendations, "RELATED_SETTLE_SECONDS", 0)
+
+async def add_paid_orders(*baskets):
+    now = datetime.now(timezone.utc).isoformat()
+    await core.db.orders.insert_many([
+        {"id": f"order-{now}-{n}", "items": [{"product_id": pid, "quantity": 1} for pid in basket],
+         "payment_status": "paid", "paid_at": now}
+        for n, basket in enumerate(baskets)
+    ])
+
+def test_top_neighbours_are_cosine_ranked():
+    baskets = recommendations.Baskets()
+    for basket in [["a", "b"], ["a", "b"], ["a", "c"], ["c", "d"], ["a", "a", "b"]]:
+        baskets.add(basket)
+    counts = baskets.co_purchases()
+    assert counts.diagonal().tolist() == [4, 3, 2, 1]
+
+    rows, cols, scores = recommendations.top_neighbours(counts, counts.diagonal(), k=1)
+    ids = baskets.product_ids
+    assert {ids[i]: ids[j] for i, j in zip(rows, cols)} == {"a": "b", "b": "a", "c": "d", "d": "c"}
+    assert scores[0] == pytest.approx(3 / (4 * 3) ** 0.5)
+
+async def test_related_products_refresh(client, seeded, admin_headers):
+    a, b, c, d = (p["id"] for p in seeded[:4])
+    await add_paid_orders([a, b], [a, b], [a, c])
+    assert (await client.get(f"/api/products/{a}/related")).json() == []
+
+    report = (await client.post("/api/admin/recommendations/refresh", headers=admin_headers)).json()
+    assert report["full"] and report["orders"] == 3
+    related = (await client.get(f"/api/products/{a}/related")).json()
+    assert [p["id"] for p in related] == [b, c]
+    assert {"name", "price_bbd", "image"} <= set(related[0])
+
+    # Only the new order is read; its products are rescored
+    await add_paid_orders([c, d], [c, d])
+    report = (await client.post("/api/admin/recommendations/refresh", headers=admin_headers)).json()
+    assert not report["full"] and report["orders"] == 2
+    assert [p["id"] for p in (await client.get(f"/api/products/{c}/related")).json()] == [d, a]
+    assert [p["id"] for p in (await client.get(f"/api/products/{a}/related", params={"limit": 1})).json()] == [b]
+
+async def test_incremental_run_rescores_neighbours_of_touched_products(client, seeded, admin_headers):
+    a, b, c, d = (p["id"] for p in seeded[:4])
+    await add_paid_orders([a, b], [a, b], [a, c])
+    await client.post("/api/admin/recommendations/refresh", headers=admin_headers)
+    assert [p["id"] for p in (await client.get(f"/api/products/{a}/related")).json()] == [b, c]
+
+    # No new order holds `a`, but b is now bought far more often, which dilutes
+    # a-b's cosine score below a-c's
+    await add_paid_orders(*[[b, d]] * 10)
+    report = (await client.post("/api/admin/recommendations/refresh", headers=admin_headers)).json()
+    assert not report["full"] and report["products_rescored"] == 3
+    assert [p["id"] for p in (await client.get(f"/api/products/{a}/related")).json()] == [c, b]
+
+async def test_lost_lease_stops_the_run(client, seeded, admin_headers, monkeypatch):
+    await add_paid_orders([p["id"] for p in seeded[:2]])
+    acquire = recommendations.acquire_task_lock
+    calls = []
+
+    async def taken_over(name, owner, seconds):
+        calls.append(name)
+        return len(calls) == 1 and await acquire(name, owner, seconds)
+    monkeypatch.setattr(recommendations, "acquire_task_lock", taken_over)
+
+    assert (await client.post("/api/admin/recommendations/refresh", headers=admin_headers)).status_code == 409
+    # Stopped before adding any counts
+    assert await core.db.product_copurchases.count_documents({}) == 0
+    assert await core.db.recommendation_state.find_one({}) is None
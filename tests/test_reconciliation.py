@@ -0,0 +1,86 @@
+"""Reconciling stale pending payment transactions against the provider"""
+import pytest
+
+import core
+import payments
+from fake_payments import FakePaymentGateway
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+async def start_checkouts(client, headers, product_id, count: int) -> list:
+    """Orders with checkout sessions that are old enough to reconcile; returns (order_id, session_id) pairs"""
+    started = []
+    for _ in range(count):
+        order_id = (await place_order(client, headers, product_id, payment_method="stripe"))["id"]
+        session = (await client.post(
+            "/api/checkout/create-session",
+            json={"order_id": order_id, "origin_url": "http://shop.test"},
+            headers=headers
+        )).json()
+        started.append((order_id, session["session_id"]))
+    await core.db.payment_transactions.update_many({}, {"$set": {"created_at": "2020-01-01T00:00:00+00:00"}})
+    return started
+
+async def test_reconcile_applies_provider_outcomes(client, seeded, admin_headers, user_headers):
+    product = seeded[0]
+    (paid_order, paid_session), (expired_order, expired_session), (open_order, _) = await start_checkouts(
+        client, user_headers, product["id"], 3
+    )
+    FakePaymentGateway.complete(paid_session)
+    FakePaymentGateway.complete(expired_session, "unpaid")
+
+    report = (await client.post("/api/admin/payments/reconcile", headers=admin_headers)).json()
+    assert report["status"] == "finished"
+    assert {key: report[key] for key in ("scanned", "paid", "expired", "still_open", "orders_paid", "orders_cancelled")} == {
+        "scanned": 3, "paid": 1, "expired": 1, "still_open": 1, "orders_paid": 1, "orders_cancelled": 1
+    }
+    orders = {order["id"]: order async for order in core.db.orders.find({}, {"_id": 0})}
+    assert orders[paid_order]["payment_status"] == "paid"
+    assert orders[expired_order]["status"] == "cancelled"
+    assert orders[open_order]["payment_status"] == "pending"
+    # The expired hold went back on the shelf; the paid and open ones did not
+    assert (await client.get(f"/api/products/{product['id']}")).json()["stock"] == product["stock"] - 2
+
+    # Only the open session is left to check
+    assert (await client.post("/api/admin/payments/reconcile", headers=admin_headers)).json()["scanned"] == 1
+
+async def test_lease_is_renewed_per_page_and_lost_lease_stops(client, seeded, admin_headers, user_headers, monkeypatch):
+    await start_checkouts(client, user_headers, seeded[0]["id"], 3)
+    monkeypatch.setattr(payments, "PAYMENT_RECONCILE_PAGE", 1)
+    renewals = []
+    acquire = payments.acquire_task_lock
+
+    async def flaky_acquire(name, owner, seconds):
+        renewals.append(name)
+        # The first call takes the lock and the second renews it; then another worker takes over
+        return len(renewals) <= 2 and await acquire(name, owner, seconds)
+    monkeypatch.setattr(payments, "acquire_task_lock", flaky_acquire)
+
+    report = (await client.post("/api/admin/payments/reconcile", headers=admin_headers)).json()
+    assert report["status"] == "aborted"
+    assert report["scanned"] == 1
+    assert report["error_samples"] == [{"error": "Reconciliation lease lost"}]
+
+async def test_lock_held_elsewhere_is_409(client, admin_headers):
+    assert await payments.acquire_task_lock(payments.PAYMENT_RECONCILE_LOCK, "other-worker", 60)
+    assert (await client.post("/api/admin/payments/reconcile", headers=admin_headers)).status_code == 409
+
+class TestCircuitOpensMidPage:
+    @pytest.fixture
+    def settings(self, settings):
+        return settings.model_copy(update={"payment_breaker_threshold": 2, "payment_reconcile_concurrency": 1})
+
+    async def test_page_settles_then_run_aborts(self, client, seeded, admin_headers, user_headers):
+        started = await start_checkouts(client, user_headers, seeded[0]["id"], 4)
+        for _, session_id in started:
+            FakePaymentGateway.complete(session_id)
+        FakePaymentGateway.faults.fail_next = 2
+        calls = FakePaymentGateway.calls
+
+        report = (await client.post("/api/admin/payments/reconcile", headers=admin_headers)).json()
+        assert report["status"] == "aborted"
+        assert report["errors"] == 2
+        assert {"error": "Payment provider circuit open"} in report["error_samples"]
+        # The checks after the breaker opened never reached the provider
+        assert FakePaymentGateway.calls - calls == 2
@@ -0,0 +1,70 @@
+"""Request IDs, access records and the queued JSON log handler"""
+import json
+import logging
+import queue
+
+import pytest
+
+from request_logging import (
+    JsonFormatter, LogQueueHandler, RequestContext, current_request, parse_sample_rates
+)
+
+pytestmark = pytest.mark.anyio
+
+def access_records(caplog) -> list:
+    return [record.fields for record in caplog.records if record.name == "perennia.access"]
+
+async def test_request_id_is_assigned_or_propagated(client):
+    generated = (await client.get("/api/")).headers["x-request-id"]
+    assert len(generated) == 32
+
+    response = await client.get("/api/", headers={"X-Request-ID": "support-ticket-42"})
+    assert response.headers["x-request-id"] == "support-ticket-42"
+
+    response = await client.get("/api/", headers={"X-Request-ID": "not a token\n"})
+    assert response.headers["x-request-id"] != "not a token\n"
+
+async def test_access_record_has_route_status_and_user(client, user_headers, caplog):
+    caplog.clear()
+    response = await client.get("/api/auth/me", headers=user_headers)
+    [record] = access_records(caplog)
+    assert record["route"] == "/api/auth/me"
+    assert record["status"] == 200
+    assert record["user_id"] == response.json()["id"]
+    assert record["duration_ms"] >= 0 and record["sample_rate"] == 1.0
+
+class TestSampling:
+    @pytest.fixture
+    def settings(self, settings):
+        return settings.model_copy(update={"log_sample_rate": 0.0, "log_route_sample_rates": "/api/products/{product_id}=1"})
+
+    async def test_route_sample_rates(self, client, caplog):
+        caplog.clear()
+        await client.get("/api/")
+        await client.get("/api/products/missing")
+        assert [(r["route"], r["status"]) for r in access_records(caplog)] == [("/api/products/{product_id}", 404)]
+
+def test_queued_records_carry_the_request_id():
+    log_queue = queue.Queue(1)
+    handler = LogQueueHandler(log_queue)
+    logger = logging.getLogger("test.request_logging")
+    logger.addHandler(handler)
+    logger.propagate = False
+    token = current_request.set(RequestContext("req-1"))
+    try:
+        logger.warning("stock low for %s", "p1", extra={"fields": {"stock": 2}})
+        # The queue is full: dropped and counted instead of blocking
+        logger.warning("second")
+    finally:
+        current_request.reset(token)
+        logger.removeHandler(handler)
+    assert handler.dropped == 1
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry["message"] == "stock low for p1"
+    assert (entry["request_id"], entry["stock"], entry["level"]) == ("req-1", 2, "WARNING")
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("/api/products=0.1, /api/admin/events=0") == {"/api/products": 0.1, "/api/admin/events": 0.0}
+    with pytest.raises(ValueError):
+        parse_sample_rates("0.5")
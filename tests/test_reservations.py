@@ -0,0 +1,79 @@
+"""Stock holds: cancel, expiry sweeps, and payments racing a release"""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import core
+import reservations
+from tests.conftest import place_order
+
+pytestmark = pytest.mark.anyio
+
+async def hold_stock(client, headers, product_id, payment_method="stripe") -> str:
+    return (await place_order(client, headers, product_id, 2, payment_method))["id"]
+
+async def stock_of(product_id) -> int:
+    return (await core.db.products.find_one({"id": product_id}))["stock"]
+
+async def test_cancel_releases_hold_once(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    before = await stock_of(product_id)
+    order_id = await hold_stock(client, user_headers, product_id)
+    assert await stock_of(product_id) == before - 2
+
+    assert (await client.post(f"/api/orders/{order_id}/cancel", headers=user_headers)).status_code == 200
+    assert await stock_of(product_id) == before
+    # Nothing left to release
+    assert (await client.post(f"/api/orders/{order_id}/cancel", headers=user_headers)).status_code == 409
+
+    form_order = await hold_stock(client, user_headers, product_id, payment_method="form")
+    assert (await client.post(f"/api/orders/{form_order}/cancel", headers=user_headers)).status_code == 409
+
+async def test_payment_takes_over_a_claimed_hold(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    order_id = await hold_stock(client, user_headers, product_id)
+    stock = await stock_of(product_id)
+    # A sweeper has claimed the hold but not settled it yet
+    await core.db.stock_reservations.update_one(
+        {"order_id": order_id},
+        {"$set": {"status": "releasing", "claim": "sweeper-1", "claimed_at": datetime.now(timezone.utc)}}
+    )
+    await reservations.commit_reservation(order_id)
+
+    reservation = await core.db.stock_reservations.find_one({"order_id": order_id})
+    assert reservation["status"] == "committed" and "claim" not in reservation
+    # The sweeper finds nothing of its own left to settle
+    assert await reservations.release_reservations({"order_id": order_id}, "expired") == 0
+    assert await stock_of(product_id) == stock
+
+async def test_sweep_reclaims_stale_claims(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    before = await stock_of(product_id)
+    order_id = await hold_stock(client, user_headers, product_id)
+    # A sweeper died after claiming this expired hold
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    await core.db.stock_reservations.update_one(
+        {"order_id": order_id},
+        {"$set": {"status": "releasing", "claim": "dead-sweeper", "claimed_at": long_ago, "expires_at": long_ago}}
+    )
+
+    assert await reservations.sweep_expired_reservations() == 1
+    assert await stock_of(product_id) == before
+    assert (await core.db.orders.find_one({"id": order_id}))["payment_status"] == "expired"
+    assert (await core.db.stock_reservations.find_one({"order_id": order_id}))["status"] == "released"
+
+async def test_late_payment_never_takes_stock_below_zero(client, seeded, user_headers):
+    product_id = seeded[0]["id"]
+    order_id = await hold_stock(client, user_headers, product_id)
+    await core.db.stock_reservations.update_one(
+        {"order_id": order_id}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(minutes=1)}}
+    )
+    assert await reservations.sweep_expired_reservations() == 1
+    # Someone else bought everything that was handed back
+    await core.db.products.update_one({"id": product_id}, {"$set": {"stock": 1}})
+
+    await reservations.commit_reservation(order_id)
+
+    assert await stock_of(product_id) == 1
+    order = await core.db.orders.find_one({"id": order_id})
+    assert order["oversold"] == [{"product_id": product_id, "quantity": 2}]
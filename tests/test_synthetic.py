@@ -0,0 +1,41 @@
+"""Deterministic load-test data from POST /api/admin/synthetic"""
+import pytest
+
+import core
+
+pytestmark = pytest.mark.anyio
+
+COLLECTIONS = ["users", "products", "reviews", "orders", "payment_transactions"]
+VOLUMES = {"products": 6, "users": 8, "orders": 12, "reviews_per_product": 2}
+
+@pytest.fixture
+async def target_databases(app, settings):
+    names = [f"{settings.db_name}_synthetic_{suffix}" for suffix in ("a", "b", "c")]
+    yield names
+    for name in names:
+        await core.client.drop_database(name)
+
+async def dump(db_name: str) -> dict:
+    database = core.client[db_name]
+    return {name: await database[name].find({}, {"_id": 0}).sort("id", 1).to_list(None) for name in COLLECTIONS}
+
+async def test_same_seed_yields_identical_data(client, admin_headers, target_databases):
+    first, second, other = target_databases
+    for db_name, seed in ((first, 7), (second, 7), (other, 8)):
+        response = await client.post(
+            "/api/admin/synthetic", json={"db_name": db_name, "seed": seed, **VOLUMES}, headers=admin_headers
+        )
+        assert response.status_code == 200
+        assert {name: response.json()[name] for name in ("users", "products", "orders")} == {
+            "users": 8, "products": 6, "orders": 12
+        }
+
+    data = await dump(first)
+    assert all(data[name] for name in ("users", "products", "reviews", "orders"))
+    assert data == await dump(second)
+    assert data != await dump(other)
+
+async def test_only_synthetic_databases_are_writable(client, admin_headers, settings):
+    for db_name in (settings.db_name, "admin", "production", f"{settings.db_name}_synthetic.x"):
+        response = await client.post("/api/admin/synthetic", json={"db_name": db_name, **VOLUMES}, headers=admin_headers)
+        assert response.status_code == 400, db_name